@@ -0,0 +1,141 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Limits the requests being processed and queues a bounded number more.
+
+    Requests beyond ``max_in_flight`` wait in a FIFO queue of at most
+    ``max_queue`` entries. When the queue is full a request is rejected at
+    once with 429, and a request that waited ``queue_timeout`` seconds
+    without getting a slot is rejected with 503. Both carry a ``Retry-After``
+    estimated from the recent service time and the backlog.
+
+    Not thread-safe, it is meant to be used from a single event loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters = deque()
+        # Moving average of the time a request holds a slot
+        self._service_time = 1.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to have drained."""
+        backlog = (self.queued + 1) / self.max_in_flight
+        return max(1, math.ceil(backlog * self._service_time))
+
+    def _reject(self, status_code: int, detail: str) -> Overloaded:
+        self.rejected += 1
+        return Overloaded(status_code, detail, self.retry_after())
+
+    async def acquire(self) -> None:
+        """Wait for a processing slot.
+
+        Raises:
+            Overloaded: If the queue is full or the wait timed out.
+        """
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queue:
+            raise self._reject(429, "Too many requests, try again later.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over as the timeout expired
+                return
+            raise self._reject(503, "Server is overloaded, try again later.")
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot, handing it directly to the oldest waiting request."""
+        if service_time is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an ``AdmissionController`` to some paths.
+
+    Admission happens before the request body is read, so rejected uploads
+    cost no memory, and the slot is held until the response (including a
+    streamed one) has been sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController, prefix: str = "/ocr"):
+        self.app = app
+        self.controller = controller
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": e.detail},
+                status_code=e.status_code,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - start)
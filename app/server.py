@@ -1,18 +1,92 @@
 import json
-from typing import Optional
+import os
+from contextlib import asynccontextmanager
+from typing import BinaryIO, List, Optional
 
 from fastapi import FastAPI, HTTPException, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 
+from admission import AdmissionController, AdmissionMiddleware
+from uploads import UploadLimitMiddleware
+from receipt_ocr.balancer import AsyncPooledProvider
+from receipt_ocr.connections import create_async_http_client
+from receipt_ocr.hedging import AsyncHedgedProvider, HedgingPolicy
 from receipt_ocr.processors import ReceiptProcessor
+from receipt_ocr.profiles import get_profile
+from receipt_ocr.providers import AsyncOpenAIProvider
+from receipt_ocr.utils import json_dumps
+
+# Connection pool to the LLM API, shared by all requests of this worker.
+# WARM_CONNECTIONS are opened at startup so the first requests skip the
+# connect and TLS handshakes.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2 = os.getenv("HTTP2", "").lower() in ("1", "true", "yes")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))
+WARM_CONNECTIONS = int(os.getenv("WARM_CONNECTIONS", "4"))
+http_client = create_async_http_client(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    http2=HTTP2,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+)
+
+# Several comma-separated OPENAI_BASE_URLS (e.g. self-hosted replicas plus a
+# cloud fallback) are load balanced, unhealthy ones are left out for a while
+BASE_URLS = [url.strip() for url in os.getenv("OPENAI_BASE_URLS", "").split(",")]
+BASE_URLS = [url for url in BASE_URLS if url]
+if len(BASE_URLS) > 1:
+    provider = AsyncPooledProvider(
+        [
+            AsyncOpenAIProvider(base_url=url, http_client=http_client, max_retries=0)
+            for url in BASE_URLS
+        ],
+        strategy=os.getenv("BALANCING_STRATEGY", "least_outstanding"),
+        latency_threshold=float(os.getenv("EJECT_LATENCY", "0")) or None,
+        cooldown=float(os.getenv("EJECT_COOLDOWN", "30")),
+    )
+else:
+    provider = AsyncOpenAIProvider(
+        base_url=BASE_URLS[0] if BASE_URLS else None, http_client=http_client
+    )
+
+# Requests slower than the HEDGE_PERCENTILE of recent ones are duplicated,
+# on another endpoint or HEDGE_MODEL, for at most HEDGE_MAX_RATE of requests
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0"))
+hedging = None
+if HEDGE_PERCENTILE > 0:
+    hedging = HedgingPolicy(
+        percentile=HEDGE_PERCENTILE,
+        max_hedge_rate=float(os.getenv("HEDGE_MAX_RATE", "0.05")),
+        initial_delay=float(os.getenv("HEDGE_DELAY", "0")) or None,
+    )
+
+# Initialize processor once (not on each request). The async provider lets a
+# single worker keep many LLM calls in flight instead of blocking the event loop.
+processor = ReceiptProcessor(
+    AsyncHedgedProvider(provider, hedging, hedge_model=os.getenv("HEDGE_MODEL"))
+    if hedging is not None
+    else provider
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_CONNECTIONS > 0:
+        # Bounded by the connect timeout rather than the read timeout, so a
+        # stalled endpoint does not hold up startup
+        await processor.provider.warm_up(WARM_CONNECTIONS, timeout=HTTP_CONNECT_TIMEOUT)
+    yield
+    await http_client.aclose()
 
-# Initialize processor once (not on each request)
-processor = ReceiptProcessor()
 
 app = FastAPI(
     title="Receipt OCR API",
     description="Extract structured data from receipt images using LLM",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Default JSON schema (same as CLI)
@@ -30,8 +104,31 @@ DEFAULT_SCHEMA = {
         }
     ],
 }
+# Compiled once so requests using the default schema skip prompt building
+DEFAULT_PROFILE = get_profile(DEFAULT_SCHEMA)
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
 
+# Admission control: requests beyond MAX_IN_FLIGHT wait in a queue of at most
+# MAX_QUEUE entries for up to QUEUE_TIMEOUT seconds, the rest are rejected
+# right away with Retry-After instead of piling up in memory
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "32"))
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "64"))
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", "30"))
+# A batch takes one admission slot and processes its files concurrently
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+admission = AdmissionController(MAX_IN_FLIGHT, MAX_QUEUE, QUEUE_TIMEOUT)
+app.add_middleware(AdmissionMiddleware, controller=admission, prefix="/ocr")
+# Added last so it runs first: oversized bodies are refused before they take
+# an admission slot. Multipart framing and the schema field need some room.
+FORM_OVERHEAD = 64 * 1024
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body_size=MAX_IMAGE_SIZE + FORM_OVERHEAD,
+    limits={"/ocr/batch": MAX_BATCH_FILES * MAX_IMAGE_SIZE + FORM_OVERHEAD},
+    prefix="/ocr",
+)
+
 
 @app.get("/")
 async def root():
@@ -41,7 +138,10 @@ async def root():
         "endpoints": {
             "GET /": "API information",
             "GET /health": "Health check",
+            "GET /stats": "Requests in flight and queued, LLM endpoint health",
             "POST /ocr/": "Extract structured data from receipt image",
+            "POST /ocr/stream": "Stream extracted fields as Server-Sent Events",
+            "POST /ocr/batch": "Extract many receipts, streamed as NDJSON",
         },
     }
 
@@ -52,6 +152,60 @@ async def health_check():
     return {"status": "ok", "service": "receipt-ocr-api"}
 
 
+@app.get("/stats")
+async def stats():
+    """Load statistics.
+
+    Reports the requests being processed and waiting, so a load balancer can
+    shed or re-route load before requests start timing out, and the health
+    of every LLM endpoint when several are configured and the hedging
+    counters when hedging is enabled.
+    """
+    load = admission.stats()
+    if isinstance(provider, AsyncPooledProvider):
+        load["endpoints"] = provider.pool.stats()
+    if hedging is not None:
+        load["hedging"] = hedging.stats()
+    return load
+
+
+def _read_image(file: UploadFile) -> BinaryIO:
+    """Validate an uploaded receipt image and return its spooled file.
+
+    The file is handed to the processor as is, so PIL decodes it in place
+    instead of from a copy of the upload in memory.
+    """
+    # Validation: Check content type
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    # Validation: Check file size (5MB limit). The request body size is also
+    # limited while it is received, see UploadLimitMiddleware.
+    if file.size is not None:
+        file_size = file.size
+    else:
+        file.file.seek(0, 2)  # Seek to end
+        file_size = file.file.tell()
+    file.file.seek(0)  # Seek back to beginning
+
+    if file_size > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=413, detail="Image too large. Max 5 MB allowed."
+        )
+
+    return file.file
+
+
+def _read_schema(json_schema: Optional[str]):
+    """Return the extraction profile of an optional custom JSON schema."""
+    if not json_schema:
+        return DEFAULT_PROFILE
+    try:
+        return get_profile(json.loads(json_schema))
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON schema format")
+
+
 @app.post("/ocr/")
 async def ocr_receipt(
     file: UploadFile,
@@ -63,37 +217,115 @@ async def ocr_receipt(
     - **json_schema**: Optional custom JSON schema as string (will be parsed to dict)
     """
     try:
-        # Validation: Check content type
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-
-        # Validation: Check file size (5MB limit)
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Seek back to beginning
-
-        if file_size > MAX_IMAGE_SIZE:
-            raise HTTPException(
-                status_code=413, detail="Image too large. Max 5 MB allowed."
-            )
-
-        image_bytes = file.file.read()
-
-        # Parse json_schema if provided
-        schema_to_use = DEFAULT_SCHEMA
-        if json_schema:
-            try:
-                schema_to_use = json.loads(json_schema)
-            except json.JSONDecodeError:
-                raise HTTPException(
-                    status_code=400, detail="Invalid JSON schema format"
-                )
+        image_file = _read_image(file)
+        schema_to_use = _read_schema(json_schema)
 
         # Process the receipt using the processor
-        result = processor.process_receipt(image_bytes, schema_to_use)
-        return JSONResponse(content=result, status_code=200)
+        result = await processor.aprocess_receipt(image_file, schema_to_use)
+        # Serialized with orjson when it is installed
+        return Response(
+            content=json_dumps(result), media_type="application/json", status_code=200
+        )
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), json_dumps(data))
+
+
+@app.post("/ocr/stream")
+async def ocr_receipt_stream(
+    file: UploadFile,
+    json_schema: Optional[str] = Form(default=None),
+):
+    """Extract structured data from a receipt image as Server-Sent Events.
+
+    Pushes a `field` event for every completed top-level field, an `item`
+    event for every completed list element (e.g. each line item) and a final
+    `result` event with the full result, or an `error` event on failure.
+
+    - **file**: Receipt image file (JPEG, PNG, etc., max 5MB)
+    - **json_schema**: Optional custom JSON schema as string (will be parsed to dict)
+    """
+    image_file = _read_image(file)
+    schema_to_use = _read_schema(json_schema)
+
+    async def events():
+        try:
+            async for event in processor.astream_receipt(image_file, schema_to_use):
+                if event.type == "result":
+                    yield _sse("result", event.value)
+                elif event.type == "item":
+                    yield _sse(
+                        "item",
+                        {
+                            "field": event.field,
+                            "index": event.index,
+                            "value": event.value,
+                        },
+                    )
+                else:
+                    yield _sse(event.type, {"field": event.field, "value": event.value})
+        except Exception as e:
+            # The response has already started, report the failure in-band
+            yield _sse("error", {"detail": f"Processing failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/ocr/batch")
+async def ocr_receipt_batch(
+    files: List[UploadFile],
+    json_schema: Optional[str] = Form(default=None),
+):
+    """Extract structured data from many receipt images in one request.
+
+    Files are processed concurrently and the response is NDJSON with one line
+    per file, written as soon as that file is done (completion order, not
+    upload order): `{"index": 0, "filename": "...", "result": {...}}`, or
+    `"error"` instead of `"result"` when that file failed.
+
+    - **files**: Receipt image files (JPEG, PNG, etc., max 5MB each)
+    - **json_schema**: Optional custom JSON schema as string (will be parsed to dict)
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files. Max {MAX_BATCH_FILES} per batch allowed.",
+        )
+    schema_to_use = _read_schema(json_schema)
+
+    # Invalid files get their error line right away and are not processed
+    errors, images, indexes = [], [], []
+    for index, file in enumerate(files):
+        try:
+            images.append(_read_image(file))
+            indexes.append(index)
+        except HTTPException as e:
+            errors.append(
+                {"index": index, "filename": file.filename, "error": e.detail}
+            )
+
+    async def lines():
+        for error in errors:
+            yield json_dumps(error) + b"\n"
+        async for item in processor.aiter_batch(
+            images, schema_to_use, max_concurrency=BATCH_CONCURRENCY
+        ):
+            index = indexes[item.index]
+            line = {"index": index, "filename": files[index].filename}
+            if item.ok:
+                line["result"] = item.result
+            else:
+                line["error"] = f"Processing failed: {item.error}"
+            yield json_dumps(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
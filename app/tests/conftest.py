@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The server imports its middleware as top-level modules, and the
+# receipt_ocr package from this repository when it is not installed
+APP_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, APP_DIR)
+sys.path.append(os.path.join(APP_DIR, "..", "src"))
+
+# The server builds its provider at import, without calling the API
+os.environ.setdefault("OPENAI_API_KEY", "test_api_key")
+os.environ["WARM_CONNECTIONS"] = "0"
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, AdmissionMiddleware, Overloaded
+
+
+def test_acquire_within_limit_and_release():
+    controller = AdmissionController(2, 4, 1.0)
+
+    async def run():
+        await controller.acquire()
+        await controller.acquire()
+        assert controller.stats()["in_flight"] == 2
+        controller.release()
+        controller.release()
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    controller = AdmissionController(1, 4, 1.0)
+    order = []
+
+    async def waiter(name):
+        await controller.acquire()
+        order.append(name)
+
+    async def run():
+        await controller.acquire()
+        tasks = [asyncio.create_task(waiter(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        assert controller.queued == 2
+        controller.release()
+        await asyncio.sleep(0)
+        assert order == ["first"]
+        # The slot moved to the waiter, it was not freed
+        assert controller.in_flight == 1
+        controller.release()
+        await asyncio.gather(*tasks)
+        controller.release()
+
+    asyncio.run(run())
+    assert order == ["first", "second"]
+    assert controller.in_flight == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    controller = AdmissionController(1, 1, 1.0)
+
+    async def run():
+        await controller.acquire()
+        queued = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.acquire()
+        queued.cancel()
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    # One request in flight and one queued, at the default service time
+    assert error.retry_after == 2
+    assert controller.rejected == 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    controller = AdmissionController(1, 4, 0.01)
+
+    async def run():
+        await controller.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.acquire()
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert error.retry_after >= 1
+    assert controller.queued == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    controller = AdmissionController(1, 4, 1.0)
+
+    async def run():
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.queued == 0
+        controller.release()
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+
+
+def test_waiter_cancelled_after_the_handover_frees_its_slot():
+    controller = AdmissionController(1, 4, 1.0)
+
+    async def run():
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over, then the waiter is cancelled before it
+        # could run
+        controller.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+    assert controller.in_flight == 0
+
+
+def test_invalid_limit():
+    with pytest.raises(ValueError, match="max_in_flight"):
+        AdmissionController(0, 4, 1.0)
+
+
+def _client(controller):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller, prefix="/ocr")
+
+    @app.get("/ocr/")
+    async def ocr():
+        return {"in_flight": controller.in_flight}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return TestClient(app)
+
+
+def test_middleware_holds_a_slot_during_the_request():
+    controller = AdmissionController(2, 4, 1.0)
+
+    response = _client(controller).get("/ocr/")
+
+    assert response.json() == {"in_flight": 1}
+    assert controller.in_flight == 0
+
+
+@pytest.mark.parametrize(
+    "max_queue, status_code", [(0, 429), (4, 503)], ids=["queue-full", "timeout"]
+)
+def test_middleware_rejects_with_retry_after(max_queue, status_code):
+    controller = AdmissionController(1, max_queue, 0.01)
+    # Every slot is taken
+    controller.in_flight = 1
+    client = _client(controller)
+
+    response = client.get("/ocr/")
+
+    assert response.status_code == status_code
+    assert response.headers["Retry-After"] == "1"
+    assert "try again later" in response.json()["detail"]
+    # Other paths are not subject to admission
+    assert client.get("/health").status_code == 200
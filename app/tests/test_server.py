@@ -0,0 +1,164 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from receipt_ocr.parsers import StreamEvent
+from receipt_ocr.processors import BatchResult
+
+RESULT = {"merchant_name": "Corner Store", "line_items": [{"item_name": "Milk"}]}
+IMAGE = ("receipt.jpg", b"image", "image/jpeg")
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = MagicMock()
+    monkeypatch.setattr(server, "processor", processor)
+    return processor
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_health_is_unchanged(client):
+    response = client.get("/health")
+
+    assert response.text == '{"status":"ok","service":"receipt-ocr-api"}'
+
+
+def test_stats(client):
+    stats = client.get("/stats").json()
+
+    assert stats["in_flight"] == 0
+    assert stats["max_in_flight"] == server.MAX_IN_FLIGHT
+
+
+def test_ocr(client, processor):
+    async def aprocess_receipt(image, schema):
+        return RESULT
+
+    processor.aprocess_receipt.side_effect = aprocess_receipt
+
+    response = client.post("/ocr/", files={"file": IMAGE})
+
+    assert response.json() == RESULT
+    assert processor.aprocess_receipt.call_args.args[1] is server.DEFAULT_PROFILE
+
+
+def test_ocr_rejects_non_images(client, processor):
+    response = client.post("/ocr/", files={"file": ("a.txt", b"text", "text/plain")})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "File must be an image"}
+    processor.aprocess_receipt.assert_not_called()
+
+
+def test_ocr_rejects_oversized_streamed_body(client, processor):
+    boundary = "boundary"
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=file; "
+        'filename="receipt.jpg"\r\nContent-Type: image/jpeg\r\n\r\n'
+    ).encode()
+
+    def body():
+        # Sent chunked, so the size is only known while it is received
+        yield head
+        for _ in range(7):
+            yield b"x" * (1024 * 1024)
+
+    response = client.post(
+        "/ocr/",
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    assert response.status_code == 413
+    processor.aprocess_receipt.assert_not_called()
+
+
+def _sse_events(text):
+    events = []
+    for block in text.split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            assert event.startswith("event: ") and data.startswith("data: ")
+            events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+def test_stream_frames_events(client, processor):
+    async def astream_receipt(image, schema):
+        yield StreamEvent("field", "Corner Store", field="merchant_name")
+        yield StreamEvent("item", {"item_name": "Milk"}, field="line_items", index=0)
+        yield StreamEvent("result", RESULT)
+
+    processor.astream_receipt.side_effect = astream_receipt
+
+    response = client.post("/ocr/stream", files={"file": IMAGE})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.endswith("\n\n")
+    assert _sse_events(response.text) == [
+        ("field", {"field": "merchant_name", "value": "Corner Store"}),
+        ("item", {"field": "line_items", "index": 0, "value": {"item_name": "Milk"}}),
+        ("result", RESULT),
+    ]
+
+
+def test_stream_reports_failures_in_band(client, processor):
+    async def astream_receipt(image, schema):
+        yield StreamEvent("field", "Corner Store", field="merchant_name")
+        raise RuntimeError("model unavailable")
+
+    processor.astream_receipt.side_effect = astream_receipt
+
+    response = client.post("/ocr/stream", files={"file": IMAGE})
+
+    assert response.status_code == 200
+    assert _sse_events(response.text)[-1] == (
+        "error",
+        {"detail": "Processing failed: model unavailable"},
+    )
+
+
+def test_batch_writes_a_line_per_file(client, processor):
+    async def aiter_batch(images, schema, max_concurrency):
+        assert len(images) == 2
+        yield BatchResult(1, images[1], error="RuntimeError: model unavailable")
+        yield BatchResult(0, images[0], result=RESULT)
+
+    processor.aiter_batch.side_effect = aiter_batch
+    files = [
+        ("files", ("first.jpg", b"image", "image/jpeg")),
+        ("files", ("notes.txt", b"text", "text/plain")),
+        ("files", ("third.jpg", b"image", "image/jpeg")),
+    ]
+
+    response = client.post("/ocr/batch", files=files)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        # Invalid files first, then the others in completion order
+        {"index": 1, "filename": "notes.txt", "error": "File must be an image"},
+        {
+            "index": 2,
+            "filename": "third.jpg",
+            "error": "Processing failed: RuntimeError: model unavailable",
+        },
+        {"index": 0, "filename": "first.jpg", "result": RESULT},
+    ]
+
+
+def test_batch_rejects_too_many_files(client, processor, monkeypatch):
+    monkeypatch.setattr(server, "MAX_BATCH_FILES", 1)
+    files = [("files", IMAGE), ("files", IMAGE)]
+
+    response = client.post("/ocr/batch", files=files)
+
+    assert response.status_code == 413
+    processor.aiter_batch.assert_not_called()
@@ -0,0 +1,56 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from uploads import UploadLimitMiddleware
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(
+        UploadLimitMiddleware,
+        max_body_size=1024 * 1024,
+        limits={"/ocr/batch": 2 * 1024 * 1024},
+        prefix="/ocr",
+    )
+
+    @app.post("/ocr/")
+    @app.post("/ocr/batch")
+    @app.post("/other")
+    async def upload(request: Request):
+        return {"size": len(await request.body())}
+
+    return TestClient(app)
+
+
+def _chunks(size, chunk_size=64 * 1024):
+    # A generator body is sent chunked, without a Content-Length
+    for _ in range(size // chunk_size):
+        yield b"x" * chunk_size
+
+
+def test_declared_content_length_over_the_limit():
+    response = _client().post("/ocr/", content=b"x" * (1024 * 1024 + 1))
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request too large. Max 1 MB allowed."}
+
+
+def test_streamed_body_without_content_length_over_the_limit():
+    response = _client().post("/ocr/", content=_chunks(2 * 1024 * 1024))
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request too large. Max 1 MB allowed."}
+
+
+def test_streamed_body_within_the_limit():
+    response = _client().post("/ocr/", content=_chunks(512 * 1024))
+
+    assert response.json() == {"size": 512 * 1024}
+
+
+def test_per_path_limits_and_other_paths():
+    client = _client()
+    body = 1536 * 1024
+
+    assert client.post("/ocr/batch", content=_chunks(body)).status_code == 200
+    assert client.post("/other", content=_chunks(3 * body)).status_code == 200
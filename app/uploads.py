@@ -0,0 +1,55 @@
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware enforcing a request body size limit while receiving.
+
+    A declared ``Content-Length`` over the limit is rejected before anything
+    is read. Otherwise the body is counted as it streams in and parsing stops
+    with 413 as soon as the limit is crossed, so an oversized upload is never
+    buffered or spooled in full.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_body_size: int,
+        limits: Optional[Dict[str, int]] = None,
+        prefix: str = "/ocr",
+    ):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.limits = limits or {}
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"], self.max_body_size)
+        detail = f"Request too large. Max {limit // (1024 * 1024)} MB allowed."
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length", b"").decode()
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised while the form is parsed, FastAPI turns it into
+                    # the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,120 @@
+"""Benchmark spreading requests over several endpoints with PooledProvider.
+
+Starts in-process ``fake_openai_server.py`` replicas that each generate a
+limited number of completions at a time, and measures throughput and
+latency of ``PooledProvider`` as replicas are added, with a slow replica
+in the pool (per balancing strategy), and with a replica that is down.
+
+Usage:
+    python benchmarks/bench_balancer.py [--requests 96] [--concurrency 16]
+        [--latency 0.2] [--capacity 4]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from receipt_ocr.balancer import PooledProvider  # noqa: E402
+from receipt_ocr.processors import ReceiptProcessor  # noqa: E402
+from receipt_ocr.providers import OpenAIProvider  # noqa: E402
+
+SCHEMA = {"merchant_name": "string", "total_amount": "number"}
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+def dead_url() -> str:
+    """Base URL of a port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def run(urls, strategy, requests, concurrency) -> str:
+    providers = [
+        OpenAIProvider(
+            api_key="fake", base_url=url, image_passthrough=False, max_retries=0
+        )
+        for url in urls
+    ]
+    provider = PooledProvider(providers, strategy=strategy, cooldown=60)
+    processor = ReceiptProcessor(provider)
+    image = Image.new("RGB", (320, 480), color="white")
+
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            processor.process_receipt(image, SCHEMA)
+            error = False
+        except Exception:
+            error = True
+        return time.perf_counter() - start, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(requests)))
+    wall = time.perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    errors = sum(error for _, error in results)
+    served = "/".join(str(s["requests"]) for s in provider.pool.stats())
+    return (
+        f"{requests / wall:>8.1f} {statistics.median(latencies) * 1000:>7.0f} "
+        f"{percentile(latencies, 95) * 1000:>7.0f} {errors:>6}  {served}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=96)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--capacity", type=int, default=4)
+    args = parser.parse_args()
+
+    def replica(latency=args.latency):
+        return FakeOpenAIServer(latency=latency, jitter=0.1, capacity=args.capacity)
+
+    header = (
+        f"{'scenario':<28} {'strategy':<18} {'req/s':>8} {'p50 ms':>7} "
+        f"{'p95 ms':>7} {'errors':>6}  requests per endpoint"
+    )
+    print(header)
+    print("-" * len(header))
+    for count in (1, 2, 4):
+        with ExitStack() as stack:
+            urls = [stack.enter_context(replica()).base_url for _ in range(count)]
+            result = run(urls, "least_outstanding", args.requests, args.concurrency)
+            print(f"{f'{count} replica(s)':<28} {'least_outstanding':<18} {result}")
+
+    for strategy in ("least_outstanding", "latency"):
+        with ExitStack() as stack:
+            urls = [stack.enter_context(replica()).base_url for _ in range(2)]
+            urls.append(stack.enter_context(replica(args.latency * 5)).base_url)
+            result = run(urls, strategy, args.requests, args.concurrency)
+            print(f"{'2 replicas + 1 slow':<28} {strategy:<18} {result}")
+
+    with ExitStack() as stack:
+        urls = [stack.enter_context(replica()).base_url for _ in range(2)]
+        urls.append(dead_url())
+        result = run(urls, "least_outstanding", args.requests, args.concurrency)
+        print(f"{'2 replicas + 1 down':<28} {'least_outstanding':<18} {result}")
+
+
+if __name__ == "__main__":
+    main()
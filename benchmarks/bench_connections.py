@@ -0,0 +1,97 @@
+"""Benchmark connection pool settings and warm-up of ``OpenAIProvider``.
+
+Runs ``fake_openai_server.py`` in-process with a per-connection delay that
+stands in for the TCP and TLS handshakes of a remote API, and measures the
+latency of the first ``--concurrency`` receipts sent at once by a cold
+provider, by a provider warmed up with ``warm_up``, and by providers whose
+pool is smaller than the concurrency.
+
+Usage:
+    python benchmarks/bench_connections.py [--concurrency 8] [--latency 0.2]
+        [--connect-latency 0.15]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from receipt_ocr.connections import create_http_client  # noqa: E402
+from receipt_ocr.processors import ReceiptProcessor  # noqa: E402
+from receipt_ocr.providers import OpenAIProvider  # noqa: E402
+
+SCHEMA = {"merchant_name": "string", "total_amount": "number"}
+
+
+def first_receipts(provider, image, concurrency: int) -> list:
+    processor = ReceiptProcessor(provider)
+
+    def timed(_):
+        start = time.perf_counter()
+        processor.process_receipt(image, SCHEMA)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--connect-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    image = Image.open(os.path.join(ROOT, "images", "receipt.jpg"))
+    image.load()
+    concurrency = args.concurrency
+    variants = [
+        ("cold", None, 0),
+        ("warm", None, concurrency),
+        ("pool=2 cold", 2, 0),
+        ("pool=2 warm", 2, concurrency),
+        (f"pool={concurrency} warm", concurrency, concurrency),
+    ]
+
+    header = (
+        f"{'variant':<14} {'warm-up ms':>10} {'p50 ms':>8} {'max ms':>8} {'conns':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, max_connections, warm in variants:
+        with FakeOpenAIServer(
+            latency=args.latency, jitter=0, connect_latency=args.connect_latency
+        ) as server:
+            options = {}
+            if max_connections is not None:
+                options["http_client"] = create_http_client(
+                    max_connections=max_connections
+                )
+            provider = OpenAIProvider(
+                api_key="fake", base_url=server.base_url, **options
+            )
+            warm_up_ms = 0.0
+            if warm:
+                start = time.perf_counter()
+                provider.warm_up(warm)
+                warm_up_ms = (time.perf_counter() - start) * 1000
+            latencies = first_receipts(provider, image, concurrency)
+            print(
+                f"{name:<14} {warm_up_ms:>10.0f} "
+                f"{statistics.median(latencies) * 1000:>8.0f} "
+                f"{max(latencies) * 1000:>8.0f} {server.connection_count:>6}"
+            )
+            provider.client.close()
+
+
+if __name__ == "__main__":
+    main()
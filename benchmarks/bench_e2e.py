@@ -0,0 +1,308 @@
+"""Offline end-to-end benchmark of receipt_ocr against a fake LLM server.
+
+Drives the synchronous and asynchronous ``ReceiptProcessor`` APIs, the
+``receipt-ocr`` CLI and the FastAPI app in ``app/server.py`` against
+``fake_openai_server.py`` (started in a separate process) using the sample ``images/``. It
+reports throughput and p50/p95/p99 latency per target, plus a breakdown of
+the pipeline stages (open, decode, resize, encode, base64, request build,
+HTTP, parse) collected with ``ProcessingReport`` during the processor run.
+
+The "stream" target reports the time to the first streamed field instead of
+the full request latency.
+
+With a fixed fake latency, anything above it is overhead added by this
+project (or by the event loop / thread pool being saturated).
+
+Usage:
+    python benchmarks/bench_e2e.py [--requests 60] [--concurrency 16]
+        [--latency 0.2] [--targets processor,async,stream,cli,server,stages]
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import httpx  # noqa: E402
+
+from receipt_ocr.processors import ReceiptProcessor  # noqa: E402
+from receipt_ocr.providers import AsyncOpenAIProvider, OpenAIProvider  # noqa: E402
+
+SCHEMA = {
+    "merchant_name": "string",
+    "merchant_address": "string",
+    "transaction_date": "string",
+    "transaction_time": "string",
+    "total_amount": "number",
+    "line_items": [
+        {"item_name": "string", "item_quantity": "number", "item_price": "number"}
+    ],
+}
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name: str, latencies: list, wall: float, count: int) -> None:
+    if latencies:
+        p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+        latency = f"{p50:>8.0f} {p95:>8.0f} {p99:>8.0f}"
+    else:
+        latency = f"{'-':>8} {'-':>8} {'-':>8}"
+    print(f"{name:<12} {count:>6} {count / wall:>10.1f} {latency}")
+
+
+def bench_processor(images, base_url, concurrency):
+    provider = OpenAIProvider(api_key="fake", base_url=base_url)
+    processor = ReceiptProcessor(provider, observer=REPORTS.append)
+
+    def timed(image):
+        start = time.perf_counter()
+        processor.process_receipt(image, SCHEMA)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, images))
+    return latencies, time.perf_counter() - start
+
+
+def bench_async(images, base_url, concurrency):
+    provider = AsyncOpenAIProvider(api_key="fake", base_url=base_url)
+    processor = ReceiptProcessor(provider)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(image):
+            async with semaphore:
+                start = time.perf_counter()
+                await processor.aprocess_receipt(image, SCHEMA)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*(timed(image) for image in images))
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run())
+    return list(latencies), time.perf_counter() - start
+
+
+def bench_stream(images, base_url, concurrency):
+    """Time to the first streamed field, the latency a UI would show."""
+    provider = OpenAIProvider(api_key="fake", base_url=base_url)
+    processor = ReceiptProcessor(provider)
+
+    def timed(image):
+        start = time.perf_counter()
+        for _ in processor.stream_receipt(image, SCHEMA):
+            elapsed = time.perf_counter() - start
+            break
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, images))
+    return latencies, time.perf_counter() - start
+
+
+def bench_cli(images, base_url, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        # The CLI de-duplicates paths, so give every request its own file
+        for i, image in enumerate(images):
+            os.link(image, os.path.join(tmp, f"{i:05d}{os.path.splitext(image)[1]}"))
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "receipt_ocr.cli",
+                tmp,
+                "--workers",
+                str(concurrency),
+                "--api_key",
+                "fake",
+                "--base_url",
+                base_url,
+                "--output",
+                os.path.join(tmp, "out.jsonl"),
+            ],
+            check=True,
+            env={**os.environ, "PYTHONPATH": os.path.join(ROOT, "src")},
+        )
+        return [], time.perf_counter() - start
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url).raise_for_status()
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def bench_server(images, base_url, concurrency):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.path.join(ROOT, "src"),
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": base_url,
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "server:app",
+            "--app-dir",
+            os.path.join(ROOT, "app"),
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(f"{url}/health")
+        payloads = {}
+        for image in set(images):
+            with open(image, "rb") as f:
+                payloads[image] = f.read()
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            limits = httpx.Limits(max_connections=concurrency)
+            async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+                async def timed(image):
+                    async with semaphore:
+                        start = time.perf_counter()
+                        response = await client.post(
+                            f"{url}/ocr/",
+                            files={"file": ("r.jpg", payloads[image], "image/jpeg")},
+                        )
+                        response.raise_for_status()
+                        return time.perf_counter() - start
+
+                return await asyncio.gather(*(timed(image) for image in images))
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run())
+        return list(latencies), time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_stages(reports) -> None:
+    """Print the per-stage breakdown collected by ``ProcessingReport``."""
+    stages = {}
+    for report in reports:
+        for name, seconds in report.stages.items():
+            stages.setdefault(name, []).append(seconds)
+
+    print(f"\n{'stage':<12} {'mean ms':>10} {'p95 ms':>10}")
+    for name, values in stages.items():
+        print(
+            f"{name:<12} {statistics.mean(values) * 1000:>10.2f} "
+            f"{percentile(values, 95) * 1000:>10.2f}"
+        )
+    payload = statistics.mean(r.payload_bytes for r in reports)
+    tokens = statistics.mean(r.image_tokens for r in reports)
+    print(f"\nmean payload {payload / 1024:.0f} KiB, ~{tokens:.0f} image tokens")
+
+
+# Reports of the "processor" target, used for the stage breakdown
+REPORTS = []
+
+TARGETS = {
+    "processor": bench_processor,
+    "async": bench_async,
+    "stream": bench_stream,
+    "cli": bench_cli,
+    "server": bench_server,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument(
+        "--targets", default="processor,async,stream,cli,server,stages", type=str
+    )
+    args = parser.parse_args()
+    targets = args.targets.split(",")
+
+    sample = sorted(glob.glob(os.path.join(ROOT, "images", "*")))
+    images = [sample[i % len(sample)] for i in range(args.requests)]
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"fake latency {args.latency * 1000:.0f} ms +/- {args.jitter:.0%}\n"
+    )
+    print(
+        f"{'target':<12} {'count':>6} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    # The fake server runs in its own process so it does not compete with the
+    # code under test for the GIL
+    port = _free_port()
+    fake = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "fake_openai_server.py"
+            ),
+            "--port",
+            str(port),
+            "--latency",
+            str(args.latency),
+            "--jitter",
+            str(args.jitter),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        _wait_until_ready(f"{base_url}/models")
+        for name, bench in TARGETS.items():
+            if name in targets:
+                latencies, wall = bench(images, base_url, args.concurrency)
+                report(name, latencies, wall, len(images))
+    finally:
+        fake.terminate()
+        fake.wait()
+    if "stages" in targets and REPORTS:
+        print_stages(REPORTS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark hedged requests against a backend with a slow tail.
+
+Starts in-process ``fake_openai_server.py`` replicas where a fraction of
+responses is many times slower than the rest, and measures the latency
+percentiles of ``AsyncHedgedProvider`` against a plain provider, along with
+the extra requests the hedges cost and how often they won.
+
+Usage:
+    python benchmarks/bench_hedging.py [--requests 400] [--concurrency 8]
+        [--latency 0.1] [--tail 0.05] [--tail-factor 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from receipt_ocr.balancer import AsyncPooledProvider  # noqa: E402
+from receipt_ocr.hedging import AsyncHedgedProvider, HedgingPolicy  # noqa: E402
+from receipt_ocr.processors import ReceiptProcessor  # noqa: E402
+from receipt_ocr.providers import AsyncOpenAIProvider  # noqa: E402
+
+SCHEMA = {"merchant_name": "string", "total_amount": "number"}
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+async def run(servers, percentile_, max_rate, requests, concurrency) -> str:
+    providers = [
+        AsyncOpenAIProvider(
+            api_key="fake",
+            base_url=server.base_url,
+            image_passthrough=False,
+            max_retries=0,
+        )
+        for server in servers
+    ]
+    provider = providers[0] if len(providers) == 1 else AsyncPooledProvider(providers)
+    policy = None
+    if percentile_:
+        policy = HedgingPolicy(percentile=percentile_, max_hedge_rate=max_rate)
+        provider = AsyncHedgedProvider(provider, policy)
+    processor = ReceiptProcessor(provider)
+    image = Image.new("RGB", (320, 480), color="white")
+    semaphore = asyncio.Semaphore(concurrency)
+    sent_before = sum(server.request_count for server in servers)
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await processor.aprocess_receipt(image, SCHEMA)
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(timed() for _ in range(requests)))
+    sent = sum(server.request_count for server in servers) - sent_before
+    stats = policy.stats() if policy else {"hedge_rate": 0.0, "win_rate": 0.0}
+    return " ".join(
+        [f"{percentile(latencies, q) * 1000:>7.0f}" for q in (50, 95, 99, 100)]
+        + [
+            f"{sent / requests:>6.2f}",
+            f"{stats['hedge_rate'] * 100:>6.1f}%",
+            f"{stats['win_rate'] * 100:>5.0f}%",
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--tail", type=float, default=0.05)
+    parser.add_argument("--tail-factor", type=float, default=10.0)
+    args = parser.parse_args()
+
+    def replica():
+        return FakeOpenAIServer(
+            latency=args.latency,
+            jitter=0.2,
+            tail=args.tail,
+            tail_factor=args.tail_factor,
+        )
+
+    header = (
+        f"{'scenario':<26} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+        f"{'max ms':>7} {'cost':>6} {'hedged':>7} {'won':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    scenarios = [
+        ("1 replica, no hedging", 1, None, 0.0),
+        ("1 replica, p95, max 5%", 1, 95, 0.05),
+        ("1 replica, p90, max 10%", 1, 90, 0.1),
+        ("2 replicas, no hedging", 2, None, 0.0),
+        ("2 replicas, p95, max 5%", 2, 95, 0.05),
+    ]
+    for name, count, percentile_, max_rate in scenarios:
+        with ExitStack() as stack:
+            servers = [stack.enter_context(replica()) for _ in range(count)]
+            result = asyncio.run(
+                run(servers, percentile_, max_rate, args.requests, args.concurrency)
+            )
+            print(f"{name:<26} {result}")
+
+
+if __name__ == "__main__":
+    main()
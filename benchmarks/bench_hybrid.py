@@ -0,0 +1,120 @@
+"""Benchmark hybrid extraction: request size with the image vs local OCR text.
+
+Builds the chat completion request for every photo in ``images/``, and for
+a blurred copy of each, the way ``OpenAIProvider`` does with default
+options: with the full image, with the text read by ``LocalOCR`` (the
+``tesseract_ocr`` pipeline), and with that text plus a low-detail
+thumbnail. Blurred copies are read with a low confidence and fall back to
+the image.
+
+Reports the request body size, the estimated prompt tokens (image tokens
+per OpenAI's tiling rule, 85 for a low-detail image, text at 4 characters
+per token), the local OCR time and the OCR confidence. The LLM latency is
+not measured, it grows with the prompt tokens, see ``bench_e2e.py`` for the
+overhead of this project. Needs tesserocr and its traineddata
+(``TESSDATA_PREFIX``) or the ``tesseract`` binary.
+
+Usage:
+    python benchmarks/bench_hybrid.py [--min-confidence 60]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from receipt_ocr.hybrid import LocalOCR, OCRText  # noqa: E402
+from receipt_ocr.instrumentation import ProcessingReport, collect  # noqa: E402
+from receipt_ocr.providers import OpenAIProvider, _build_request  # noqa: E402
+from receipt_ocr.ratelimit import estimate_request_tokens  # noqa: E402
+
+SCHEMA = {
+    "merchant_name": "string",
+    "merchant_address": "string",
+    "transaction_date": "string",
+    "transaction_time": "string",
+    "total_amount": "number",
+    "line_items": [
+        {"item_name": "string", "item_quantity": "number", "item_price": "number"}
+    ],
+}
+LOW_DETAIL_TOKENS = 85
+
+
+def load_images():
+    images = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "images", "*.jp*g"))):
+        with open(path, "rb") as f:
+            data = f.read()
+        images.append((os.path.basename(path)[:24], data))
+        blurred = cv2.GaussianBlur(cv2.imread(path), (31, 31), 0)
+        images.append(("  blurred", cv2.imencode(".jpg", blurred)[1].tobytes()))
+    return images
+
+
+def measure(image, image_options):
+    """Body size and estimated prompt tokens of the request for an input."""
+    with collect(ProcessingReport()) as report:
+        request = _build_request(image, SCHEMA, image_options=image_options)
+    tokens = estimate_request_tokens(request, completion_tokens=0)
+    if report.image_size is not None:
+        if isinstance(image, OCRText):
+            tokens += LOW_DETAIL_TOKENS
+        else:
+            tokens += report.image_tokens
+    return len(json.dumps(request)), tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-confidence", type=float, default=60.0)
+    args = parser.parse_args()
+    image_options = OpenAIProvider(api_key="unused").image_options
+    text_only = LocalOCR(min_confidence=args.min_confidence)
+    with_thumbnail = LocalOCR(min_confidence=args.min_confidence, thumbnail=True)
+
+    header = (
+        f"{'image':<24} {'conf':>5} {'ocr ms':>7}  {'image KB':>8} {'tokens':>6}"
+        f"  {'text KB':>7} {'tokens':>6}  {'+thumb KB':>9} {'tokens':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    totals = {"image": [], "text": [], "thumbnail": []}
+    for name, data in load_images():
+        image_size, image_tokens = measure(data, image_options)
+        with collect(ProcessingReport()) as report:
+            start = time.perf_counter()
+            prepared = text_only.prepare(data)
+            ocr_time = time.perf_counter() - start
+        text_size, text_tokens = measure(prepared, image_options)
+        thumb_size, thumb_tokens = measure(with_thumbnail.prepare(data), image_options)
+        totals["image"].append(image_tokens)
+        totals["text"].append(text_tokens)
+        totals["thumbnail"].append(thumb_tokens)
+        fallback = " (image sent)" if report.ocr_fallback else ""
+        print(
+            f"{name:<24} {report.ocr_confidence or 0:>5.0f} {ocr_time * 1000:>7.0f}"
+            f"  {image_size / 1024:>8.1f} {image_tokens:>6}"
+            f"  {text_size / 1024:>7.1f} {text_tokens:>6}"
+            f"  {thumb_size / 1024:>9.1f} {thumb_tokens:>6}{fallback}"
+        )
+    mean = statistics.mean(totals["image"])
+    print(
+        f"\nmean prompt tokens: image {mean:.0f}, "
+        f"text {statistics.mean(totals['text']):.0f} "
+        f"({statistics.mean(totals['text']) / mean:.0%}), "
+        f"text + thumbnail {statistics.mean(totals['thumbnail']):.0f} "
+        f"({statistics.mean(totals['thumbnail']) / mean:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
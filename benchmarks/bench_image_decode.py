@@ -0,0 +1,147 @@
+"""Benchmark full-resolution vs reduced-resolution image decoding.
+
+Compares the original decode path (full decode followed by a LANCZOS
+resize) against ``receipt_ocr.utils.encode_image``, which lets the JPEG
+decoder downscale while decoding. Each measurement runs in a fresh
+process so peak RSS is attributable to a single variant.
+
+Usage:
+    python benchmarks/bench_image_decode.py [--repeat N] [images ...]
+"""
+
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from PIL import Image  # noqa: E402
+
+from receipt_ocr.utils import encode_image  # noqa: E402
+
+MAX_SIZE = 1080
+
+
+def full_decode(path: str) -> str:
+    """The original path: decode at full resolution, then resample."""
+    pil_image = Image.open(path)
+    if pil_image.mode not in ("RGB", "L"):
+        pil_image = pil_image.convert("RGB")
+    w, h = pil_image.size
+    if max(w, h) > MAX_SIZE:
+        if w > h:
+            size = (MAX_SIZE, int(h * MAX_SIZE / w))
+        else:
+            size = (int(w * MAX_SIZE / h), MAX_SIZE)
+        pil_image = pil_image.resize(size, Image.Resampling.LANCZOS)
+    buffered = io.BytesIO()
+    pil_image.save(buffered, format="JPEG", quality=90)
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def reduced_decode(path: str) -> str:
+    """The draft-mode/reduce() path used by the providers."""
+    return encode_image(path, MAX_SIZE, image_format="jpeg", quality=90)[0]
+
+
+VARIANTS = {"full": full_decode, "reduced": reduced_decode}
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss survives fork/exec on Linux, VmHWM is reset for the new process
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(variant: str, path: str, repeat: int) -> dict:
+    """Measure one variant on one image in the current process."""
+    func = VARIANTS[variant]
+    baseline_rss = _max_rss_mb()
+    # Warm up codecs and allocator pools before timing
+    func(path)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(timings),
+        "peak_rss_mb": _max_rss_mb() - baseline_rss,
+    }
+
+
+def make_large_images(directory: str) -> list:
+    """Upscale a sample image to typical phone camera resolutions."""
+    source = Image.open(os.path.join(ROOT, "images", "receipt.jpg")).convert("RGB")
+    paths = []
+    for megapixels in (12, 48):
+        scale = (megapixels * 1_000_000 / (source.width * source.height)) ** 0.5
+        size = (int(source.width * scale), int(source.height * scale))
+        path = os.path.join(directory, f"synthetic-{megapixels}mp.jpg")
+        source.resize(size, Image.Resampling.BICUBIC).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*", help="Images to benchmark.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--measure", nargs=2, metavar=("VARIANT", "IMAGE"))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = args.images or sorted(glob.glob(os.path.join(ROOT, "images", "*")))
+        if not args.images:
+            images += make_large_images(tmp)
+
+        header = f"{'image':<44} {'size':>11} {'variant':>8} {'median ms':>10} {'peak MB':>8}"
+        print(header)
+        print("-" * len(header))
+        for path in images:
+            with Image.open(path) as im:
+                size = f"{im.width}x{im.height}"
+            for variant in VARIANTS:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--repeat",
+                        str(args.repeat),
+                        "--measure",
+                        variant,
+                        path,
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{os.path.basename(path):<44} {size:>11} {variant:>8} "
+                    f"{result['median_ms']:>10.1f} {result['peak_rss_mb']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark parsing and serializing large receipts.
+
+Compares the original ``ReceiptParser.parse`` (fixed-offset fence slicing,
+then ``json.loads``) with the tolerant extractor, using the standard library
+and, when installed, ``orjson``; and the stdlib ``JSONResponse`` rendering
+with ``receipt_ocr.utils.json_dumps``. Receipts have hundreds to thousands of
+line items and come bare, fenced, fenced without newlines and followed by
+prose, which the original parser fails on.
+
+Usage:
+    python benchmarks/bench_json.py [--repeat 50] [--items 100,500,2000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from receipt_ocr import utils  # noqa: E402
+from receipt_ocr.parsers import ReceiptParser  # noqa: E402
+
+
+def original_parse(response: str) -> dict:
+    """``ReceiptParser.parse`` before the tolerant extractor."""
+    try:
+        response = response.strip()
+        if response.startswith("```json"):
+            response = response[7:-4]
+        elif response.startswith("```"):
+            response = response[3:-3]
+        return json.loads(response)
+    except json.JSONDecodeError:
+        return {"error": "The LLM's response was not valid JSON."}
+
+
+def make_receipt(items: int) -> dict:
+    return {
+        "merchant_name": "Saathimart.com",
+        "merchant_address": "Narephat, Kathmandu",
+        "transaction_date": "2024-05-07",
+        "transaction_time": "09:09:00",
+        "total_amount": round(items * 12.75, 2),
+        "line_items": [
+            {
+                "item_name": f"ITEM {i} – ÉPICERIE",
+                "item_quantity": i % 5 + 1,
+                "item_price": round(1.25 + i * 0.5, 2),
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def wrappers(body: str) -> dict:
+    return {
+        "bare": body,
+        "fenced": f"```json\n{body}\n```",
+        "fenced-inline": f"```json{body}```",
+        "trailing-prose": f"```json\n{body}\n```\nLet me know if you need more.",
+    }
+
+
+def timeit(func, arg, repeat: int) -> float:
+    func(arg)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--items", default="100,500,2000")
+    args = parser.parse_args()
+
+    try:
+        from starlette.responses import JSONResponse
+    except ImportError:
+        JSONResponse = None
+
+    new_parser = ReceiptParser()
+    backends = {"stdlib": None}
+    if utils.orjson is not None:
+        backends["orjson"] = utils.orjson
+    else:
+        print("orjson is not installed, only the stdlib backend is measured\n")
+
+    header = (
+        f"{'items':>6} {'wrapper':<15} {'KiB':>6} {'variant':<16} {'ms':>8} {'ok':>3}"
+    )
+    print(header)
+    print("-" * len(header))
+    for items in (int(n) for n in args.items.split(",")):
+        receipt = make_receipt(items)
+        body = json.dumps(receipt, indent=2, ensure_ascii=False)
+        for wrapper, text in wrappers(body).items():
+            # The original parser does not use the backend
+            variants = [("original", None, original_parse)] + [
+                (f"tolerant/{name}", backend, new_parser.parse)
+                for name, backend in backends.items()
+            ]
+            for variant, backend, func in variants:
+                with patch.object(utils, "orjson", backend):
+                    ms = timeit(func, text, args.repeat)
+                    ok = func(text) == receipt
+                print(
+                    f"{items:>6} {wrapper:<15} {len(text) / 1024:>6.0f} "
+                    f"{variant:<16} {ms:>8.3f} {'yes' if ok else 'no':>3}"
+                )
+
+        print()
+        if JSONResponse is not None:
+            ms = timeit(lambda r: JSONResponse(r).body, receipt, args.repeat)
+            print(
+                f"{items:>6} {'serialize':<15} {'':>6} {'JSONResponse':<16} {ms:>8.3f}"
+            )
+        for name, backend in backends.items():
+            with patch.object(utils, "orjson", backend):
+                ms = timeit(utils.json_dumps, receipt, args.repeat)
+            print(
+                f"{items:>6} {'serialize':<15} {'':>6} {'dumps/' + name:<16} {ms:>8.3f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
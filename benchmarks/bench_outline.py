@@ -0,0 +1,217 @@
+"""Benchmark receipt-outline detection of ``perform_ocr``: success rate and time.
+
+Builds a fixture set from the photos in ``images/``: each photo as is and
+rotated, scaled down and up, tilted, blurred, noisy, with low contrast,
+with a corner occluded, on a cluttered background, and cropped to the
+receipt. The expected outline is known for every fixture, it is the
+outline found on the original photo carried through the same transform
+(the whole frame for crops).
+
+Detection counts as a success when the outline found covers the expected
+one with an intersection over union of at least ``--iou``. The original
+detection (fixed 500px width, every contour sorted, raising when no
+four-point contour is found) is compared with ``find_receipt_outline``.
+
+Usage:
+    python benchmarks/bench_outline.py [--iou 0.85] [--repeat 5] [--verbose]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+import cv2
+import imutils
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from tesseract_ocr.utils import find_receipt_outline  # noqa: E402
+
+
+def legacy_outline(img_orig):
+    """The detection stage of ``perform_ocr`` before it was restructured."""
+    image = img_orig.copy()
+    image = imutils.resize(image, width=500)
+    ratio = img_orig.shape[1] / float(image.shape[1])
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edged = cv2.Canny(blurred, 75, 200)
+    cnts = cv2.findContours(edged.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cnts = imutils.grab_contours(cnts)
+    cnts = sorted(cnts, key=cv2.contourArea, reverse=True)
+    for c in cnts:
+        peri = cv2.arcLength(c, True)
+        approx = cv2.approxPolyDP(c, 0.02 * peri, True)
+        if len(approx) == 4:
+            return approx.reshape(4, 2) * ratio, "contour"
+    raise Exception("Could not find receipt outline.")
+
+
+def _warp_points(points, matrix):
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if matrix.shape == (2, 3):
+        return cv2.transform(points, matrix).reshape(-1, 2)
+    return cv2.perspectiveTransform(points, matrix).reshape(-1, 2)
+
+
+def rotate(image, truth, angle):
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    size = (int(height * sin + width * cos), int(height * cos + width * sin))
+    matrix[0, 2] += size[0] / 2 - width / 2
+    matrix[1, 2] += size[1] / 2 - height / 2
+    rotated = cv2.warpAffine(image, matrix, size, borderMode=cv2.BORDER_REPLICATE)
+    return rotated, _warp_points(truth, matrix)
+
+
+def tilt(image, truth, amount):
+    height, width = image.shape[:2]
+    source = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    inset = amount * width
+    target = np.float32([[inset, 0], [width - inset, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(source, target)
+    tilted = cv2.warpPerspective(
+        image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE
+    )
+    return tilted, _warp_points(truth, matrix)
+
+
+def occlude_corner(image, truth):
+    occluded = image.copy()
+    corner = truth[np.argmin(truth.sum(axis=1))]
+    radius = int(0.08 * image.shape[1])
+    # Something dark lying over the top left corner of the receipt
+    cv2.circle(occluded, tuple(int(v) for v in corner), radius, (40, 40, 40), -1)
+    return occluded, truth
+
+
+def clutter(image, truth, rng):
+    cluttered = image.copy()
+    height, width = image.shape[:2]
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(mask, [truth.astype(np.int32)], 255)
+    for _ in range(40):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if mask[y, x]:
+            continue
+        size = int(rng.integers(width // 40, width // 12))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(cluttered, (x, y), (x + size, y + size // 2), color, 2)
+    return cluttered, truth
+
+
+def build_fixtures(seed=0):
+    """Yield (name, image, expected corners) for the photos in ``images/``."""
+    rng = np.random.default_rng(seed)
+    for path in sorted(glob.glob(os.path.join(ROOT, "images", "*.jp*g"))):
+        name = os.path.splitext(os.path.basename(path))[0][:20]
+        image = cv2.imread(path)
+        truth = np.asarray(legacy_outline(image)[0], dtype=np.float32)
+        height, width = image.shape[:2]
+
+        yield f"{name}/original", image, truth
+        for angle in (-20, 8, 90):
+            yield f"{name}/rotate{angle}", *rotate(image, truth, angle)
+        for factor in (0.35, 2.0):
+            resized = cv2.resize(image, None, fx=factor, fy=factor)
+            yield f"{name}/scale{factor}", resized, truth * factor
+        yield f"{name}/tilt", *tilt(image, truth, 0.12)
+        yield f"{name}/blur", cv2.GaussianBlur(image, (9, 9), 0), truth
+        noise = rng.normal(0, 12, image.shape)
+        noisy = np.clip(image + noise, 0, 255).astype(np.uint8)
+        yield f"{name}/noise", noisy, truth
+        low = cv2.convertScaleAbs(image, alpha=0.5, beta=64)
+        yield f"{name}/low-contrast", low, truth
+        yield f"{name}/occluded", *occlude_corner(image, truth)
+        yield f"{name}/clutter", *clutter(image, truth, rng)
+
+        x, y, w, h = cv2.boundingRect(truth.astype(np.int32))
+        margin_x, margin_y = int(0.03 * w), int(0.03 * h)
+        crop = image[y + margin_y : y + h - margin_y, x + margin_x : x + w - margin_x]
+        crop_truth = np.float32(
+            [
+                [0, 0],
+                [crop.shape[1], 0],
+                [crop.shape[1], crop.shape[0]],
+                [0, crop.shape[0]],
+            ]
+        )
+        yield f"{name}/cropped", crop, crop_truth
+
+
+def iou(a, b, shape):
+    """Intersection over union of two quadrilaterals, on a 1000px canvas."""
+    scale = 1000 / max(shape[:2])
+    size = (int(shape[0] * scale) + 1, int(shape[1] * scale) + 1)
+    masks = []
+    for quad in (a, b):
+        mask = np.zeros(size, dtype=np.uint8)
+        cv2.fillPoly(mask, [(np.asarray(quad) * scale).astype(np.int32)], 1)
+        masks.append(mask)
+    union = np.logical_or(*masks).sum()
+    return np.logical_and(*masks).sum() / union if union else 0.0
+
+
+def evaluate(detect, fixtures, threshold, repeat):
+    successes, methods, timings, failures = 0, Counter(), [], []
+    for name, image, truth in fixtures:
+        try:
+            corners, method = detect(image)
+        except Exception:
+            corners, method = None, "raised"
+        start = time.perf_counter()
+        for _ in range(repeat):
+            try:
+                detect(image)
+            except Exception:
+                pass
+        timings.append((time.perf_counter() - start) / repeat)
+        methods[method] += 1
+        score = iou(corners, truth, image.shape) if corners is not None else 0.0
+        if score >= threshold:
+            successes += 1
+        else:
+            failures.append(f"{name} ({method}, IoU {score:.2f})")
+    return successes, methods, timings, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iou", type=float, default=0.85)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    fixtures = list(build_fixtures())
+
+    header = (
+        f"{'detection':<10} {'success':>9} {'mean ms':>8} {'p95 ms':>7} {'max ms':>7}"
+        "  outlines by method"
+    )
+    print(f"{len(fixtures)} fixtures, success at IoU >= {args.iou}")
+    print(header)
+    print("-" * len(header))
+    for label, detect in (("original", legacy_outline), ("new", find_receipt_outline)):
+        successes, methods, timings, failures = evaluate(
+            detect, fixtures, args.iou, args.repeat
+        )
+        p95 = sorted(timings)[max(0, round(0.95 * len(timings)) - 1)]
+        print(
+            f"{label:<10} {f'{successes}/{len(fixtures)}':>9} "
+            f"{statistics.mean(timings) * 1000:>8.1f} {p95 * 1000:>7.1f} "
+            f"{max(timings) * 1000:>7.1f}  "
+            + ", ".join(f"{method} {count}" for method, count in methods.most_common())
+        )
+        if args.verbose:
+            for failure in failures:
+                print(f"    failed: {failure}")
+
+
+if __name__ == "__main__":
+    main()
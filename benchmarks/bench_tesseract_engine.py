@@ -0,0 +1,109 @@
+"""Benchmark Tesseract backends: pytesseract vs a persistent tesserocr engine.
+
+Recognizes the sample receipts in ``images/`` with:
+
+- pytesseract, which writes each image to a temporary file and starts the
+  ``tesseract`` binary, loading the language model every time
+- a tesserocr instance created per image, loading the model every time but
+  in process
+- the persistent ``TesseractEngine`` used by ``perform_ocr``, with the model
+  loaded once and images passed in memory
+
+and reports the time per image and whether the texts match pytesseract's.
+A backend that is not installed (the ``tesseract`` binary, or tesserocr and
+its traineddata, see ``TESSDATA_PREFIX``) is skipped.
+
+Usage:
+    python benchmarks/bench_tesseract_engine.py [--repeat 3] [--width 800]
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import imutils
+import pytesseract
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from tesseract_ocr.engine import TesseractEngine  # noqa: E402
+
+
+def load_images(width):
+    images = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "images", "*.jp*g"))):
+        image = imutils.resize(cv2.imread(path), width=width)
+        images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return images
+
+
+def bench(recognize, images, repeat):
+    """Time ``recognize`` per image, the first pass is kept as warm-up."""
+    texts = [recognize(image) for image in images]
+    timings = []
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            recognize(image)
+            timings.append(time.perf_counter() - start)
+    return texts, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--width", type=int, default=800)
+    args = parser.parse_args()
+    images = load_images(args.width)
+
+    backends = []
+    try:
+        pytesseract.get_tesseract_version()
+        backends.append(
+            (
+                "pytesseract (subprocess)",
+                lambda image: pytesseract.image_to_string(image, config="--psm 6"),
+            )
+        )
+    except pytesseract.TesseractNotFoundError:
+        print("pytesseract: tesseract binary not found, skipped")
+    try:
+        engine = TesseractEngine()
+
+        def per_image(image):
+            fresh = TesseractEngine()
+            try:
+                return fresh.image_to_string(image)
+            finally:
+                fresh.close()
+
+        backends.append(("tesserocr, new per image", per_image))
+        backends.append(("tesserocr, persistent", engine.image_to_string))
+    except RuntimeError as e:
+        print(f"tesserocr: {e}, skipped")
+
+    header = f"{'backend':<26} {'ms/image':>9} {'p95 ms':>8} {'speedup':>8} {'same text':>10}"
+    print(f"{len(images)} images, {args.width}px wide, {args.repeat} repeats")
+    print(header)
+    print("-" * len(header))
+    baseline_texts = baseline_time = None
+    for name, recognize in backends:
+        texts, timings = bench(recognize, images, args.repeat)
+        mean = statistics.mean(timings)
+        baseline_texts = baseline_texts or texts
+        baseline_time = baseline_time or mean
+        same = sum(a.strip() == b.strip() for a, b in zip(texts, baseline_texts))
+        p95 = sorted(timings)[max(0, round(0.95 * len(timings)) - 1)]
+        print(
+            f"{name:<26} {mean * 1000:>9.0f} {p95 * 1000:>8.0f} "
+            f"{baseline_time / mean:>7.2f}x {f'{same}/{len(texts)}':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Benchmark the tesseract OCR API with OCR in the event loop vs a process pool.
+
+Starts ``tesseract_ocr.app`` under uvicorn with 1 and ``os.cpu_count()``
+OCR worker processes, plus a variant that runs ``perform_ocr`` inline in
+the handler as the API used to, sends concurrent ``/ocr/`` requests for the
+sample images and probes ``/health`` meanwhile. Reports OCR throughput and
+how long ``/health`` took to answer under that load. Requests the pool
+sheds with 503 are counted as rejected.
+
+Requires the ``tesseract`` binary; without it requests fail after the
+OpenCV stage and are counted as errors.
+
+Usage:
+    python benchmarks/bench_tesseract_pool.py [--requests 48] [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, UploadFile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# The API before OCR moved to a process pool, for comparison
+inline_app = FastAPI()
+
+
+@inline_app.get("/health")
+async def inline_health():
+    return {"status": "ok"}
+
+
+@inline_app.post("/ocr/")
+async def inline_ocr(file: UploadFile):
+    from tesseract_ocr.utils import perform_ocr
+
+    image_bytes = await file.read()
+    return {"result": perform_ocr(np.frombuffer(image_bytes, np.uint8))}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url).raise_for_status()
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def load(url, payloads, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    health = []
+    done = asyncio.Event()
+    async with httpx.AsyncClient(timeout=120) as client:
+
+        async def ocr(index):
+            async with semaphore:
+                try:
+                    response = await client.post(
+                        f"{url}/ocr/",
+                        files={
+                            "file": (
+                                "r.jpg",
+                                payloads[index % len(payloads)],
+                                "image/jpeg",
+                            )
+                        },
+                    )
+                except httpx.TransportError:
+                    # A blocked event loop outlives the keep-alive timeouts
+                    return None
+                return response.status_code
+
+        async def probe():
+            # A new connection per probe, like a load balancer's health check
+            limits = httpx.Limits(max_keepalive_connections=0)
+            async with httpx.AsyncClient(timeout=120, limits=limits) as prober:
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await prober.get(f"{url}/health")
+                    health.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.05)
+
+        prober = asyncio.ensure_future(probe())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(ocr(index) for index in range(requests)))
+        wall = time.perf_counter() - start
+        done.set()
+        await prober
+    return wall, results, health
+
+
+def run(app, workers, payloads, requests, concurrency) -> str:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            [os.path.join(ROOT, "src"), os.path.join(ROOT, "benchmarks")]
+        ),
+        "OCR_WORKERS": str(workers or 0),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port)]
+        + ["--log-level", "critical"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(f"{url}/health")
+        wall, statuses, health = asyncio.run(load(url, payloads, requests, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+    return (
+        f"{statuses.count(200) / wall:>8.1f} {statuses.count(503):>8} "
+        f"{len(statuses) - statuses.count(200) - statuses.count(503):>6} "
+        f"{statistics.median(health) * 1000:>9.1f} {max(health) * 1000:>9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "images", "*.jp*g"))):
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+
+    cores = os.cpu_count() or 1
+    header = (
+        f"{'mode':<24} {'img/s':>8} {'rejected':>8} {'errors':>6} "
+        f"{'health p50':>9} {'health max':>9}"
+    )
+    print(f"{cores} core(s)")
+    print(header)
+    print("-" * len(header))
+    scenarios = [("inline", "bench_tesseract_pool:inline_app", None)]
+    for workers in sorted({1, cores}):
+        scenarios.append(
+            (f"pool, {workers} worker(s)", "tesseract_ocr.app:app", workers)
+        )
+    for name, app, workers in scenarios:
+        result = run(app, workers, payloads, args.requests, args.concurrency)
+        print(f"{name:<24} {result}")
+
+
+if __name__ == "__main__":
+    main()
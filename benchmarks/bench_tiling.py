@@ -0,0 +1,131 @@
+"""Benchmark tiled extraction of long receipts: legibility, latency, merging.
+
+Simulates receipts from a thermal printer (576 pixels wide, one line item
+per 32 pixel row) of increasing length. For each one, reports the text
+height once the image sent to the LLM is scaled to ``max_image_size``, sent
+whole vs as the tiles of ``Tiler``, and the latency of ``ReceiptProcessor``
+against a fake provider whose delay grows with the items it reads, like
+the completion tokens of a real model. The fake provider reads the items
+fully inside each tile and an item cut by a tile's edge without its price,
+so the merged line items are checked against the receipt.
+
+Usage:
+    python benchmarks/bench_tiling.py [--item-latency 0.02]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from receipt_ocr.constants import _DEFAULT_MAX_IMAGE_SIZE  # noqa: E402
+from receipt_ocr.processors import ReceiptProcessor  # noqa: E402
+from receipt_ocr.providers import OpenAIProvider  # noqa: E402
+from receipt_ocr.tiling import ReceiptTile, Tiler  # noqa: E402
+
+WIDTH = 576
+ROW_HEIGHT = 32
+TEXT_HEIGHT = 20
+HEADER_ROWS = 4
+
+
+def receipt_items(rows):
+    return [
+        {"item_name": f"Item {i:03d}", "item_quantity": 1, "item_price": 1 + i / 100}
+        for i in range(rows)
+    ]
+
+
+class FakeProvider(OpenAIProvider):
+    """Reads the line items visible in an image, taking ``base_latency`` plus
+    ``item_latency`` per item."""
+
+    def __init__(self, items, base_latency, item_latency):
+        self.items = items
+        self.base_latency = base_latency
+        self.item_latency = item_latency
+
+    def get_response(self, image, json_schema, model=None, response_format_type=None):
+        if isinstance(image, ReceiptTile):
+            # Recover the tile's position from its crop box
+            top = image.image.info["top"]
+            bottom = top + image.image.size[1]
+        else:
+            top, bottom = 0, image.size[1]
+        read = []
+        for i, item in enumerate(self.items):
+            row_top = (HEADER_ROWS + i) * ROW_HEIGHT
+            row_bottom = row_top + TEXT_HEIGHT
+            if row_top >= top and row_bottom <= bottom:
+                read.append(item)
+            elif row_top < bottom and row_bottom > top:
+                read.append({**item, "item_price": None})
+        result = {
+            "merchant_name": "Big Mart" if top == 0 else None,
+            "line_items": read,
+        }
+        time.sleep(self.base_latency + self.item_latency * len(read))
+        message = SimpleNamespace(content=json.dumps(result))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class PositionTiler(Tiler):
+    """Tiler recording where each crop starts, for the fake provider."""
+
+    def split(self, image):
+        tiles = super().split(image)
+        if tiles:
+            bounds = self.tile_bounds(*image.size)
+            for tile, (top, _) in zip(tiles, bounds):
+                tile.image.info["top"] = top
+        return tiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--item-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    header = (
+        f"{'rows':>5} {'height':>7} {'tiles':>5}  {'text px whole':>13} "
+        f"{'tiled':>6}  {'latency whole':>13} {'tiled':>6}  {'items ok':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for rows in (30, 60, 120, 240):
+        items = receipt_items(rows)
+        height = (HEADER_ROWS + rows + 4) * ROW_HEIGHT
+        image = Image.new("L", (WIDTH, height), 255)
+        provider = FakeProvider(items, args.base_latency, args.item_latency)
+        tiler = PositionTiler()
+        bounds = tiler.tile_bounds(WIDTH, height)
+        tile_height = bounds[0][1] - bounds[0][0] if bounds else height
+
+        latencies = {}
+        for name, processor in (
+            ("whole", ReceiptProcessor(provider)),
+            ("tiled", ReceiptProcessor(provider, tiler=tiler)),
+        ):
+            start = time.perf_counter()
+            result = processor.process_receipt(image, {})
+            latencies[name] = time.perf_counter() - start
+        whole_px = TEXT_HEIGHT * min(1, _DEFAULT_MAX_IMAGE_SIZE / height)
+        tiled_px = TEXT_HEIGHT * min(1, _DEFAULT_MAX_IMAGE_SIZE / tile_height)
+        print(
+            f"{rows:>5} {height:>7} {len(bounds or [None]):>5}"
+            f"  {whole_px:>13.1f} {tiled_px:>6.1f}"
+            f"  {latencies['whole']:>12.2f}s {latencies['tiled']:>5.2f}s"
+            f"  {str(result['line_items'] == items):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark peak memory of turning an upload into the request's data URL.
+
+Compares the server's previous upload path (read the spooled upload into
+``bytes``, ``encode_image``, then an f-string data URL) with the current
+one (``encode_image_to_data_url`` reading the spooled upload in place).
+Uploads are held in a ``SpooledTemporaryFile`` with Starlette's 1 MB spool
+threshold, like ``UploadFile``. Each measurement runs in a fresh process so
+peak RSS is attributable to a single variant.
+
+Usage:
+    python benchmarks/bench_upload_memory.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from tempfile import SpooledTemporaryFile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from receipt_ocr.utils import encode_image, encode_image_to_data_url  # noqa: E402
+
+# Starlette's default spool threshold for uploaded files
+SPOOL_MAX_SIZE = 1024 * 1024
+OPTIONS = {"max_size": 1080, "image_format": "jpeg", "quality": 90}
+
+
+def spool(path: str) -> SpooledTemporaryFile:
+    upload = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    with open(path, "rb") as f:
+        shutil.copyfileobj(f, upload)
+    upload.seek(0)
+    return upload
+
+
+def bytes_path(upload) -> str:
+    """The previous server path: the upload is read into memory first."""
+    upload.seek(0, 2)
+    upload.tell()
+    upload.seek(0)
+    image_bytes = upload.read()
+    img_str, mime_type = encode_image(image_bytes, passthrough=True, **OPTIONS)
+    return f"data:{mime_type};base64,{img_str}"
+
+
+def spooled_path(upload) -> str:
+    """The current server path: PIL reads the spooled upload in place."""
+    return encode_image_to_data_url(upload, passthrough=True, **OPTIONS)
+
+
+VARIANTS = {"bytes": bytes_path, "spooled": spooled_path}
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss survives fork/exec on Linux, VmHWM is reset for the new process
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(variant: str, path: str, repeat: int) -> dict:
+    """Measure one variant on one upload in the current process."""
+    func = VARIANTS[variant]
+    # Warm up codecs and allocator pools on a small image before the baseline
+    small = Image.new("RGB", (64, 64))
+    encode_image(small, image_format="jpeg")
+    baseline_rss = _max_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        upload = spool(path)
+        start = time.perf_counter()
+        url = func(upload)
+        timings.append((time.perf_counter() - start) * 1000)
+        upload.close()
+        del url
+    return {
+        "median_ms": statistics.median(timings),
+        "peak_rss_mb": _max_rss_mb() - baseline_rss,
+    }
+
+
+def make_uploads(directory: str) -> list:
+    """A large phone photo that is re-encoded and a small one passed through."""
+    source = Image.open(os.path.join(ROOT, "images", "receipt.jpg")).convert("RGB")
+    # Noise keeps the JPEG from compressing unrealistically well when upscaled
+    large = source.resize((2448, 3264), Image.Resampling.BICUBIC)
+    noise = Image.effect_noise(large.size, 24).convert("RGB")
+    large = Image.blend(large, noise, 0.25)
+    large_path = os.path.join(directory, "upload-large.jpg")
+    large.save(large_path, quality=95)
+
+    small = source.copy()
+    small.thumbnail((1080, 1080))
+    small = Image.blend(small, Image.effect_noise(small.size, 24).convert("RGB"), 0.1)
+    small_path = os.path.join(directory, "upload-passthrough.jpg")
+    small.filter(ImageFilter.SHARPEN).save(small_path, quality=95)
+    return [large_path, small_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--measure", nargs=2, metavar=("VARIANT", "IMAGE"))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        header = (
+            f"{'upload':<24} {'KiB':>6} {'variant':>8} {'median ms':>10} {'peak MB':>8}"
+        )
+        print(header)
+        print("-" * len(header))
+        for path in make_uploads(tmp):
+            for variant in VARIANTS:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--repeat",
+                        str(args.repeat),
+                        "--measure",
+                        variant,
+                        path,
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{os.path.basename(path):<24} "
+                    f"{os.path.getsize(path) / 1024:>6.0f} {variant:>8} "
+                    f"{result['median_ms']:>10.1f} {result['peak_rss_mb']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark schema validation and coercion of extracted receipts.
+
+Times ``get_validator(schema).validate`` on receipts with hundreds to
+thousands of line items, whose numbers, dates and times come as strings in
+mixed formats, against compiling the validator on every call and, when it is
+installed, validation alone with ``jsonschema``.
+
+Usage:
+    python benchmarks/bench_validation.py [--repeat 50] [--items 10,100,1000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from receipt_ocr.validation import SchemaValidator, get_validator  # noqa: E402
+
+SHORTHAND_SCHEMA = {
+    "merchant_name": "string",
+    "merchant_address": "string",
+    "transaction_date": "string",
+    "transaction_time": "string",
+    "total_amount": "number",
+    "line_items": [
+        {"item_name": "string", "item_quantity": "number", "item_price": "number"}
+    ],
+}
+
+JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "merchant_name": {"type": "string"},
+        "merchant_address": {"type": "string"},
+        "transaction_date": {"type": "string", "format": "date"},
+        "transaction_time": {"type": "string", "format": "time"},
+        "total_amount": {"type": "number"},
+        "line_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "item_name": {"type": "string"},
+                    "item_quantity": {"type": "number"},
+                    "item_price": {"type": "number"},
+                },
+                "required": ["item_name", "item_quantity", "item_price"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["merchant_name", "total_amount", "line_items"],
+}
+
+PRICES = ("$1,234.50", "12,50 €", "4.25", 3.5, "Rs. 1,200")
+DATES = ("05/07/2024", "May 7, 2024", "2024-05-07")
+
+
+def make_receipt(items: int) -> dict:
+    return {
+        "merchant_name": "Saathimart.com",
+        "merchant_address": "Narephat, Kathmandu",
+        "transaction_date": DATES[items % len(DATES)],
+        "transaction_time": "9:09 PM",
+        "total_amount": f"${items * 12.75:,.2f}",
+        "line_items": [
+            {
+                "item_name": f"ITEM {i}",
+                "item_quantity": str(i % 5 + 1) if i % 2 else i % 5 + 1,
+                "item_price": PRICES[i % len(PRICES)],
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def timeit(func, repeat: int) -> float:
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--items", default="10,100,1000")
+    args = parser.parse_args()
+
+    try:
+        import jsonschema
+    except ImportError:
+        jsonschema = None
+        print("jsonschema is not installed, it is not measured\n")
+
+    header = f"{'items':>6} {'schema':<10} {'variant':<22} {'ms':>8} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for items in (int(n) for n in args.items.split(",")):
+        receipt = make_receipt(items)
+        for name, schema in (("shorthand", SHORTHAND_SCHEMA), ("json", JSON_SCHEMA)):
+            variants = {
+                "compiled (cached)": lambda: get_validator(schema).validate(receipt),
+                "compiled per call": lambda: SchemaValidator(schema).validate(receipt),
+            }
+            if jsonschema is not None and name == "json":
+                validator = jsonschema.Draft7Validator(schema)
+                variants["jsonschema (no coerce)"] = lambda: list(
+                    validator.iter_errors(receipt)
+                )
+            for variant, func in variants.items():
+                ms = timeit(func, args.repeat)
+                result = func()
+                errors = len(result) if isinstance(result, list) else len(result.errors)
+                print(f"{items:>6} {name:<10} {variant:<22} {ms:>8.3f} {errors:>7}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""A local stand-in for an OpenAI-compatible chat completions API.
+
+Answers ``POST .../chat/completions`` with a canned receipt after a
+configurable delay (streamed in small chunks when the request asks for
+``stream``), so benchmarks measure this project's own overhead
+instead of network and model variance. It can be started from the command
+line or used as a context manager:
+
+    with FakeOpenAIServer(latency=0.2) as server:
+        provider = OpenAIProvider(api_key="fake", base_url=server.base_url)
+
+Usage:
+    python benchmarks/fake_openai_server.py [--port 8001] [--latency 0.2]
+        [--connect-latency 0.1] [--capacity 4] [--tail 0.05]
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+CANNED_RECEIPT = {
+    "merchant_name": "Saathimart.com",
+    "merchant_address": "Narephat, Kathmandu",
+    "transaction_date": "2024-05-07",
+    "transaction_time": "09:09:00",
+    "total_amount": 185.0,
+    "line_items": [
+        {"item_name": "COLGATE DENTAL", "item_quantity": 1, "item_price": 95.0},
+        {"item_name": "PATANJALI ANTI", "item_quantity": 1, "item_price": 70.0},
+        {"item_name": "GODREJ NO 1 SOAP", "item_quantity": 1, "item_price": 20.0},
+    ],
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Once per connection, like a TCP and TLS handshake to a remote API
+        with self.server.lock:
+            self.server.connection_count += 1
+        time.sleep(self.server.connect_latency)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(
+        self, request: dict, request_id: int, content: str, latency: float
+    ) -> None:
+        """Send the completion as server-sent chunks spread over ``latency``."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        base = {
+            "id": f"chatcmpl-fake-{request_id}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+        }
+        # Roughly one token per chunk, the first one after a tenth of the delay
+        pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+        time.sleep(latency * 0.1)
+        delay = latency * 0.9 / max(1, len(pieces))
+        for piece in pieces:
+            choice = {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+            self._send_event({**base, "choices": [choice]})
+            time.sleep(delay)
+        usage = {
+            "prompt_tokens": 0,
+            "completion_tokens": len(pieces),
+            "total_tokens": len(pieces),
+        }
+        self._send_event({**base, "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, payload: dict) -> None:
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": []})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        server = self.server
+        request = json.loads(body)
+        with server.lock:
+            server.request_count += 1
+            server.request_bytes += length
+            request_id = server.request_count
+        content = json.dumps(server.response)
+        if request.get("stream"):
+            try:
+                with server.slots:
+                    self._send_stream(
+                        request, request_id, content, server.sample_latency()
+                    )
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading, e.g. after the first field
+                pass
+            return
+        # Requests beyond the capacity queue like on a saturated replica
+        with server.slots:
+            time.sleep(server.sample_latency())
+
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-fake-{request_id}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake-model"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": length // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": length // 4 + len(content) // 4,
+                },
+            },
+        )
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded fake OpenAI-compatible server with configurable latency."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.2,
+        jitter: float = 0.2,
+        response: Optional[dict] = None,
+        connect_latency: float = 0.0,
+        capacity: Optional[int] = None,
+        tail: float = 0.0,
+        tail_factor: float = 10.0,
+    ):
+        """Create the server.
+
+        Args:
+            host: Interface to bind.
+            port: Port to bind, 0 picks a free port.
+            latency: Mean response delay in seconds.
+            jitter: Relative spread of the delay, e.g. 0.2 for +/-20%.
+            response: JSON object returned as the completion content.
+            connect_latency: Delay in seconds before a new connection is
+                served, standing in for the handshakes of a remote API.
+            capacity: Completions generated at the same time, the rest wait.
+                None for no limit.
+            tail: Fraction of responses that are slow, e.g. a GC pause or a
+                request queued behind a long generation.
+            tail_factor: How many times slower those responses are.
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.response = response or CANNED_RECEIPT
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.request_bytes = 0
+        self.connect_latency = connect_latency
+        self.connection_count = 0
+        self.slots = threading.BoundedSemaphore(capacity) if capacity else nullcontext()
+        self.tail = tail
+        self.tail_factor = tail_factor
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def sample_latency(self) -> float:
+        spread = self.latency * self.jitter
+        latency = max(0.0, random.uniform(self.latency - spread, self.latency + spread))
+        if self.tail and random.random() < self.tail:
+            latency *= self.tail_factor
+        return latency
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients hang up on purpose, e.g. on a cancelled hedged request
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int)
+    parser.add_argument("--tail", type=float, default=0.0)
+    parser.add_argument("--tail-factor", type=float, default=10.0)
+    parser.add_argument("--response", help="JSON file with the canned receipt.")
+    args = parser.parse_args()
+
+    response = None
+    if args.response:
+        with open(args.response) as f:
+            response = json.load(f)
+
+    server = FakeOpenAIServer(
+        args.host,
+        args.port,
+        args.latency,
+        args.jitter,
+        response=response,
+        connect_latency=args.connect_latency,
+        capacity=args.capacity,
+        tail=args.tail,
+        tail_factor=args.tail_factor,
+    )
+    print(f"Fake OpenAI server listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
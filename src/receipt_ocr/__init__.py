@@ -1,9 +1,43 @@
-from receipt_ocr.parsers import ReceiptParser
-from receipt_ocr.processors import ReceiptProcessor
-from receipt_ocr.providers import OpenAIProvider
+from receipt_ocr.balancer import AsyncPooledProvider, EndpointPool, PooledProvider
+from receipt_ocr.cache import ExtractionCache
+from receipt_ocr.connections import create_async_http_client, create_http_client
+from receipt_ocr.hedging import AsyncHedgedProvider, HedgedProvider, HedgingPolicy
+from receipt_ocr.hybrid import LocalOCR, OCRText
+from receipt_ocr.instrumentation import ProcessingReport
+from receipt_ocr.parsers import IncrementalReceiptParser, ReceiptParser, StreamEvent
+from receipt_ocr.profiles import ExtractionProfile, get_profile
+from receipt_ocr.processors import BatchResult, ReceiptProcessor
+from receipt_ocr.providers import AsyncOpenAIProvider, OpenAIProvider
+from receipt_ocr.ratelimit import RateLimiter
+from receipt_ocr.tiling import ReceiptTile, Tiler
+from receipt_ocr.validation import SchemaValidator, ValidationResult, get_validator
 
 __all__ = [
     "ReceiptProcessor",
+    "BatchResult",
     "OpenAIProvider",
+    "AsyncOpenAIProvider",
+    "PooledProvider",
+    "AsyncPooledProvider",
+    "EndpointPool",
+    "HedgedProvider",
+    "AsyncHedgedProvider",
+    "HedgingPolicy",
+    "LocalOCR",
+    "OCRText",
+    "Tiler",
+    "ReceiptTile",
     "ReceiptParser",
+    "IncrementalReceiptParser",
+    "StreamEvent",
+    "ExtractionCache",
+    "ExtractionProfile",
+    "get_profile",
+    "ProcessingReport",
+    "RateLimiter",
+    "create_http_client",
+    "create_async_http_client",
+    "SchemaValidator",
+    "ValidationResult",
+    "get_validator",
 ]
@@ -0,0 +1,354 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from PIL import Image
+
+from receipt_ocr.constants import (
+    _DEFAULT_EJECTION_COOLDOWN,
+    _DEFAULT_MAX_ENDPOINT_FAILURES,
+    _DEFAULT_WARM_UP_TIMEOUT,
+)
+from receipt_ocr.profiles import ExtractionProfile
+from receipt_ocr.providers import (
+    AsyncLLMProvider,
+    AsyncOpenAIProvider,
+    LLMProvider,
+    OpenAIProvider,
+)
+from receipt_ocr.ratelimit import _is_retryable, _retry_after
+
+STRATEGIES = ("least_outstanding", "latency")
+
+
+class _Endpoint:
+    """Load and health state of one endpoint of an ``EndpointPool``."""
+
+    def __init__(self, provider: Any, name: str):
+        self.provider = provider
+        self.name = name
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        # Moving average of the response time, None until measured
+        self.latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+
+class EndpointPool:
+    """Spreads requests over several endpoints and ejects unhealthy ones.
+
+    Endpoints are picked either with the fewest requests in flight
+    ("least_outstanding"), or with the lowest expected completion time, i.e.
+    their moving average latency times the requests in flight plus one
+    ("latency"). Ties are broken at random.
+
+    An endpoint is ejected for ``cooldown`` seconds after ``max_failures``
+    consecutive transient failures (connection errors, timeouts, 429 and 5xx
+    responses), when its average latency exceeds ``latency_threshold``, or
+    for as long as a 429 response's ``Retry-After`` asks. After the cooldown
+    it is put back on probation: a single further failure ejects it again.
+    When every endpoint is ejected the one due back first is used, so the
+    pool never refuses a request by itself.
+
+    Thread-safe, so one pool can serve a thread pool or an event loop.
+    """
+
+    def __init__(
+        self,
+        providers: List[Any],
+        strategy: str = "least_outstanding",
+        max_failures: int = _DEFAULT_MAX_ENDPOINT_FAILURES,
+        latency_threshold: Optional[float] = None,
+        cooldown: float = _DEFAULT_EJECTION_COOLDOWN,
+        names: Optional[List[str]] = None,
+    ):
+        """Create an endpoint pool.
+
+        Args:
+            providers: One provider per endpoint.
+            strategy: "least_outstanding" or "latency".
+            max_failures: Consecutive failures that eject an endpoint.
+            latency_threshold: Average response time in seconds above which
+                an endpoint is ejected, None to never eject slow endpoints.
+            cooldown: Seconds an ejected endpoint is left out.
+            names: Endpoint names used in ``stats``, default to the
+                providers' base URLs.
+        """
+        if not providers:
+            raise ValueError("At least one provider is required")
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Invalid strategy: {strategy}. Supported: least_outstanding, latency"
+            )
+        if max_failures < 1:
+            raise ValueError("max_failures must be at least 1")
+        names = names or [
+            getattr(provider, "base_url", None) or f"endpoint-{index}"
+            for index, provider in enumerate(providers)
+        ]
+        self.endpoints = [
+            _Endpoint(provider, name) for provider, name in zip(providers, names)
+        ]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def _costs(self, endpoints: List[_Endpoint]) -> List[float]:
+        if self.strategy != "latency":
+            return [e.outstanding for e in endpoints]
+        # Unmeasured endpoints are assumed as fast as the fastest one, so
+        # they get probed without drawing all of the traffic
+        known = [e.latency for e in endpoints if e.latency is not None]
+        default = min(known) if known else 1e-3
+        return [
+            (default if e.latency is None else e.latency) * (e.outstanding + 1)
+            for e in endpoints
+        ]
+
+    def acquire(self, exclude: Optional[List[_Endpoint]] = None) -> _Endpoint:
+        """Pick an endpoint for a request and count the request as in flight.
+
+        Args:
+            exclude: Endpoints not to pick, e.g. those that already failed
+                this request. Ignored when no other endpoint is left.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in (exclude or ())]
+            if not candidates:
+                candidates = self.endpoints
+            healthy = [e for e in candidates if e.ejected_until <= now]
+            if healthy:
+                costs = self._costs(healthy)
+                lowest = min(costs)
+                endpoint = random.choice(
+                    [e for e, cost in zip(healthy, costs) if cost == lowest]
+                )
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _eject(self, endpoint: _Endpoint, duration: float, now: float) -> None:
+        endpoint.ejected_until = max(endpoint.ejected_until, now + duration)
+        endpoint.ejections += 1
+        # On probation once back: the next failure ejects it again
+        endpoint.failures = self.max_failures - 1
+        endpoint.latency = None
+
+    def release(
+        self, endpoint: _Endpoint, elapsed: float, error: Optional[BaseException]
+    ) -> None:
+        """Record the outcome of a request sent to ``endpoint``.
+
+        Args:
+            endpoint: The endpoint returned by ``acquire``.
+            elapsed: Response time in seconds.
+            error: The exception the request failed with, if any. Only
+                transient errors count against the endpoint's health.
+        """
+        with self._lock:
+            now = time.monotonic()
+            endpoint.outstanding -= 1
+            if error is not None:
+                if not _is_retryable(error):
+                    # A bad request says nothing about the endpoint's health
+                    return
+                endpoint.errors += 1
+                endpoint.failures += 1
+                retry_after = _retry_after(error)
+                if retry_after is not None and retry_after > 0:
+                    self._eject(endpoint, retry_after, now)
+                elif endpoint.failures >= self.max_failures:
+                    self._eject(endpoint, self.cooldown, now)
+                return
+
+            endpoint.failures = 0
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency = 0.8 * endpoint.latency + 0.2 * elapsed
+            if (
+                self.latency_threshold is not None
+                and endpoint.latency > self.latency_threshold
+            ):
+                self._eject(endpoint, self.cooldown, now)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Load, latency and health of every endpoint."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "name": e.name,
+                    "healthy": e.ejected_until <= now,
+                    "outstanding": e.outstanding,
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "ejections": e.ejections,
+                    "latency": e.latency,
+                }
+                for e in self.endpoints
+            ]
+
+
+class PooledProvider(LLMProvider):
+    """LLM provider spreading requests over several OpenAI-compatible
+    endpoints, e.g. self-hosted replicas plus a cloud fallback.
+
+    Each request goes to the endpoint picked by an ``EndpointPool``. When it
+    fails with a transient error it is retried on the other endpoints, up to
+    ``max_attempts`` endpoints in total, before the last error is raised.
+    Create the endpoint providers with ``max_retries=0`` so that the SDK
+    does not retry on the failing endpoint first.
+    """
+
+    def __init__(
+        self,
+        providers: List[OpenAIProvider],
+        strategy: str = "least_outstanding",
+        max_failures: int = _DEFAULT_MAX_ENDPOINT_FAILURES,
+        latency_threshold: Optional[float] = None,
+        cooldown: float = _DEFAULT_EJECTION_COOLDOWN,
+        max_attempts: Optional[int] = None,
+    ):
+        """Initialize the pooled provider.
+
+        Args:
+            providers: One ``OpenAIProvider`` per endpoint.
+            strategy: Endpoint selection, see ``EndpointPool``.
+            max_failures: Consecutive failures that eject an endpoint.
+            latency_threshold: Average response time in seconds above which
+                an endpoint is ejected.
+            cooldown: Seconds an ejected endpoint is left out.
+            max_attempts: Endpoints a request is tried on, defaults to all.
+        """
+        self.pool = EndpointPool(
+            providers, strategy, max_failures, latency_threshold, cooldown
+        )
+        self.max_attempts = max_attempts or len(providers)
+
+    def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        stream: bool = False,
+    ) -> Any:
+        """Get the response from the endpoint picked by the pool.
+
+        A streamed response counts as complete once its headers arrived.
+        """
+        tried = []
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.get_response(
+                    image, json_schema, model, response_format_type, stream=stream
+                )
+            except BaseException as e:
+                # Cancellations only free the slot, see EndpointPool.release
+                self.pool.release(endpoint, time.perf_counter() - start, e)
+                tried.append(endpoint)
+                if not _is_retryable(e) or len(tried) >= self.max_attempts:
+                    raise
+                _rewind(image)
+                continue
+            self.pool.release(endpoint, time.perf_counter() - start, None)
+            return response
+
+    def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open ``connections`` connections to every endpoint.
+
+        The endpoints are warmed up concurrently, so this takes at most
+        ``timeout`` however many endpoints there are.
+
+        Returns:
+            Number of warm-up requests that reached an endpoint.
+        """
+        endpoints = self.pool.endpoints
+        with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+            return sum(
+                executor.map(
+                    lambda e: e.provider.warm_up(connections, timeout), endpoints
+                )
+            )
+
+
+class AsyncPooledProvider(AsyncLLMProvider):
+    """Asynchronous counterpart of ``PooledProvider`` over
+    ``AsyncOpenAIProvider`` endpoints."""
+
+    def __init__(
+        self,
+        providers: List[AsyncOpenAIProvider],
+        strategy: str = "least_outstanding",
+        max_failures: int = _DEFAULT_MAX_ENDPOINT_FAILURES,
+        latency_threshold: Optional[float] = None,
+        cooldown: float = _DEFAULT_EJECTION_COOLDOWN,
+        max_attempts: Optional[int] = None,
+    ):
+        """Initialize the async pooled provider.
+
+        See ``PooledProvider`` for the arguments.
+        """
+        self.pool = EndpointPool(
+            providers, strategy, max_failures, latency_threshold, cooldown
+        )
+        self.max_attempts = max_attempts or len(providers)
+
+    async def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        stream: bool = False,
+    ) -> Any:
+        """Get the response from the endpoint picked by the pool."""
+        tried = []
+        while True:
+            endpoint = self.pool.acquire(exclude=tried)
+            start = time.perf_counter()
+            try:
+                response = await endpoint.provider.get_response(
+                    image, json_schema, model, response_format_type, stream=stream
+                )
+            except BaseException as e:
+                # Cancellations only free the slot, see EndpointPool.release
+                self.pool.release(endpoint, time.perf_counter() - start, e)
+                tried.append(endpoint)
+                if not _is_retryable(e) or len(tried) >= self.max_attempts:
+                    raise
+                _rewind(image)
+                continue
+            self.pool.release(endpoint, time.perf_counter() - start, None)
+            return response
+
+    async def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open ``connections`` connections to every endpoint, concurrently."""
+        reached = await asyncio.gather(
+            *(e.provider.warm_up(connections, timeout) for e in self.pool.endpoints)
+        )
+        return sum(reached)
+
+
+def _rewind(image: Any) -> None:
+    """Rewind a file object so a retry on another endpoint reads it again."""
+    if hasattr(image, "seek"):
+        image.seek(0)
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from PIL import Image
+
+from receipt_ocr.profiles import ExtractionProfile, get_profile
+
+
+def _image_digest(image: Union[str, bytes, BinaryIO, Image.Image]) -> bytes:
+    """Hash the content of an image source."""
+    hasher = hashlib.sha256()
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+    elif isinstance(image, bytes):
+        hasher.update(image)
+    elif isinstance(image, Image.Image):
+        hasher.update(f"{image.mode}:{image.size}".encode())
+        hasher.update(image.tobytes())
+    elif hasattr(image, "read") and hasattr(image, "seek"):
+        # Binary file object, hashed in chunks and rewound for the encoder
+        image.seek(0)
+        for chunk in iter(lambda: image.read(1 << 20), b""):
+            hasher.update(chunk)
+        image.seek(0)
+    else:
+        raise ValueError(f"Unsupported image type: {type(image)}")
+    return hasher.digest()
+
+
+class ExtractionCache:
+    """Content-addressed cache of extraction results.
+
+    A bounded in-memory LRU sits in front of an optional SQLite store, so
+    results survive restarts and can be shared between processes on the same
+    host. Entries are keyed by the image content, the canonicalized schema,
+    the model, the response format type, the prompt version and the mode
+    the image is sent in.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 1024,
+        max_disk_bytes: Optional[int] = 512 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """Initialize the extraction cache.
+
+        Args:
+            path: Path of the SQLite database. Only the memory tier is used
+                when omitted.
+            max_memory_entries: Maximum number of results kept in memory.
+            max_disk_bytes: Maximum total size of results kept on disk. The
+                least recently used entries are evicted first.
+            ttl: Optional time-to-live of an entry in seconds.
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        # Memory hits not yet written to the disk tier's accessed_at
+        self._touched = {}
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)"
+            )
+            self._db.commit()
+            # Running total of the disk tier, so that writes do not sum the table
+            (self._disk_bytes,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+
+    @staticmethod
+    def make_key(
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: str,
+        response_format_type: Optional[str] = None,
+        mode: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Build the cache key of an extraction request.
+
+        Args:
+            image: The receipt image.
+            json_schema: JSON schema or ``ExtractionProfile`` of the request.
+            model: Model name.
+            response_format_type: Optional response format type.
+            mode: JSON-serializable settings of how the image is sent, e.g.
+                the provider's image options and the tiling, which change
+                what the model sees.
+        """
+        profile = get_profile(json_schema, response_format_type)
+        hasher = hashlib.sha256(_image_digest(image))
+        schema = json.dumps(profile.json_schema, sort_keys=True, separators=(",", ":"))
+        # Changing the prompts changes the extraction, so it is part of the key
+        for part in (
+            schema,
+            model,
+            profile.response_format_type,
+            profile.prompt_version,
+            json.dumps(mode, sort_keys=True, separators=(",", ":")),
+        ):
+            hasher.update(b"\0" + part.encode())
+        return hasher.hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at, size FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at, size = row
+                    if not self._expired(created_at, now):
+                        self._db.execute(
+                            "UPDATE results SET accessed_at = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._db.commit()
+                        self._remember(key, value, created_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return json.loads(value)
+                    self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_bytes -= size
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store the result for a key."""
+        value = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._flush_touched()
+                row = self._db.execute(
+                    "SELECT size FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._disk_bytes += len(value) - (row[0] if row else 0)
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _touch(self, key: str, now: float) -> None:
+        """Record a memory hit, to be written to the disk tier in a batch.
+
+        The hottest keys are served from memory, so without this the disk
+        tier would see them as the least recently used and evict them first.
+        """
+        if self._db is None:
+            return
+        self._touched[key] = now
+        if len(self._touched) >= self.max_memory_entries:
+            self._flush_touched()
+            self._db.commit()
+
+    def _flush_touched(self) -> None:
+        """Write the pending memory hits to the disk tier's accessed_at."""
+        if not self._touched:
+            return
+        self._db.executemany(
+            "UPDATE results SET accessed_at = ? WHERE key = ?",
+            [(now, key) for key, now in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        """Insert an entry into the memory tier, evicting the least recently
+        used ones."""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, now: float) -> None:
+        """Drop expired entries and shrink the disk tier to its size limit."""
+        if self.ttl is not None:
+            (expired,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM results WHERE created_at < ?",
+                (now - self.ttl,),
+            ).fetchone()
+            if expired:
+                self._db.execute(
+                    "DELETE FROM results WHERE created_at < ?", (now - self.ttl,)
+                )
+                self._disk_bytes -= expired
+        if self.max_disk_bytes is None or self._disk_bytes <= self.max_disk_bytes:
+            return
+        # Walk the oldest entries until enough bytes are freed
+        excess = self._disk_bytes - self.max_disk_bytes
+        count = freed = 0
+        cursor = self._db.execute(
+            "SELECT size FROM results ORDER BY accessed_at, rowid"
+        )
+        for (size,) in cursor:
+            if freed >= excess:
+                break
+            count += 1
+            freed += size
+        cursor.close()
+        self._db.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY accessed_at, rowid LIMIT ?)",
+            (count,),
+        )
+        self._disk_bytes -= freed
+        self.evictions += count
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            if self._db is not None:
+                self._flush_touched()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+        }
@@ -1,22 +1,143 @@
 import argparse
+import glob
 import json
 import os
+import sys
+import threading
 
 from dotenv import load_dotenv
 
-from receipt_ocr.constants import _DEFAULT_OPENAI_MODEL
+from receipt_ocr.constants import (
+    _DEFAULT_MAX_CONCURRENCY,
+    _DEFAULT_MIN_OCR_CONFIDENCE,
+    _DEFAULT_OPENAI_MODEL,
+    _IMAGE_EXTENSIONS,
+)
+from receipt_ocr.balancer import PooledProvider
+from receipt_ocr.hybrid import LocalOCR
 from receipt_ocr.processors import ReceiptProcessor
+from receipt_ocr.profiles import get_profile
 from receipt_ocr.providers import OpenAIProvider
+from receipt_ocr.ratelimit import RateLimiter
+from receipt_ocr.tiling import Tiler
 
 load_dotenv()
 
 
+def _is_image(path: str) -> bool:
+    """Check whether a path looks like a supported image file."""
+    return path.lower().endswith(_IMAGE_EXTENSIONS)
+
+
+def _expand_inputs(paths: list, file_list: str = None) -> list:
+    """Expand files, directories, glob patterns and file lists into image
+    paths.
+
+    Directories are searched recursively. Duplicates are dropped while
+    keeping the first occurrence, so the order is stable across runs.
+    """
+    candidates = []
+    if file_list:
+        if file_list == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(file_list, "r") as f:
+                lines = f.read().splitlines()
+        candidates.extend(line.strip() for line in lines if line.strip())
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                candidates.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if _is_image(name)
+                )
+        elif glob.has_magic(path):
+            candidates.extend(
+                match
+                for match in sorted(glob.glob(path, recursive=True))
+                if os.path.isfile(match) and _is_image(match)
+            )
+        else:
+            candidates.append(path)
+    return list(dict.fromkeys(candidates))
+
+
+def _load_checkpoint(checkpoint_path: str) -> set:
+    """Load the set of image paths already processed in a previous run."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def _run_batch(processor, image_paths, json_schema, args) -> int:
+    """Process many images and stream one JSON line per receipt."""
+    done = _load_checkpoint(args.checkpoint)
+    todo = [path for path in image_paths if path not in done]
+    if done:
+        print(
+            f"Skipping {len(image_paths) - len(todo)} already processed image(s).",
+            file=sys.stderr,
+        )
+
+    # Open the connections while the first images are being encoded
+    if todo:
+        threading.Thread(
+            target=processor.provider.warm_up,
+            args=(min(args.workers, len(todo)),),
+            daemon=True,
+        ).start()
+
+    # Resumed runs append so results from the interrupted run are kept
+    mode = "a" if args.checkpoint else "w"
+    out = open(args.output, mode) if args.output else sys.stdout
+    checkpoint = open(args.checkpoint, "a") if args.checkpoint else None
+    failures = 0
+    try:
+        for item in processor.iter_batch(
+            todo, json_schema, args.model, max_concurrency=args.workers
+        ):
+            record = {"image": item.image}
+            # A response that could not be parsed is retried like an error
+            parsed = item.ok and set(item.result) != {"error"}
+            if parsed:
+                record["result"] = item.result
+                if item.report is not None and item.report.violations:
+                    record["violations"] = item.report.violations
+            else:
+                record["error"] = item.error or item.result["error"]
+                failures += 1
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+            out.flush()
+            # Failed images are not checkpointed so they are retried next run
+            if checkpoint and parsed:
+                checkpoint.write(item.image + "\n")
+                checkpoint.flush()
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        if args.output:
+            out.close()
+
+    if failures:
+        print(f"{failures} of {len(todo)} image(s) failed.", file=sys.stderr)
+        return 1
+    return 0
+
+
 def main():
     """Main function for the CLI."""
     parser = argparse.ArgumentParser(
-        description="Extract information from a receipt image."
+        description="Extract information from receipt images."
+    )
+    parser.add_argument(
+        "image_paths",
+        type=str,
+        nargs="*",
+        help="Receipt image paths, directories or glob patterns.",
     )
-    parser.add_argument("image_path", type=str, help="The path to the receipt image.")
     parser.add_argument(
         "--schema_path", type=str, help="The path to a custom JSON schema file."
     )
@@ -28,10 +149,71 @@ def main():
     )
     parser.add_argument("--api_key", type=str, help="The API key for the LLM provider.")
     parser.add_argument(
-        "--base_url", type=str, help="The base URL for the LLM provider."
+        "--base_url",
+        type=str,
+        help="The base URL for the LLM provider. Several comma-separated URLs "
+        "spread the requests over these endpoints.",
+    )
+    parser.add_argument(
+        "--file_list",
+        type=str,
+        help="A file with one image path per line ('-' to read from stdin).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=_DEFAULT_MAX_CONCURRENCY,
+        help="Number of receipts to process concurrently in batch mode.",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Write JSON lines to this file instead of stdout."
+    )
+    parser.add_argument(
+        "--rpm", type=float, help="Requests per minute allowed by the provider."
+    )
+    parser.add_argument(
+        "--tpm", type=float, help="Tokens per minute allowed by the provider."
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Coerce results to the schema's types and report schema violations.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        help="A file recording processed images, used to resume interrupted runs.",
+    )
+    parser.add_argument(
+        "--local_ocr",
+        action="store_true",
+        help="Read receipts with Tesseract first and send their text instead of "
+        "the image when the OCR is confident enough.",
+    )
+    parser.add_argument(
+        "--min_ocr_confidence",
+        type=float,
+        default=_DEFAULT_MIN_OCR_CONFIDENCE,
+        help="Mean word confidence (0-100) below which the image is sent.",
+    )
+    parser.add_argument(
+        "--ocr_thumbnail",
+        action="store_true",
+        help="Send a low-detail thumbnail along with the OCR text.",
+    )
+    parser.add_argument(
+        "--tile",
+        action="store_true",
+        help="Split very long receipts into tiles read at full resolution and "
+        "processed concurrently.",
     )
     args = parser.parse_args()
 
+    if not args.image_paths and not args.file_list:
+        parser.error("at least one image path or --file_list is required")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
     # Load the JSON schema
     if args.schema_path:
         with open(args.schema_path, "r") as f:
@@ -53,17 +235,73 @@ def main():
         }
 
     # Initialize the provider and parser
-    provider = OpenAIProvider(api_key=args.api_key, base_url=args.base_url)
+    provider_options = {}
+    if args.rpm or args.tpm:
+        provider_options["rate_limiter"] = RateLimiter(
+            requests_per_minute=args.rpm, tokens_per_minute=args.tpm
+        )
+    if args.base_url and "," in args.base_url:
+        provider = PooledProvider(
+            [
+                OpenAIProvider(
+                    api_key=args.api_key,
+                    base_url=url.strip(),
+                    max_retries=0,
+                    **provider_options,
+                )
+                for url in args.base_url.split(",")
+                if url.strip()
+            ]
+        )
+    else:
+        provider = OpenAIProvider(
+            api_key=args.api_key, base_url=args.base_url, **provider_options
+        )
 
     # Initialize the processor
-    processor = ReceiptProcessor(provider)
+    processor_options = {}
+    if args.validate:
+        processor_options["validate"] = True
+    if args.local_ocr:
+        processor_options["local_ocr"] = LocalOCR(
+            min_confidence=args.min_ocr_confidence, thumbnail=args.ocr_thumbnail
+        )
+    if args.tile:
+        processor_options["tiler"] = Tiler()
+    processor = ReceiptProcessor(provider, **processor_options)
+
+    # A single image path keeps the original pretty-printed output
+    single = (
+        len(args.image_paths) == 1
+        and not args.file_list
+        and not args.output
+        and not args.checkpoint
+        and not os.path.isdir(args.image_paths[0])
+        and not glob.has_magic(args.image_paths[0])
+    )
+    if single:
+        # Process the receipt
+        if args.validate:
+            result, report = processor.process_receipt(
+                args.image_paths[0], json_schema, args.model, return_report=True
+            )
+            for violation in report.violations or ():
+                print(f"Schema violation: {violation}", file=sys.stderr)
+        else:
+            result = processor.process_receipt(
+                args.image_paths[0], json_schema, args.model
+            )
 
-    # Process the receipt
-    result = processor.process_receipt(args.image_path, json_schema, args.model)
+        # Print the result
+        print(json.dumps(result, indent=4))
+        return 0
 
-    # Print the result
-    print(json.dumps(result, indent=4))
+    image_paths = _expand_inputs(args.image_paths, args.file_list)
+    if not image_paths:
+        parser.error("no images found")
+    # Compile the prompt and response format once for the whole batch
+    return _run_batch(processor, image_paths, get_profile(json_schema), args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,97 @@
+from typing import Any, Dict
+
+import httpx
+
+from receipt_ocr.constants import (
+    _DEFAULT_CONNECT_TIMEOUT,
+    _DEFAULT_KEEPALIVE_EXPIRY,
+    _DEFAULT_MAX_CONNECTIONS,
+    _DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    _DEFAULT_READ_TIMEOUT,
+)
+
+
+def _client_options(
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry: float,
+    http2: bool,
+    connect_timeout: float,
+    read_timeout: float,
+) -> Dict[str, Any]:
+    if max_connections < 1:
+        raise ValueError("max_connections must be at least 1")
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_keepalive_connections, max_connections),
+            keepalive_expiry=keepalive_expiry,
+        ),
+        # Waiting for a free connection counts against the read timeout too
+        "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+        "http2": http2,
+        "follow_redirects": True,
+    }
+
+
+def create_http_client(
+    max_connections: int = _DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = _DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = _DEFAULT_KEEPALIVE_EXPIRY,
+    http2: bool = False,
+    connect_timeout: float = _DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = _DEFAULT_READ_TIMEOUT,
+) -> httpx.Client:
+    """Create an HTTP client with a tuned connection pool for ``OpenAIProvider``.
+
+    One client can be shared by several providers (e.g. one per model or
+    API key) so they draw from the same pool of warm connections.
+
+    Args:
+        max_connections: Maximum number of open connections. Requests beyond
+            it wait for a free connection.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        http2: Multiplex requests over HTTP/2 connections. Requires the
+            ``h2`` package (``pip install "httpx[http2]"``).
+        connect_timeout: Seconds allowed to establish a connection.
+        read_timeout: Seconds allowed to wait for the response, and for a
+            free connection from the pool.
+
+    Returns:
+        httpx.Client to pass as ``http_client``.
+    """
+    return httpx.Client(
+        **_client_options(
+            max_connections,
+            max_keepalive_connections,
+            keepalive_expiry,
+            http2,
+            connect_timeout,
+            read_timeout,
+        )
+    )
+
+
+def create_async_http_client(
+    max_connections: int = _DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = _DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = _DEFAULT_KEEPALIVE_EXPIRY,
+    http2: bool = False,
+    connect_timeout: float = _DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = _DEFAULT_READ_TIMEOUT,
+) -> httpx.AsyncClient:
+    """Create an async HTTP client for ``AsyncOpenAIProvider``.
+
+    See ``create_http_client`` for the arguments.
+    """
+    return httpx.AsyncClient(
+        **_client_options(
+            max_connections,
+            max_keepalive_connections,
+            keepalive_expiry,
+            http2,
+            connect_timeout,
+            read_timeout,
+        )
+    )
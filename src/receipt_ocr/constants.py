@@ -1 +1,26 @@
 _DEFAULT_OPENAI_MODEL = "gpt-4.1"
+_DEFAULT_MAX_CONCURRENCY = 8
+# Mirrored by tesseract_ocr.main.IMAGE_EXTENSIONS
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+_DEFAULT_IMAGE_FORMAT = "jpeg"
+_DEFAULT_IMAGE_QUALITY = 90
+_DEFAULT_MAX_IMAGE_SIZE = 1080
+_DEFAULT_MAX_RETRIES = 5
+_DEFAULT_MAX_BACKOFF = 60.0
+_DEFAULT_COMPLETION_TOKENS = 1000
+_DEFAULT_MAX_CONNECTIONS = 100
+_DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 100
+_DEFAULT_KEEPALIVE_EXPIRY = 60.0
+_DEFAULT_CONNECT_TIMEOUT = 5.0
+_DEFAULT_READ_TIMEOUT = 600.0
+_DEFAULT_WARM_UP_TIMEOUT = 5.0
+_DEFAULT_MAX_ENDPOINT_FAILURES = 3
+_DEFAULT_EJECTION_COOLDOWN = 30.0
+_DEFAULT_HEDGE_PERCENTILE = 95.0
+_DEFAULT_MAX_HEDGE_RATE = 0.05
+_DEFAULT_MIN_OCR_CONFIDENCE = 60.0
+_DEFAULT_MIN_OCR_CHARS = 20
+_DEFAULT_THUMBNAIL_SIZE = 512
+_DEFAULT_TILE_MIN_ASPECT_RATIO = 2.0
+_DEFAULT_TILE_OVERLAP = 0.15
+_DEFAULT_MAX_TILES = 8
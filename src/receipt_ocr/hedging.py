@@ -0,0 +1,351 @@
+import asyncio
+import dataclasses
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextvars import copy_context
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from PIL import Image
+
+from receipt_ocr.constants import (
+    _DEFAULT_HEDGE_PERCENTILE,
+    _DEFAULT_MAX_HEDGE_RATE,
+    _DEFAULT_WARM_UP_TIMEOUT,
+)
+from receipt_ocr.hybrid import OCRText
+from receipt_ocr.instrumentation import ProcessingReport, collect
+from receipt_ocr.profiles import ExtractionProfile
+from receipt_ocr.providers import AsyncLLMProvider, LLMProvider
+
+
+class HedgingPolicy:
+    """Decides when to send a duplicate of a slow request, within a budget.
+
+    A request is hedged once it has run longer than the ``percentile`` of
+    the latencies observed over the last ``window`` requests. Until
+    ``min_samples`` latencies have been observed, ``initial_delay`` is used,
+    or nothing is hedged when it is None.
+
+    Hedges are paid from a budget: every request adds ``max_hedge_rate`` to
+    it (up to ``burst``) and a hedge spends one, so at most that fraction of
+    requests is duplicated over time however slow the backend gets.
+
+    Thread-safe, one policy can be shared by providers.
+    """
+
+    def __init__(
+        self,
+        percentile: float = _DEFAULT_HEDGE_PERCENTILE,
+        max_hedge_rate: float = _DEFAULT_MAX_HEDGE_RATE,
+        window: int = 256,
+        min_samples: int = 20,
+        initial_delay: Optional[float] = None,
+        min_delay: float = 0.0,
+        burst: float = 10.0,
+    ):
+        """Create a hedging policy.
+
+        Args:
+            percentile: Percentile of recent latencies after which a request
+                is hedged, e.g. 95 to hedge the slowest 5%.
+            max_hedge_rate: Maximum fraction of requests that are hedged.
+            window: Number of recent latencies the percentile is taken over.
+            min_samples: Latencies needed before the percentile is used.
+            initial_delay: Hedge delay in seconds until then, None to not
+                hedge without enough samples.
+            min_delay: Lower bound of the hedge delay in seconds.
+            burst: Maximum hedges that can be saved up by a run of fast
+                requests and spent at once.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not 0 <= max_hedge_rate <= 1:
+            raise ValueError("max_hedge_rate must be between 0 and 1")
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.burst = burst
+        self._latencies = deque(maxlen=window)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.denied = 0
+
+    def start(self) -> Optional[float]:
+        """Count a new request and return its hedge delay, if any."""
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.burst, self._budget + self.max_hedge_rate)
+            if len(self._latencies) < self.min_samples:
+                delay = self.initial_delay
+            else:
+                ordered = sorted(self._latencies)
+                index = math.ceil(self.percentile / 100 * len(ordered)) - 1
+                delay = ordered[max(0, index)]
+            return None if delay is None else max(delay, self.min_delay)
+
+    def try_hedge(self) -> bool:
+        """Spend budget on a hedge, returns False when it is exhausted."""
+        with self._lock:
+            if self._budget < 1:
+                self.denied += 1
+                return False
+            self._budget -= 1
+            self.hedges += 1
+            return True
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a primary request.
+
+        For a primary that lost to its hedge, pass the time it had run when
+        it was cancelled, a lower bound that keeps the percentile honest.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def won(self) -> None:
+        """Record that a hedge returned before its primary request."""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of hedged requests and how often the hedges won."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "denied": self.denied,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            }
+
+
+def _shareable(image: Any) -> Any:
+    """Read a file object, so that a primary and its hedge can both encode
+    it."""
+    if hasattr(image, "read"):
+        image.seek(0)
+        return image.read()
+    if isinstance(image, OCRText) and hasattr(image.thumbnail, "read"):
+        return dataclasses.replace(image, thumbnail=_shareable(image.thumbnail))
+    return image
+
+
+def _submit(func, *args) -> Future:
+    """Run a call in a new thread, in a copy of the current context."""
+    future = Future()
+    context = copy_context()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(func, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+class HedgedProvider(LLMProvider):
+    """Wraps a provider to hedge slow requests.
+
+    When a request has not completed within the ``HedgingPolicy`` delay, a
+    duplicate is sent to ``hedge_provider`` (by default the same provider,
+    which for a ``PooledProvider`` means another endpoint), optionally with
+    ``hedge_model``, and the first successful response is returned. A
+    blocking request cannot be interrupted, so the loser runs to completion
+    in its thread and its response is discarded; use
+    ``AsyncHedgedProvider`` to cancel it. Streamed requests are not hedged.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        policy: Optional[HedgingPolicy] = None,
+        hedge_provider: Optional[LLMProvider] = None,
+        hedge_model: Optional[str] = None,
+    ):
+        """Initialize the hedged provider.
+
+        Args:
+            provider: Provider of the primary requests.
+            policy: When to hedge and how often, defaults to
+                ``HedgingPolicy()``.
+            hedge_provider: Provider of the hedges, defaults to ``provider``.
+            hedge_model: Model of the hedges, e.g. a faster one. Defaults to
+                the model of the request.
+        """
+        self.provider = provider
+        self.policy = policy or HedgingPolicy()
+        self.hedge_provider = hedge_provider or provider
+        self.hedge_model = hedge_model
+
+    def _hedge(self, image, json_schema, model, response_format_type):
+        # The hedge's stages would double count in the request's report
+        with collect(ProcessingReport()):
+            return self.hedge_provider.get_response(
+                image, json_schema, self.hedge_model or model, response_format_type
+            )
+
+    def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        stream: bool = False,
+    ) -> Any:
+        """Get the response of the primary request or of its hedge."""
+        if stream:
+            return self.provider.get_response(
+                image, json_schema, model, response_format_type, stream=True
+            )
+        delay = self.policy.start()
+        if delay is not None:
+            image = _shareable(image)
+        start = time.perf_counter()
+        primary = _submit(
+            self.provider.get_response, image, json_schema, model, response_format_type
+        )
+        pending = {primary}
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self.policy.try_hedge():
+                pending.add(
+                    _submit(
+                        self._hedge, image, json_schema, model, response_format_type
+                    )
+                )
+
+        error = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                # The primary goes first when both completed together
+                for future in sorted(done, key=lambda f: f is not primary):
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    if future is primary:
+                        self.policy.observe(time.perf_counter() - start)
+                    else:
+                        self.policy.won()
+                    return future.result()
+            raise error
+        finally:
+            if primary in pending:
+                self.policy.observe(time.perf_counter() - start)
+
+    def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open connections to the primary and hedge endpoints, concurrently."""
+        if self.hedge_provider is self.provider:
+            return self.provider.warm_up(connections, timeout)
+        hedge = _submit(self.hedge_provider.warm_up, connections, timeout)
+        return self.provider.warm_up(connections, timeout) + hedge.result()
+
+
+class AsyncHedgedProvider(AsyncLLMProvider):
+    """Asynchronous counterpart of ``HedgedProvider``.
+
+    The request that loses is cancelled, which closes its connection so
+    that servers that support it stop generating.
+    """
+
+    def __init__(
+        self,
+        provider: AsyncLLMProvider,
+        policy: Optional[HedgingPolicy] = None,
+        hedge_provider: Optional[AsyncLLMProvider] = None,
+        hedge_model: Optional[str] = None,
+    ):
+        """Initialize the async hedged provider.
+
+        See ``HedgedProvider`` for the arguments.
+        """
+        self.provider = provider
+        self.policy = policy or HedgingPolicy()
+        self.hedge_provider = hedge_provider or provider
+        self.hedge_model = hedge_model
+
+    async def _hedge(self, image, json_schema, model, response_format_type):
+        with collect(ProcessingReport()):
+            return await self.hedge_provider.get_response(
+                image, json_schema, self.hedge_model or model, response_format_type
+            )
+
+    async def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        stream: bool = False,
+    ) -> Any:
+        """Get the response of the primary request or of its hedge."""
+        if stream:
+            return await self.provider.get_response(
+                image, json_schema, model, response_format_type, stream=True
+            )
+        delay = self.policy.start()
+        if delay is not None:
+            image = _shareable(image)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(
+            self.provider.get_response(image, json_schema, model, response_format_type)
+        )
+        pending = {primary}
+        error = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.policy.try_hedge():
+                    pending.add(
+                        asyncio.ensure_future(
+                            self._hedge(image, json_schema, model, response_format_type)
+                        )
+                    )
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=lambda t: t is not primary):
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is primary:
+                        self.policy.observe(time.perf_counter() - start)
+                    else:
+                        self.policy.won()
+                    return task.result()
+            raise error
+        finally:
+            if primary in pending:
+                self.policy.observe(time.perf_counter() - start)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open connections to the primary and hedge endpoints, concurrently."""
+        if self.hedge_provider is self.provider:
+            return await self.provider.warm_up(connections, timeout)
+        reached = await asyncio.gather(
+            self.provider.warm_up(connections, timeout),
+            self.hedge_provider.warm_up(connections, timeout),
+        )
+        return sum(reached)
@@ -0,0 +1,151 @@
+import io
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Optional, Tuple, Union
+
+from PIL import Image
+
+from receipt_ocr.constants import (
+    _DEFAULT_MIN_OCR_CHARS,
+    _DEFAULT_MIN_OCR_CONFIDENCE,
+    _DEFAULT_THUMBNAIL_SIZE,
+)
+from receipt_ocr.instrumentation import current_report
+
+
+@dataclass
+class OCRText:
+    """The text of a receipt read by local OCR, sent to the LLM in place of
+    the image.
+
+    Providers build a text-only request from it, with ``thumbnail`` attached
+    at low detail, at most ``thumbnail_size`` pixels on its long side, when
+    it is set.
+    """
+
+    text: str
+    confidence: float
+    thumbnail: Optional[Union[str, bytes, BinaryIO, Image.Image]] = None
+    thumbnail_size: int = _DEFAULT_THUMBNAIL_SIZE
+
+
+def _load_tesseract_ocr() -> Callable:
+    try:
+        from tesseract_ocr.utils import ocr_image_with_confidence
+    except ImportError as e:
+        raise RuntimeError(
+            "Local OCR requires the tesseract_ocr module and its requirements, "
+            "see src/tesseract_ocr/requirements.txt"
+        ) from e
+    return ocr_image_with_confidence
+
+
+def tesseract_ocr(
+    image: Union[str, bytes, BinaryIO, Image.Image],
+) -> Tuple[str, float]:
+    """Read a receipt with the ``tesseract_ocr`` pipeline: outline detection,
+    perspective correction and Tesseract.
+
+    Returns:
+        The text and the mean confidence of its words, from 0 to 100.
+
+    Raises:
+        RuntimeError: If the ``tesseract_ocr`` module or its requirements
+            are not installed.
+    """
+    ocr_image_with_confidence = _load_tesseract_ocr()
+    import numpy as np
+
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    if isinstance(image, Image.Image):
+        pil_image = image.convert("RGB")
+    else:
+        with Image.open(image) as opened:
+            pil_image = opened.convert("RGB")
+    # OpenCV works on BGR
+    return ocr_image_with_confidence(np.asarray(pil_image)[:, :, ::-1])
+
+
+class LocalOCR:
+    """Reads receipts locally so that only their text is sent to the LLM.
+
+    Image inputs dominate the tokens, and so the cost and latency, of an
+    extraction. A receipt read with a mean word confidence of at least
+    ``min_confidence`` and at least ``min_chars`` characters is sent as its
+    text, optionally with a low-detail thumbnail for the layout. Other
+    receipts, e.g. blurry photos, and receipts the OCR fails on are sent as
+    the full image.
+
+    Recognizers are called from worker threads, concurrently in batches.
+    """
+
+    def __init__(
+        self,
+        recognize: Optional[Callable[[Any], Tuple[str, float]]] = None,
+        min_confidence: float = _DEFAULT_MIN_OCR_CONFIDENCE,
+        min_chars: int = _DEFAULT_MIN_OCR_CHARS,
+        thumbnail: bool = False,
+        thumbnail_size: int = _DEFAULT_THUMBNAIL_SIZE,
+    ):
+        """Initialize local OCR.
+
+        Args:
+            recognize: Function reading an image (path, bytes, binary file or
+                PIL image) and returning its text and confidence (0-100),
+                defaults to ``tesseract_ocr``.
+            min_confidence: Lowest mean word confidence for which the text is
+                sent instead of the image.
+            min_chars: Fewest characters read for which the text is sent
+                instead of the image.
+            thumbnail: Also send a low-detail thumbnail of the receipt.
+            thumbnail_size: Maximum dimension of the thumbnail.
+
+        Raises:
+            RuntimeError: If ``recognize`` is not given and the
+                ``tesseract_ocr`` module is not installed.
+        """
+        if recognize is None:
+            # Fail here rather than fall back to the image for every receipt
+            _load_tesseract_ocr()
+            recognize = tesseract_ocr
+        self.recognize = recognize
+        self.min_confidence = min_confidence
+        self.min_chars = min_chars
+        self.thumbnail = thumbnail
+        self.thumbnail_size = thumbnail_size
+
+    def prepare(
+        self, image: Union[str, bytes, BinaryIO, Image.Image]
+    ) -> Union[OCRText, str, bytes, BinaryIO, Image.Image]:
+        """Read a receipt and return what to send to the LLM: its ``OCRText``,
+        or the image itself when the OCR is not reliable enough.
+
+        The confidence and whether the image was sent are recorded in the
+        current ``ProcessingReport``.
+        """
+        report = current_report()
+        try:
+            text, confidence = self.recognize(image)
+        except Exception:
+            text, confidence = "", None
+        finally:
+            if hasattr(image, "read") and hasattr(image, "seek"):
+                # The image may still be sent, or be the thumbnail
+                image.seek(0)
+        text = text.strip()
+        fallback = (
+            confidence is None
+            or confidence < self.min_confidence
+            or len(text) < self.min_chars
+        )
+        if report is not None:
+            report.ocr_confidence = confidence
+            report.ocr_fallback = fallback
+        if fallback:
+            return image
+        return OCRText(
+            text,
+            confidence,
+            thumbnail=image if self.thumbnail else None,
+            thumbnail_size=self.thumbnail_size,
+        )
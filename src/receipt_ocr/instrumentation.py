@@ -0,0 +1,131 @@
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_current_report: ContextVar[Optional["ProcessingReport"]] = ContextVar(
+    "receipt_ocr_report", default=None
+)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimate the prompt tokens of a high-detail image input.
+
+    Follows OpenAI's published tiling rule: the image is scaled to fit in
+    2048x2048, then its shortest side to 768, and costs 85 tokens plus 170
+    per 512px tile. Other providers count differently, so treat the result
+    as an estimate.
+    """
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+@dataclass
+class ProcessingReport:
+    """Timings, payload sizes and token usage of processing one receipt.
+
+    Stage durations are in seconds. Stages that did not run (for example the
+    image stages on a cache hit) are absent from ``stages``. ``violations``
+    lists the schema violations of the result when it was validated.
+    ``ocr_confidence`` and ``ocr_fallback`` are set when the receipt was read
+    by local OCR first, the latter tells whether the image was sent anyway.
+    ``tiles`` is the number of tiles a long receipt was split into, the
+    sizes and tokens are then those of all the tiles.
+    """
+
+    stages: Dict[str, float] = field(default_factory=dict)
+    input_bytes: Optional[int] = None
+    payload_bytes: Optional[int] = None
+    image_size: Optional[Tuple[int, int]] = None
+    mime_type: Optional[str] = None
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cache_hit: bool = False
+    violations: Optional[List[str]] = None
+    ocr_confidence: Optional[float] = None
+    ocr_fallback: Optional[bool] = None
+    tiles: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block of code and add it to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    @property
+    def total_time(self) -> float:
+        """Sum of all recorded stage durations."""
+        return sum(self.stages.values())
+
+    @property
+    def hot_stage(self) -> Optional[str]:
+        """Name of the slowest stage."""
+        return max(self.stages, key=self.stages.get) if self.stages else None
+
+    @property
+    def image_tokens(self) -> Optional[int]:
+        """Estimated prompt tokens spent on the image."""
+        if self.image_size is None:
+            return None
+        return estimate_image_tokens(*self.image_size)
+
+    def record_usage(self, response: Any) -> None:
+        """Copy token usage from a chat completion response."""
+        usage = getattr(response, "usage", None)
+        for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            value = getattr(usage, name, None)
+            if isinstance(value, int):
+                setattr(self, name, value)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if isinstance(cached_tokens, int):
+            self.cached_tokens = cached_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report as a JSON-serializable dictionary."""
+        data = asdict(self)
+        data["image_tokens"] = self.image_tokens
+        data["total_time"] = self.total_time
+        return data
+
+
+def current_report() -> Optional[ProcessingReport]:
+    """Return the report being collected in the current context, if any."""
+    return _current_report.get()
+
+
+@contextmanager
+def collect(report: ProcessingReport) -> Iterator[ProcessingReport]:
+    """Collect stage timings of the enclosed code into ``report``.
+
+    The report is stored in a context variable, so it follows the work into
+    ``asyncio`` tasks and ``asyncio.to_thread`` calls.
+    """
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+
+
+@contextmanager
+def record(name: str) -> Iterator[None]:
+    """Time a stage into the current report, if one is being collected."""
+    report = _current_report.get()
+    if report is None:
+        yield
+        return
+    with report.stage(name):
+        yield
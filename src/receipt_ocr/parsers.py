@@ -1,19 +1,171 @@
 import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from receipt_ocr.utils import json_loads
+
+_decoder = json.JSONDecoder()
 
 
 class ReceiptParser:
     """Parser for the LLM's response."""
 
     def parse(self, response: str) -> dict:
-        """Parse the LLM's response and return a JSON object."""
+        """Parse the LLM's response and return a JSON object.
+
+        The JSON object may be wrapped in code fences (with or without a
+        language tag or newlines) or surrounded by other text; the outermost
+        object is extracted.
+        """
+        text = response.strip()
+        # Most responses are bare JSON, parse them in a single pass
         try:
-            # The response is often wrapped in a code block
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:-4]
-            elif response.startswith("```"):
-                response = response[3:-3]
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # Handle the case where the response is not valid JSON
-            return {"error": "The LLM's response was not valid JSON."}
+            return json_loads(text)
+        except ValueError:
+            pass
+
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end > start:
+            # Cut off fences and text around the outermost object
+            try:
+                return json_loads(text[start : end + 1])
+            except ValueError:
+                pass
+            # The surrounding text contains braces too, decode the first
+            # complete object and ignore whatever follows it
+            while start != -1:
+                try:
+                    value, _ = _decoder.raw_decode(text, start)
+                except ValueError:
+                    start = text.find("{", start + 1)
+                    continue
+                if isinstance(value, dict):
+                    return value
+                start = text.find("{", start + 1)
+
+        # Handle the case where the response is not valid JSON
+        return {"error": "The LLM's response was not valid JSON."}
+
+
+@dataclass
+class StreamEvent:
+    """A piece of the result that became available while streaming.
+
+    ``type`` is "field" for a completed top-level field, "item" for a completed
+    element of a top-level list (``index`` is its position in the list) and
+    "result" for the final parsed result, carried in ``value``.
+    """
+
+    type: str
+    value: Any
+    field: Optional[str] = None
+    index: Optional[int] = None
+
+
+class IncrementalReceiptParser:
+    """Parser for a streamed LLM response.
+
+    Text is fed as it arrives and scanned once. Top-level fields are emitted
+    as soon as their value is complete, and elements of top-level lists (such
+    as ``line_items``) as soon as each element is complete, so a client can
+    show the merchant or the first line items long before the response ends.
+    """
+
+    def __init__(self, parser: Optional[ReceiptParser] = None):
+        self.parser = parser or ReceiptParser()
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        # Start of the current top-level member, its key and value start
+        self._member_start = None
+        self._key = None
+        self._value_start = None
+        # Start of the current element of a top-level list
+        self._element_start = None
+        self._element_index = 0
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Add a chunk of the response and return the newly completed parts."""
+        self._text += chunk
+        events = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._done:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char == "{":
+                        self._member_start = i + 1
+                    else:
+                        # Not an object, wait for the final parse
+                        self._done = True
+                elif self._depth == 2 and char == "[" and self._key is not None:
+                    self._element_start = i + 1
+                    self._element_index = 0
+            elif char in "}]":
+                if self._depth == 2 and self._element_start is not None:
+                    self._emit_item(text[self._element_start : i], events)
+                    self._element_start = None
+                elif self._depth == 1:
+                    self._emit_field(text[self._value_start : i], events)
+                    self._done = True
+                self._depth -= 1
+            elif char == ":" and self._depth == 1:
+                self._key = self._loads(text[self._member_start : i])
+                self._value_start = i + 1
+            elif char == ",":
+                if self._depth == 1:
+                    self._emit_field(text[self._value_start : i], events)
+                    self._member_start = i + 1
+                elif self._depth == 2 and self._element_start is not None:
+                    self._emit_item(text[self._element_start : i], events)
+                    self._element_start = i + 1
+        self._pos = len(text)
+        return events
+
+    def close(self) -> Dict[str, Any]:
+        """Parse the complete response, see ``ReceiptParser.parse``."""
+        return self.parser.parse(self._text)
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json_loads(text)
+        except ValueError:
+            return None
+
+    def _emit_field(self, text: str, events: List[StreamEvent]) -> None:
+        if self._key is None or self._value_start is None or not text.strip():
+            return
+        value = self._loads(text)
+        if value is not None or text.strip() == "null":
+            events.append(StreamEvent("field", value, field=self._key))
+        self._key = None
+        self._value_start = None
+
+    def _emit_item(self, text: str, events: List[StreamEvent]) -> None:
+        if not text.strip():
+            return
+        value = self._loads(text)
+        if value is not None or text.strip() == "null":
+            events.append(
+                StreamEvent("item", value, field=self._key, index=self._element_index)
+            )
+        self._element_index += 1
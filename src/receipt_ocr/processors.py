@@ -1,7 +1,77 @@
-from typing import Any, Dict, Optional
+import asyncio
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from receipt_ocr.parsers import ReceiptParser
-from receipt_ocr.providers import OpenAIProvider
+from receipt_ocr.cache import ExtractionCache
+from receipt_ocr.constants import _DEFAULT_MAX_CONCURRENCY, _DEFAULT_OPENAI_MODEL
+from receipt_ocr.hybrid import LocalOCR, OCRText
+from receipt_ocr.instrumentation import ProcessingReport, collect, record
+from receipt_ocr.parsers import IncrementalReceiptParser, ReceiptParser, StreamEvent
+from receipt_ocr.profiles import ExtractionProfile
+from receipt_ocr.providers import AsyncLLMProvider, OpenAIProvider
+from receipt_ocr.tiling import ReceiptTile, Tiler, combine_reports, merge_results
+from receipt_ocr.validation import get_validator
+
+
+_SENTINEL = object()
+
+
+async def _aiterate(stream: Any) -> AsyncIterator[Any]:
+    """Iterate an async stream, or a blocking one in worker threads."""
+    if hasattr(stream, "__aiter__"):
+        async for item in stream:
+            yield item
+        return
+    iterator = iter(stream)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _SENTINEL)
+        if item is _SENTINEL:
+            return
+        yield item
+
+
+def _image_options(provider: Any) -> Optional[Dict[str, Any]]:
+    """The image options of a provider, or of the first endpoint of a pool
+    or the primary provider of a hedged one."""
+    options = getattr(provider, "image_options", None)
+    if isinstance(options, dict):
+        return options
+    pool = getattr(provider, "pool", None)
+    if pool is not None:
+        return _image_options(pool.endpoints[0].provider)
+    inner = getattr(provider, "provider", None)
+    if inner is not None and inner is not provider:
+        return _image_options(inner)
+    return None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of processing a single image within a batch."""
+
+    index: int
+    image: Any
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    report: Optional[ProcessingReport] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the image was processed without an error."""
+        return self.error is None
 
 
 class ReceiptProcessor:
@@ -9,33 +79,615 @@ class ReceiptProcessor:
 
     def __init__(
         self,
-        provider: Optional[OpenAIProvider] = None,
+        provider: Optional[Union[OpenAIProvider, AsyncLLMProvider]] = None,
         parser: Optional[ReceiptParser] = None,
+        cache: Optional[ExtractionCache] = None,
+        observer: Optional[Callable[[ProcessingReport], None]] = None,
+        validate: bool = False,
+        local_ocr: Optional[LocalOCR] = None,
+        tiler: Optional[Tiler] = None,
     ):
-        """Initialize the receipt processor."""
+        """Initialize the receipt processor.
+
+        Args:
+            provider: LLM provider, defaults to ``OpenAIProvider``.
+            parser: Parser for the LLM's response, defaults to ``ReceiptParser``.
+            cache: Optional cache of extraction results. Repeated requests for
+                the same image, schema, model and response format are served
+                from it instead of calling the provider.
+            observer: Optional callback receiving the ``ProcessingReport`` of
+                every processed receipt, e.g. to export metrics.
+            validate: Coerce results to the schema's types (e.g. "$12.50" to
+                12.5, dates to ISO 8601) and record the violations that
+                remain in ``ProcessingReport.violations``.
+            local_ocr: Read receipts locally first and send their text to the
+                LLM instead of the image when the OCR is confident enough,
+                see ``LocalOCR``.
+            tiler: Split very long receipts into tiles read at full
+                resolution and processed concurrently, see ``Tiler``. Only
+                ``process_receipt`` and ``aprocess_receipt`` tile, streams
+                send the whole image.
+        """
         self.provider = provider or OpenAIProvider()
         self.parser = parser or ReceiptParser()
+        self.cache = cache
+        self.observer = observer
+        self.validate = validate
+        self.local_ocr = local_ocr
+        self.tiler = tiler
+
+    def _new_report(self, model: Optional[str]) -> ProcessingReport:
+        return ProcessingReport(
+            model=model or os.getenv("OPENAI_MODEL", _DEFAULT_OPENAI_MODEL)
+        )
+
+    def _finish(
+        self,
+        result: Dict[str, Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        report: ProcessingReport,
+        return_report: bool,
+    ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], ProcessingReport]]:
+        # Parse failures are returned as they are
+        if self.validate and not (
+            isinstance(result, dict) and set(result) == {"error"}
+        ):
+            with report.stage("validate"):
+                validated = get_validator(json_schema).validate(result)
+            result = validated.value
+            report.violations = validated.errors
+        if self.observer is not None:
+            self.observer(report)
+        return (result, report) if return_report else result
+
+    def _cache_lookup(
+        self,
+        image: Any,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str],
+        response_format_type: Optional[str],
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Return the cache key of a request and its cached result, if any."""
+        if self.cache is None:
+            return None, None
+        model = model or os.getenv("OPENAI_MODEL", _DEFAULT_OPENAI_MODEL)
+        key = self.cache.make_key(
+            image, json_schema, model, response_format_type, self._mode()
+        )
+        return key, self.cache.get(key)
+
+    def _mode(self) -> Dict[str, Any]:
+        """How images are sent to the provider, part of the cache key."""
+        mode = {"image": _image_options(self.provider)}
+        if self.local_ocr is not None:
+            # Whether the text or the image is sent follows from these
+            mode["local_ocr"] = {
+                "min_confidence": self.local_ocr.min_confidence,
+                "min_chars": self.local_ocr.min_chars,
+                "thumbnail": self.local_ocr.thumbnail,
+                "thumbnail_size": self.local_ocr.thumbnail_size,
+            }
+        if self.tiler is not None:
+            mode["tiler"] = {
+                "min_aspect_ratio": self.tiler.min_aspect_ratio,
+                "overlap": self.tiler.overlap,
+                "max_tiles": self.tiler.max_tiles,
+                "tile_size": self.tiler.tile_size,
+            }
+        return mode
+
+    def _prepare(self, image: Any) -> Any:
+        """What to send the provider for an image, see ``LocalOCR.prepare``."""
+        if self.local_ocr is None:
+            return image
+        with record("ocr"):
+            return self.local_ocr.prepare(image)
+
+    async def _aprepare(self, image: Any) -> Any:
+        if self.local_ocr is None:
+            return image
+        # OCR is CPU-bound, keep it off the event loop
+        with record("ocr"):
+            return await asyncio.to_thread(self.local_ocr.prepare, image)
+
+    def _split(self, image: Any) -> Optional[List[ReceiptTile]]:
+        """The tiles of a long receipt, see ``Tiler.split``, or None."""
+        if self.tiler is None or isinstance(image, OCRText):
+            return None
+        with record("tile"):
+            return self.tiler.split(image)
+
+    async def _asplit(self, image: Any) -> Optional[List[ReceiptTile]]:
+        if self.tiler is None or isinstance(image, OCRText):
+            return None
+        with record("tile"):
+            return await asyncio.to_thread(self.tiler.split, image)
+
+    def _extract(
+        self,
+        image: Any,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str],
+        response_format_type: Optional[str],
+        report: ProcessingReport,
+    ) -> Dict[str, Any]:
+        response = self.provider.get_response(
+            image, json_schema, model, response_format_type
+        )
+        report.record_usage(response)
+        with record("parse"):
+            content = response.choices[0].message.content
+            return self.parser.parse(content)
+
+    async def _aextract(
+        self,
+        image: Any,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str],
+        response_format_type: Optional[str],
+        report: ProcessingReport,
+    ) -> Dict[str, Any]:
+        if isinstance(self.provider, AsyncLLMProvider):
+            response = await self.provider.get_response(
+                image, json_schema, model, response_format_type
+            )
+        else:
+            response = await asyncio.to_thread(
+                self.provider.get_response,
+                image,
+                json_schema,
+                model,
+                response_format_type,
+            )
+        report.record_usage(response)
+        with record("parse"):
+            content = response.choices[0].message.content
+            return self.parser.parse(content)
+
+    @staticmethod
+    def _merge_tiles(
+        outcomes: List[Tuple[Dict[str, Any], ProcessingReport]],
+        report: ProcessingReport,
+    ) -> Dict[str, Any]:
+        """Merge the results of the tiles of a receipt, or return the first
+        parse failure."""
+        combine_reports(report, [tile_report for _, tile_report in outcomes])
+        results = [result for result, _ in outcomes]
+        for result in results:
+            if set(result) == {"error"}:
+                return result
+        with record("merge"):
+            return merge_results(results)
+
+    def _extract_tiles(
+        self,
+        tiles: List[ReceiptTile],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str],
+        response_format_type: Optional[str],
+        report: ProcessingReport,
+    ) -> Dict[str, Any]:
+        def _tile(tile: ReceiptTile) -> Tuple[Dict[str, Any], ProcessingReport]:
+            tile_report = ProcessingReport(model=report.model)
+            with collect(tile_report):
+                result = self._extract(
+                    tile, json_schema, model, response_format_type, tile_report
+                )
+            return result, tile_report
+
+        # All tiles at once, the latency is that of the slowest one
+        with ThreadPoolExecutor(max_workers=len(tiles)) as executor:
+            outcomes = list(executor.map(_tile, tiles))
+        return self._merge_tiles(outcomes, report)
+
+    async def _aextract_tiles(
+        self,
+        tiles: List[ReceiptTile],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str],
+        response_format_type: Optional[str],
+        report: ProcessingReport,
+    ) -> Dict[str, Any]:
+        async def _tile(tile: ReceiptTile) -> Tuple[Dict[str, Any], ProcessingReport]:
+            tile_report = ProcessingReport(model=report.model)
+            with collect(tile_report):
+                result = await self._aextract(
+                    tile, json_schema, model, response_format_type, tile_report
+                )
+            return result, tile_report
+
+        outcomes = await asyncio.gather(*(_tile(tile) for tile in tiles))
+        return self._merge_tiles(outcomes, report)
+
+    def _cache_store(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        # Parse failures are not cached so that the next request retries them
+        if key is not None and set(result) != {"error"}:
+            self.cache.set(key, result)
 
     def process_receipt(
         self,
         image_path: str,
-        json_schema: Dict[str, Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
         model: Optional[str] = None,
         response_format_type: Optional[str] = None,
-    ) -> Dict[str, Any]:
+        return_report: bool = False,
+    ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], ProcessingReport]]:
         """Process a receipt image and return a structured JSON object.
 
         Args:
             image_path: Path to the receipt image file.
-            json_schema: JSON schema defining the expected output structure.
+            json_schema: JSON schema defining the expected output structure, or
+                an ``ExtractionProfile`` compiled from one.
             model: Optional model name to use for the LLM.
             response_format_type: Optional response format type. Supported: "json_object", "json_schema", "text".
+            return_report: Also return the ``ProcessingReport`` with per-stage
+                timings, payload sizes and token usage of this call.
 
         Returns:
-            Dict containing the parsed receipt data.
+            Dict containing the parsed receipt data, or a tuple of it and its
+            ``ProcessingReport`` when ``return_report`` is set.
         """
-        response = self.provider.get_response(
-            image_path, json_schema, model, response_format_type
+        if isinstance(self.provider, AsyncLLMProvider):
+            raise TypeError(
+                "process_receipt requires a synchronous provider, use aprocess_receipt instead"
+            )
+        report = self._new_report(model)
+        with collect(report):
+            with record("cache"):
+                key, cached = self._cache_lookup(
+                    image_path, json_schema, model, response_format_type
+                )
+            if cached is not None:
+                report.cache_hit = True
+                return self._finish(cached, json_schema, report, return_report)
+
+            image = self._prepare(image_path)
+            tiles = self._split(image)
+            if tiles:
+                result = self._extract_tiles(
+                    tiles, json_schema, model, response_format_type, report
+                )
+            else:
+                result = self._extract(
+                    image, json_schema, model, response_format_type, report
+                )
+            with record("cache"):
+                self._cache_store(key, result)
+        return self._finish(result, json_schema, report, return_report)
+
+    async def aprocess_receipt(
+        self,
+        image_path: str,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        return_report: bool = False,
+    ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], ProcessingReport]]:
+        """Asynchronously process a receipt image and return a structured JSON
+        object.
+
+        Awaits the provider directly when it is an ``AsyncLLMProvider``,
+        otherwise the blocking provider call runs in a worker thread so the
+        event loop stays free.
+
+        Args:
+            image_path: Path to the receipt image file.
+            json_schema: JSON schema defining the expected output structure, or
+                an ``ExtractionProfile`` compiled from one.
+            model: Optional model name to use for the LLM.
+            response_format_type: Optional response format type. Supported: "json_object", "json_schema", "text".
+            return_report: Also return the ``ProcessingReport`` with per-stage
+                timings, payload sizes and token usage of this call.
+
+        Returns:
+            Dict containing the parsed receipt data, or a tuple of it and its
+            ``ProcessingReport`` when ``return_report`` is set.
+        """
+        report = self._new_report(model)
+        with collect(report):
+            key = None
+            if self.cache is not None:
+                # Hashing the image and the disk lookup block, keep them off
+                # the loop
+                with record("cache"):
+                    key, cached = await asyncio.to_thread(
+                        self._cache_lookup,
+                        image_path,
+                        json_schema,
+                        model,
+                        response_format_type,
+                    )
+                if cached is not None:
+                    report.cache_hit = True
+                    return self._finish(cached, json_schema, report, return_report)
+
+            image = await self._aprepare(image_path)
+            tiles = await self._asplit(image)
+            if tiles:
+                result = await self._aextract_tiles(
+                    tiles, json_schema, model, response_format_type, report
+                )
+            else:
+                result = await self._aextract(
+                    image, json_schema, model, response_format_type, report
+                )
+            if key is not None:
+                with record("cache"):
+                    await asyncio.to_thread(self._cache_store, key, result)
+        return self._finish(result, json_schema, report, return_report)
+
+    @staticmethod
+    def _replay(result: Dict[str, Any]) -> Iterator[StreamEvent]:
+        """Events of a result that is already complete, e.g. a cached one."""
+        for name, value in result.items():
+            yield StreamEvent("field", value, field=name)
+        yield StreamEvent("result", result)
+
+    def stream_receipt(
+        self,
+        image_path: str,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+    ) -> Iterator[StreamEvent]:
+        """Process a receipt image, yielding fields as the LLM generates them.
+
+        The provider must support ``stream=True``. Completed top-level fields
+        and list elements (such as each of the ``line_items``) are yielded as
+        they arrive, followed by a "result" event with the parsed result.
+        When the processor validates, only the final result is coerced.
+
+        Args:
+            image_path: Path to the receipt image file.
+            json_schema: JSON schema defining the expected output structure, or
+                an ``ExtractionProfile`` compiled from one.
+            model: Optional model name to use for the LLM.
+            response_format_type: Optional response format type. Supported: "json_object", "json_schema", "text".
+
+        Yields:
+            ``StreamEvent`` objects, the last one of type "result".
+        """
+        if isinstance(self.provider, AsyncLLMProvider):
+            raise TypeError(
+                "stream_receipt requires a synchronous provider, use astream_receipt instead"
+            )
+        report = self._new_report(model)
+        with collect(report):
+            with record("cache"):
+                key, cached = self._cache_lookup(
+                    image_path, json_schema, model, response_format_type
+                )
+            if cached is None:
+                stream = self.provider.get_response(
+                    self._prepare(image_path),
+                    json_schema,
+                    model,
+                    response_format_type,
+                    stream=True,
+                )
+        if cached is not None:
+            report.cache_hit = True
+            result = self._finish(cached, json_schema, report, False)
+            yield from self._replay(result)
+            return
+
+        parser = IncrementalReceiptParser(self.parser)
+        for chunk in stream:
+            report.record_usage(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield from parser.feed(chunk.choices[0].delta.content)
+        with report.stage("parse"):
+            result = parser.close()
+        with report.stage("cache"):
+            self._cache_store(key, result)
+        result = self._finish(result, json_schema, report, False)
+        yield StreamEvent("result", result)
+
+    async def astream_receipt(
+        self,
+        image_path: str,
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Asynchronously process a receipt image, yielding fields as the LLM
+        generates them.
+
+        See ``stream_receipt`` for the arguments and events. A synchronous
+        provider's stream is read in worker threads.
+        """
+        report = self._new_report(model)
+        with collect(report):
+            key, cached = None, None
+            if self.cache is not None:
+                with record("cache"):
+                    key, cached = await asyncio.to_thread(
+                        self._cache_lookup,
+                        image_path,
+                        json_schema,
+                        model,
+                        response_format_type,
+                    )
+            if cached is None:
+                image = await self._aprepare(image_path)
+                if isinstance(self.provider, AsyncLLMProvider):
+                    stream = await self.provider.get_response(
+                        image,
+                        json_schema,
+                        model,
+                        response_format_type,
+                        stream=True,
+                    )
+                else:
+                    stream = await asyncio.to_thread(
+                        self.provider.get_response,
+                        image,
+                        json_schema,
+                        model,
+                        response_format_type,
+                        stream=True,
+                    )
+        if cached is not None:
+            report.cache_hit = True
+            result = self._finish(cached, json_schema, report, False)
+            for event in self._replay(result):
+                yield event
+            return
+
+        parser = IncrementalReceiptParser(self.parser)
+        async for chunk in _aiterate(stream):
+            report.record_usage(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                for event in parser.feed(chunk.choices[0].delta.content):
+                    yield event
+        with report.stage("parse"):
+            result = parser.close()
+        if key is not None:
+            with report.stage("cache"):
+                await asyncio.to_thread(self._cache_store, key, result)
+        result = self._finish(result, json_schema, report, False)
+        yield StreamEvent("result", result)
+
+    def iter_batch(
+        self,
+        images: Iterable[Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+    ) -> Iterator[BatchResult]:
+        """Process many receipt images concurrently, yielding results as they
+        complete.
+
+        At most ``max_concurrency`` requests are in flight at any time and
+        ``images`` is consumed lazily, so large batches never queue up all of
+        their work at once. A failing image is reported through
+        ``BatchResult.error`` and does not abort the batch.
+
+        Args:
+            images: Receipt images (paths, bytes or PIL images).
+            json_schema: JSON schema defining the expected output structure, or
+                an ``ExtractionProfile`` compiled from one.
+            model: Optional model name to use for the LLM.
+            response_format_type: Optional response format type. Supported: "json_object", "json_schema", "text".
+            max_concurrency: Maximum number of concurrent provider requests.
+
+        Yields:
+            BatchResult for each image, in completion order.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if isinstance(self.provider, AsyncLLMProvider):
+            raise TypeError(
+                "iter_batch requires a synchronous provider, use aiter_batch instead"
+            )
+
+        def _process(index: int, image: Any) -> BatchResult:
+            try:
+                result, report = self.process_receipt(
+                    image, json_schema, model, response_format_type, True
+                )
+            except Exception as e:
+                return BatchResult(index, image, error=f"{type(e).__name__}: {e}")
+            return BatchResult(index, image, result=result, report=report)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = set()
+            for index, image in enumerate(images):
+                pending.add(executor.submit(_process, index, image))
+                if len(pending) < max_concurrency:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def process_batch(
+        self,
+        images: Iterable[Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+    ) -> List[BatchResult]:
+        """Process many receipt images concurrently.
+
+        See ``iter_batch`` for the meaning of the arguments.
+
+        Returns:
+            List of BatchResult, in the same order as ``images``.
+        """
+        results = self.iter_batch(
+            images, json_schema, model, response_format_type, max_concurrency
         )
-        content = response.choices[0].message.content
-        return self.parser.parse(content)
+        return sorted(results, key=lambda r: r.index)
+
+    async def aiter_batch(
+        self,
+        images: Iterable[Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+    ) -> AsyncIterator[BatchResult]:
+        """Asynchronously process many receipt images, yielding results as
+        they complete.
+
+        Async counterpart of ``iter_batch`` built on ``aprocess_receipt``.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        async def _process(index: int, image: Any) -> BatchResult:
+            try:
+                result, report = await self.aprocess_receipt(
+                    image, json_schema, model, response_format_type, True
+                )
+            except Exception as e:
+                return BatchResult(index, image, error=f"{type(e).__name__}: {e}")
+            return BatchResult(index, image, result=result, report=report)
+
+        pending = set()
+        try:
+            for index, image in enumerate(images):
+                pending.add(asyncio.ensure_future(_process(index, image)))
+                if len(pending) < max_concurrency:
+                    continue
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aprocess_batch(
+        self,
+        images: Iterable[Any],
+        json_schema: Union[Dict[str, Any], ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+    ) -> List[BatchResult]:
+        """Asynchronously process many receipt images concurrently.
+
+        Returns:
+            List of BatchResult, in the same order as ``images``.
+        """
+        results = [
+            result
+            async for result in self.aiter_batch(
+                images, json_schema, model, response_format_type, max_concurrency
+            )
+        ]
+        return sorted(results, key=lambda r: r.index)
@@ -0,0 +1,165 @@
+import copy
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+from receipt_ocr.prompts import (
+    OCR_USER_PROMPT,
+    SYSTEM_PROMPT,
+    TILE_USER_PROMPT,
+    USER_PROMPT,
+)
+
+RESPONSE_FORMAT_TYPES = ("json_object", "json_schema", "text")
+
+
+class ExtractionProfile:
+    """Precompiled prompt and response format for one extraction schema.
+
+    Everything that only depends on the schema, the response format type and
+    the prompts is built once: the system message, the user text part and the
+    ``response_format`` payload. Requests reuse these objects, so the static
+    prefix of every request (system message, then the user text, then the
+    image) is byte-identical across calls and can be reused by
+    OpenAI-compatible servers with prefix caching.
+
+    The prebuilt messages are shared between requests and must not be
+    mutated.
+    """
+
+    def __init__(
+        self,
+        json_schema: Dict[str, Any],
+        response_format_type: Optional[str] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+        user_prompt: str = USER_PROMPT,
+        ocr_prompt: str = OCR_USER_PROMPT,
+        tile_prompt: str = TILE_USER_PROMPT,
+    ):
+        """Compile an extraction profile.
+
+        Args:
+            json_schema: JSON schema defining the expected output structure.
+            response_format_type: Optional response format type. Supported: "json_object", "json_schema", "text".
+            system_prompt: System prompt template with a ``{json_schema_content}`` field.
+            user_prompt: Text sent alongside the image.
+            ocr_prompt: Text sent before the OCR text of a receipt, in place
+                of ``user_prompt``, see ``build_ocr_messages``.
+            tile_prompt: Text sent with a tile of a long receipt in place of
+                ``user_prompt``, with ``{index}`` and ``{count}`` fields, see
+                ``build_tile_messages``.
+        """
+        self.json_schema = json_schema
+        self._set_response_format(response_format_type)
+        self.system_prompt = system_prompt.format(
+            json_schema_content=json.dumps(json_schema, indent=2)
+        )
+        self.user_prompt = user_prompt
+        prompts = (system_prompt, user_prompt, ocr_prompt, tile_prompt)
+        self.prompt_version = hashlib.sha256("\0".join(prompts).encode()).hexdigest()[
+            :12
+        ]
+
+        self.system_message = {"role": "system", "content": self.system_prompt}
+        self._user_text = {"type": "text", "text": user_prompt}
+        self._ocr_text = {"type": "text", "text": ocr_prompt}
+        self.tile_prompt = tile_prompt
+
+    def _set_response_format(self, response_format_type: Optional[str]) -> None:
+        response_format_type = response_format_type or "json_object"
+        if response_format_type not in RESPONSE_FORMAT_TYPES:
+            raise ValueError(
+                f"Invalid response_format_type: {response_format_type}. Supported: json_object, json_schema, text"
+            )
+        self.response_format_type = response_format_type
+
+        # Set response format based on type
+        if response_format_type == "json_schema":
+            self.response_format = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "receipt_data",
+                    "schema": self.json_schema,
+                    "strict": True,
+                },
+            }
+        elif response_format_type == "text":
+            self.response_format = {"type": "text"}
+        else:
+            self.response_format = {"type": "json_object"}
+
+    def with_response_format(self, response_format_type: str) -> "ExtractionProfile":
+        """Return a copy of the profile with another response format type,
+        sharing its prompts and messages."""
+        if response_format_type == self.response_format_type:
+            return self
+        profile = copy.copy(self)
+        profile._set_response_format(response_format_type)
+        return profile
+
+    def build_messages(self, image_url: str) -> List[Dict[str, Any]]:
+        """Build the chat messages for one image, static parts first."""
+        return [
+            self.system_message,
+            {
+                "role": "user",
+                "content": [
+                    self._user_text,
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                ],
+            },
+        ]
+
+    def build_ocr_messages(
+        self, text: str, image_url: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Build the chat messages for the OCR text of one receipt, with an
+        optional thumbnail sent at low detail."""
+        content = [self._ocr_text, {"type": "text", "text": text}]
+        if image_url is not None:
+            content.append(
+                {"type": "image_url", "image_url": {"url": image_url, "detail": "low"}}
+            )
+        return [self.system_message, {"role": "user", "content": content}]
+
+    def build_tile_messages(
+        self, image_url: str, index: int, count: int
+    ) -> List[Dict[str, Any]]:
+        """Build the chat messages for one tile of a long receipt, ``index``
+        counting from 0."""
+        text = self.tile_prompt.format(index=index + 1, count=count)
+        return [
+            self.system_message,
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": text},
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                ],
+            },
+        ]
+
+
+@lru_cache(maxsize=128)
+def _compile_profile(
+    schema_json: str, response_format_type: Optional[str]
+) -> ExtractionProfile:
+    return ExtractionProfile(json.loads(schema_json), response_format_type)
+
+
+def get_profile(
+    json_schema: Union[Dict[str, Any], ExtractionProfile],
+    response_format_type: Optional[str] = None,
+) -> ExtractionProfile:
+    """Return the compiled profile of a schema, compiling it on first use.
+
+    Profiles are cached by the schema's content, so callers can keep passing
+    plain dictionaries. An ``ExtractionProfile`` is returned as is, or with
+    ``response_format_type`` when it is given, see ``with_response_format``.
+    """
+    if isinstance(json_schema, ExtractionProfile):
+        if response_format_type:
+            return json_schema.with_response_format(response_format_type)
+        return json_schema
+    return _compile_profile(json.dumps(json_schema), response_format_type)
@@ -35,3 +35,16 @@ Please extract the information from the receipt image and provide it in the foll
 """
 
 USER_PROMPT = "Please extract the information from this receipt image."
+
+OCR_USER_PROMPT = (
+    "Please extract the information from this receipt. Its text, read by OCR, "
+    "follows and may contain recognition errors. A low-resolution image of the "
+    "receipt may be attached for its layout."
+)
+
+TILE_USER_PROMPT = (
+    "This image is part {index} of {count} of a long receipt, cut from top to "
+    "bottom with overlapping edges. Please extract the information visible in "
+    "this part only, use null for fields that are not in it, and include every "
+    "line item that is visible, even near the edges."
+)
@@ -1,15 +1,40 @@
-import json
+import asyncio
 import os
 from abc import ABC, abstractmethod
-from typing import Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Optional, Union
 
-from openai import OpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APIError,
+    AsyncOpenAI,
+    AsyncStream,
+    OpenAI,
+    Stream,
+)
 from openai.types.chat.chat_completion import ChatCompletion
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 from PIL import Image
 
-from receipt_ocr.constants import _DEFAULT_OPENAI_MODEL
-from receipt_ocr.prompts import SYSTEM_PROMPT, USER_PROMPT
-from receipt_ocr.utils import encode_image_to_base64
+from receipt_ocr.constants import (
+    _DEFAULT_IMAGE_FORMAT,
+    _DEFAULT_IMAGE_QUALITY,
+    _DEFAULT_MAX_IMAGE_SIZE,
+    _DEFAULT_OPENAI_MODEL,
+    _DEFAULT_WARM_UP_TIMEOUT,
+)
+from receipt_ocr.hybrid import OCRText
+from receipt_ocr.instrumentation import (
+    ProcessingReport,
+    collect,
+    current_report,
+    record,
+)
+from receipt_ocr.profiles import ExtractionProfile, get_profile
+from receipt_ocr.ratelimit import RateLimiter
+from receipt_ocr.tiling import ReceiptTile
+from receipt_ocr.utils import encode_image_to_data_url
 
 
 class LLMProvider(ABC):
@@ -18,8 +43,8 @@ class LLMProvider(ABC):
     @abstractmethod
     def get_response(
         self,
-        image: Union[str, bytes, Image.Image],
-        json_schema: dict,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
         model: str,
         response_format_type: Optional[str] = None,
     ) -> Any:
@@ -27,71 +52,294 @@ class LLMProvider(ABC):
         pass
 
 
+class AsyncLLMProvider(ABC):
+    """Abstract base class for asynchronous LLM providers."""
+
+    @abstractmethod
+    async def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image],
+        json_schema: Union[dict, ExtractionProfile],
+        model: str,
+        response_format_type: Optional[str] = None,
+    ) -> Any:
+        """Get the response from the LLM provider without blocking the event
+        loop."""
+        pass
+
+
+def _build_request(
+    image: Union[str, bytes, BinaryIO, Image.Image, OCRText, ReceiptTile],
+    json_schema: Union[dict, ExtractionProfile],
+    model: Optional[str] = None,
+    response_format_type: Optional[str] = None,
+    image_options: Optional[dict] = None,
+    stream: bool = False,
+) -> dict:
+    """Build the keyword arguments for a chat completion request."""
+    # The prompt and response format are compiled once per schema
+    with record("build"):
+        profile = get_profile(json_schema, response_format_type)
+
+    if isinstance(image, OCRText):
+        # Text read by local OCR, with an optional low-detail thumbnail
+        image_url = None
+        if image.thumbnail is not None:
+            image_url = encode_image_to_data_url(
+                image.thumbnail,
+                **{**(image_options or {}), "max_size": image.thumbnail_size},
+            )
+        with record("build"):
+            messages = profile.build_ocr_messages(image.text, image_url)
+    elif isinstance(image, ReceiptTile):
+        image_url = encode_image_to_data_url(image.image, **(image_options or {}))
+        with record("build"):
+            messages = profile.build_tile_messages(image_url, image.index, image.count)
+    else:
+        # Encode image to a base64 data URL using utility function
+        image_url = encode_image_to_data_url(image, **(image_options or {}))
+        with record("build"):
+            messages = profile.build_messages(image_url)
+
+    with record("build"):
+        request = {
+            "model": model or os.getenv("OPENAI_MODEL", _DEFAULT_OPENAI_MODEL),
+            "response_format": profile.response_format,
+            "temperature": 0.2,
+            "messages": messages,
+        }
+        if stream:
+            # The usage arrives in a last chunk without choices
+            request["stream"] = True
+            request["stream_options"] = {"include_usage": True}
+        return request
+
+
+def _reached(request) -> bool:
+    """Whether a warm-up request got a response, successful or not."""
+    try:
+        request()
+    except APIConnectionError:
+        return False
+    except APIError:
+        pass
+    return True
+
+
+async def _areached(request) -> bool:
+    try:
+        await request()
+    except APIConnectionError:
+        return False
+    except APIError:
+        pass
+    return True
+
+
 class OpenAIProvider(LLMProvider):
     """LLM provider for OpenAI-compatible APIs."""
 
-    def __init__(self, api_key: str = None, base_url: str = None):
-        """Initialize the OpenAI provider."""
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        image_format: str = _DEFAULT_IMAGE_FORMAT,
+        image_quality: int = _DEFAULT_IMAGE_QUALITY,
+        image_passthrough: bool = True,
+        max_image_size: int = _DEFAULT_MAX_IMAGE_SIZE,
+        rate_limiter: Optional[RateLimiter] = None,
+        http_client: Optional[httpx.Client] = None,
+        max_retries: Optional[int] = None,
+    ):
+        """Initialize the OpenAI provider.
+
+        Args:
+            api_key: API key, defaults to the ``OPENAI_API_KEY`` environment variable.
+            base_url: Base URL, defaults to the ``OPENAI_BASE_URL`` environment variable.
+            image_format: Format images are re-encoded to ("jpeg", "webp" or "png").
+            image_quality: Quality of lossy re-encoded images (1-100).
+            image_passthrough: Send images that are already small enough and in
+                a supported format without re-encoding them.
+            max_image_size: Maximum dimension of the image sent to the model.
+            rate_limiter: Schedules requests under RPM/TPM limits and retries
+                rate-limited requests. Share one limiter between providers
+                that use the same API key.
+            http_client: HTTP client whose connection pool, timeouts and
+                HTTP/2 setting are used for the API calls, see
+                ``create_http_client``. It can be shared between providers.
+            max_retries: Retries of failed requests by the SDK, which
+                defaults to 2. Set it to 0 for the endpoints of a
+                ``PooledProvider`` so failures move on to another endpoint.
+        """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.image_options = {
+            "max_size": max_image_size,
+            "image_format": image_format,
+            "quality": image_quality,
+            "passthrough": image_passthrough,
+        }
+        self.rate_limiter = rate_limiter
+        client_options = {}
+        if max_retries is not None:
+            client_options["max_retries"] = max_retries
+        if rate_limiter is not None:
+            # The rate limiter schedules retries, the SDK would bypass it
+            client_options["max_retries"] = 0
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = OpenAI(
+            api_key=self.api_key, base_url=self.base_url, **client_options
+        )
 
     def get_response(
         self,
-        image: Union[str, bytes, Image.Image],
-        json_schema: dict,
+        image: Union[str, bytes, BinaryIO, Image.Image, OCRText, ReceiptTile],
+        json_schema: Union[dict, ExtractionProfile],
         model: Optional[str] = None,
         response_format_type: Optional[str] = None,
-    ) -> ChatCompletion:
-        """Get the response from the OpenAI API."""
-        # Encode image to base64 using utility function
-        img_str = encode_image_to_base64(image)
-
-        # Create the system prompt
-        system_prompt = SYSTEM_PROMPT.format(
-            json_schema_content=json.dumps(json_schema, indent=2)
-        )
+        stream: bool = False,
+    ) -> Union[ChatCompletion, Stream[ChatCompletionChunk]]:
+        """Get the response from the OpenAI API.
 
-        response_format_type = response_format_type or "json_object"
-        if response_format_type not in ["json_object", "json_schema", "text"]:
-            raise ValueError(
-                f"Invalid response_format_type: {response_format_type}. Supported: json_object, json_schema, text"
+        With ``stream=True`` the completion is returned as a stream of chunks
+        as it is generated, see ``IncrementalReceiptParser``.
+        An ``OCRText`` is sent as its text instead of an image, and a
+        ``ReceiptTile`` with a prompt naming the part of the receipt it is.
+        """
+        # The image size is needed for the token estimate
+        with collect(current_report() or ProcessingReport()) as report:
+            request = _build_request(
+                image,
+                json_schema,
+                model,
+                response_format_type,
+                self.image_options,
+                stream,
             )
-        # Set response format based on type
-        if response_format_type == "json_schema":
-            response_format = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "receipt_data",
-                    "schema": json_schema,
-                    "strict": True,
-                },
-            }
-        elif response_format_type == "text":
-            response_format = {"type": "text"}
-        else:
-            response_format = {"type": "json_object"}
-
-        response = self.client.chat.completions.create(
-            model=model or os.getenv("OPENAI_MODEL", _DEFAULT_OPENAI_MODEL),
-            response_format=response_format,
-            temperature=0.2,
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": USER_PROMPT},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:image/png;base64,{img_str}"},
-                        },
-                    ],
-                },
-            ],
+        if self.rate_limiter is None:
+            return self._create(request)
+        tokens = self.rate_limiter.estimate_tokens(request, report.image_size)
+        return self.rate_limiter.call(lambda: self._create(request), tokens)
+
+    def _create(self, request: dict) -> ChatCompletion:
+        with record("http"):
+            return self.client.chat.completions.create(**request)
+
+    def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open connections to the API ahead of the first requests.
+
+        Sends ``connections`` concurrent model list requests, so that many
+        connections (with their TLS handshakes) are set up and left idle in
+        the pool for the first receipts. Errors are ignored, this is best
+        effort.
+
+        Args:
+            connections: Number of connections to open.
+            timeout: Timeout of the requests, in seconds, so that a stalled
+                endpoint does not hold up startup for the read timeout.
+
+        Returns:
+            Number of requests that reached the server.
+        """
+        client = self.client.with_options(max_retries=0, timeout=timeout)
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+            return sum(
+                executor.map(lambda _: _reached(client.models.list), range(connections))
+            )
+
+
+class AsyncOpenAIProvider(AsyncLLMProvider):
+    """Asynchronous LLM provider for OpenAI-compatible APIs.
+
+    Uses ``AsyncOpenAI`` so that many requests can be in flight on a
+    single event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        image_format: str = _DEFAULT_IMAGE_FORMAT,
+        image_quality: int = _DEFAULT_IMAGE_QUALITY,
+        image_passthrough: bool = True,
+        max_image_size: int = _DEFAULT_MAX_IMAGE_SIZE,
+        rate_limiter: Optional[RateLimiter] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_retries: Optional[int] = None,
+    ):
+        """Initialize the async OpenAI provider.
+
+        See ``OpenAIProvider`` for the arguments, ``http_client`` is an
+        ``httpx.AsyncClient`` here, see ``create_async_http_client``.
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.image_options = {
+            "max_size": max_image_size,
+            "image_format": image_format,
+            "quality": image_quality,
+            "passthrough": image_passthrough,
+        }
+        self.rate_limiter = rate_limiter
+        client_options = {}
+        if max_retries is not None:
+            client_options["max_retries"] = max_retries
+        if rate_limiter is not None:
+            # The rate limiter schedules retries, the SDK would bypass it
+            client_options["max_retries"] = 0
+        if http_client is not None:
+            client_options["http_client"] = http_client
+        self.client = AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, **client_options
         )
 
-        return response
+    async def get_response(
+        self,
+        image: Union[str, bytes, BinaryIO, Image.Image, OCRText, ReceiptTile],
+        json_schema: Union[dict, ExtractionProfile],
+        model: Optional[str] = None,
+        response_format_type: Optional[str] = None,
+        stream: bool = False,
+    ) -> Union[ChatCompletion, AsyncStream[ChatCompletionChunk]]:
+        """Get the response from the OpenAI API.
+
+        With ``stream=True`` the completion is returned as an async stream of
+        chunks as it is generated.
+        An ``OCRText`` is sent as its text instead of an image, and a
+        ``ReceiptTile`` with a prompt naming the part of the receipt it is.
+        """
+        with collect(current_report() or ProcessingReport()) as report:
+            # Image decoding and encoding is CPU-bound, keep it off the event loop
+            request = await asyncio.to_thread(
+                _build_request,
+                image,
+                json_schema,
+                model,
+                response_format_type,
+                self.image_options,
+                stream,
+            )
+        if self.rate_limiter is None:
+            return await self._create(request)
+        tokens = self.rate_limiter.estimate_tokens(request, report.image_size)
+        return await self.rate_limiter.acall(lambda: self._create(request), tokens)
+
+    async def _create(self, request: dict) -> ChatCompletion:
+        with record("http"):
+            return await self.client.chat.completions.create(**request)
+
+    async def warm_up(
+        self, connections: int = 1, timeout: float = _DEFAULT_WARM_UP_TIMEOUT
+    ) -> int:
+        """Open connections to the API ahead of the first requests.
+
+        See ``OpenAIProvider.warm_up``.
+        """
+        client = self.client.with_options(max_retries=0, timeout=timeout)
+        reached = await asyncio.gather(
+            *(_areached(client.models.list) for _ in range(connections))
+        )
+        return sum(reached)
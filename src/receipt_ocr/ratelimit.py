@@ -0,0 +1,251 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import openai
+
+from receipt_ocr.constants import (
+    _DEFAULT_COMPLETION_TOKENS,
+    _DEFAULT_MAX_BACKOFF,
+    _DEFAULT_MAX_RETRIES,
+)
+from receipt_ocr.instrumentation import estimate_image_tokens, record
+
+# Rough size of a token in characters of English prompt text
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_request_tokens(
+    request: Dict[str, Any],
+    image_size: Optional[Tuple[int, int]] = None,
+    completion_tokens: int = _DEFAULT_COMPLETION_TOKENS,
+) -> int:
+    """Estimate the tokens a chat completion request counts against a TPM limit.
+
+    Args:
+        request: Keyword arguments of ``chat.completions.create``.
+        image_size: Size of the image sent with the request, if any.
+        completion_tokens: Expected length of the response.
+
+    Returns:
+        Estimated prompt plus completion tokens.
+    """
+    chars = 0
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content)
+    tokens = chars // _CHARS_PER_TOKEN + completion_tokens
+    if image_size is not None:
+        tokens += estimate_image_tokens(*image_size)
+    return tokens
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Return the delay requested by a ``Retry-After`` style header, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return float(retry_after_ms) / 1000
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            retry_at = parsedate_to_datetime(retry_after)
+            return retry_at.timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Whether a request failure is transient (the same set the SDK retries)."""
+    if isinstance(exc, openai.APIConnectionError):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+class _TokenBucket:
+    """A token bucket that hands out reservations instead of rejecting.
+
+    The level may go negative: every reservation is granted immediately and
+    told how long to wait, so concurrent callers queue up in order and are
+    spaced evenly instead of retrying in lockstep.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole bucket must still be able to run
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Schedules requests under requests-per-minute and tokens-per-minute limits.
+
+    Requests wait for budget before they are sent rather than being fired and
+    rejected. Token budgets are reserved from an estimate and corrected with
+    the usage reported in the response. Rate limit and other transient errors
+    are retried after the server's ``Retry-After`` delay (or an exponential
+    backoff) plus jitter, and a 429 pauses every request sharing the limiter,
+    not just the one that failed.
+
+    One limiter can be shared by several providers, threads and event loops
+    that draw from the same API quota.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = _DEFAULT_MAX_RETRIES,
+        max_backoff: float = _DEFAULT_MAX_BACKOFF,
+        jitter: float = 0.2,
+        completion_tokens: int = _DEFAULT_COMPLETION_TOKENS,
+    ):
+        """Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Request budget, unlimited if not set.
+            tokens_per_minute: Token budget, unlimited if not set.
+            max_retries: How many times a failed request is retried.
+            max_backoff: Upper bound of the backoff between retries in seconds.
+            jitter: Relative random delay added to every retry, e.g. 0.2 for up
+                to 20% on top of the requested delay.
+            completion_tokens: Expected response length used in token estimates.
+        """
+        if requests_per_minute is not None and requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        if tokens_per_minute is not None and tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.completion_tokens = completion_tokens
+        self._requests = (
+            _TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.rate_limited = 0
+
+    def estimate_tokens(
+        self, request: Dict[str, Any], image_size: Optional[Tuple[int, int]] = None
+    ) -> int:
+        """Estimate the tokens of a request, see ``estimate_request_tokens``."""
+        return estimate_request_tokens(request, image_size, self.completion_tokens)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve budget for one request.
+
+        Returns:
+            Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None and tokens:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            return delay
+
+    def _settle(self, tokens: int, response: Any) -> None:
+        """Correct the token reservation with the usage the server reported."""
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if self._tokens is None or not isinstance(total_tokens, int):
+            return
+        with self._lock:
+            self._tokens.refund(tokens - total_tokens)
+
+    def _retry_delay(self, exc: BaseException, attempt: int, tokens: int) -> float:
+        """Return how long to wait before retrying, or re-raise ``exc``."""
+        if attempt >= self.max_retries or not _is_retryable(exc):
+            raise exc
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = random.uniform(0.5, 1.0) * min(self.max_backoff, 0.5 * 2**attempt)
+        delay = max(0.0, delay) * (1 + random.uniform(0, self.jitter))
+
+        with self._lock:
+            self.retries += 1
+            # The rejected request did not use its budget
+            if self._tokens is not None:
+                self._tokens.refund(tokens)
+            if getattr(exc, "status_code", None) == 429:
+                # Hold back everyone else too, or they will be rejected as well
+                self.rate_limited += 1
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, func: Callable[[], Any], tokens: int = 0) -> Any:
+        """Call ``func`` within the budget, retrying transient failures.
+
+        Args:
+            func: Sends the request and returns the response.
+            tokens: Estimated tokens of the request.
+        """
+        attempt = 0
+        while True:
+            delay = self.reserve(tokens)
+            if delay > 0:
+                with record("ratelimit"):
+                    time.sleep(delay)
+            try:
+                response = func()
+            except Exception as exc:
+                delay = self._retry_delay(exc, attempt, tokens)
+                attempt += 1
+                with record("ratelimit"):
+                    time.sleep(delay)
+                continue
+            self._settle(tokens, response)
+            return response
+
+    async def acall(self, func: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Async version of ``call``, ``func`` returns an awaitable."""
+        attempt = 0
+        while True:
+            delay = self.reserve(tokens)
+            if delay > 0:
+                with record("ratelimit"):
+                    await asyncio.sleep(delay)
+            try:
+                response = await func()
+            except Exception as exc:
+                delay = self._retry_delay(exc, attempt, tokens)
+                attempt += 1
+                with record("ratelimit"):
+                    await asyncio.sleep(delay)
+                continue
+            self._settle(tokens, response)
+            return response
+
+    def stats(self) -> Dict[str, int]:
+        """Return retry counters."""
+        return {"retries": self.retries, "rate_limited": self.rate_limited}
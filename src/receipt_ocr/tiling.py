@@ -0,0 +1,250 @@
+import io
+import math
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from PIL import Image
+
+from receipt_ocr.constants import (
+    _DEFAULT_MAX_IMAGE_SIZE,
+    _DEFAULT_MAX_TILES,
+    _DEFAULT_TILE_MIN_ASPECT_RATIO,
+    _DEFAULT_TILE_OVERLAP,
+)
+from receipt_ocr.instrumentation import ProcessingReport
+
+# Item names read from two tiles that are at least this similar are the
+# same item, e.g. "Org. Bananas" and "Org Bananas"
+_NAME_SIMILARITY = 0.8
+
+
+@dataclass
+class ReceiptTile:
+    """One horizontal strip of a long receipt, sent to the LLM in place of
+    the whole image.
+
+    Providers send it with a prompt telling the model which part of the
+    receipt it is (``index`` from 0 out of ``count``).
+    """
+
+    image: Image.Image
+    index: int
+    count: int
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == 0 or value in ("", [], {})
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if isinstance(a, str) and isinstance(b, str):
+        a, b = _normalize(a), _normalize(b)
+        return a == b or SequenceMatcher(None, a, b).ratio() >= _NAME_SIMILARITY
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) < 0.005
+    return a == b
+
+
+def _same_item(a: Any, b: Any) -> bool:
+    """Whether two list elements read from neighbouring tiles are the same."""
+    if not (isinstance(a, dict) and isinstance(b, dict)):
+        return _same_value(a, b)
+    common = [
+        key for key in a if key in b and not _is_empty(a[key]) and not _is_empty(b[key])
+    ]
+    return bool(common) and all(_same_value(a[key], b[key]) for key in common)
+
+
+def _is_partial(item: Any) -> bool:
+    return isinstance(item, dict) and any(_is_empty(value) for value in item.values())
+
+
+def _fill(head: Any, tail: Any) -> Any:
+    """An element read in both tiles, with the fields cut from one of them
+    taken from the other."""
+    if not (isinstance(head, dict) and isinstance(tail, dict)):
+        return head
+    filled = dict(head)
+    for key, value in tail.items():
+        if _is_empty(filled.get(key)) and not _is_empty(value):
+            filled[key] = value
+    return filled
+
+
+def _merge_lists(head: List[Any], tail: List[Any]) -> List[Any]:
+    """Append the elements of the next tile, without those of the overlap.
+
+    The overlap is the longest run of elements ending ``head`` that also
+    starts ``tail``. An element cut by the edge of a tile is read partially,
+    or not at all, so one element may be skipped on either side of the
+    overlap, and the cut one is dropped. To keep distinct elements, that is
+    only done for an overlap of several elements or a skipped element with
+    empty fields. Elements of the overlap take the fields missing on one
+    side from the other.
+    """
+    best = None
+    for skip_head in (0, 1):
+        for skip_tail in (0, 1):
+            end = len(head) - skip_head
+            limit = min(end, len(tail) - skip_tail)
+            skipped = head[end:] + tail[:skip_tail]
+            for size in range(limit, 0, -1):
+                if size == 1 and skipped and not all(map(_is_partial, skipped)):
+                    break
+                if all(
+                    _same_item(head[end - size + i], tail[skip_tail + i])
+                    for i in range(size)
+                ):
+                    # The longest overlap wins, then the one skipping least
+                    if best is None or size > best[0]:
+                        best = (size, skip_head, skip_tail)
+                    break
+    if best is None:
+        return head + tail
+    size, skip_head, skip_tail = best
+    end = len(head) - skip_head
+    overlap = [_fill(head[end - size + i], tail[skip_tail + i]) for i in range(size)]
+    return head[: end - size] + overlap + tail[skip_tail + size :]
+
+
+def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the results of the tiles of a receipt, from top to bottom.
+
+    Lists, such as the ``line_items``, are concatenated without the
+    elements read twice in the overlaps, see ``_merge_lists``. Other fields
+    take the first value that is not empty (null, "", 0), e.g. the merchant
+    from the top tile and the total from the bottom one.
+    """
+    merged: Dict[str, Any] = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, list):
+                merged[key] = _merge_lists(merged.get(key) or [], value)
+            elif key not in merged or (_is_empty(merged[key]) and not _is_empty(value)):
+                merged[key] = value
+    return merged
+
+
+def combine_reports(
+    report: ProcessingReport, tile_reports: List[ProcessingReport]
+) -> None:
+    """Add the reports of concurrently processed tiles to ``report``.
+
+    Sizes and tokens are summed, stage durations take the slowest tile.
+    """
+    report.tiles = len(tile_reports)
+    for name in (
+        "payload_bytes",
+        "prompt_tokens",
+        "completion_tokens",
+        "total_tokens",
+        "cached_tokens",
+    ):
+        values = [getattr(r, name) for r in tile_reports]
+        if any(value is not None for value in values):
+            setattr(report, name, sum(value or 0 for value in values))
+    for tile_report in tile_reports:
+        for name, elapsed in tile_report.stages.items():
+            report.stages[name] = max(report.stages.get(name, 0.0), elapsed)
+
+
+class Tiler:
+    """Splits tall receipts into overlapping tiles read at full resolution.
+
+    Images are scaled down to the provider's ``max_image_size`` on their
+    long side, which leaves a long receipt's line items unreadable. A
+    receipt at least ``min_aspect_ratio`` times taller than wide is instead
+    cut into horizontal strips, each at most ``tile_size`` pixels on its
+    long side once scaled, overlapping by ``overlap`` of their height. The
+    tiles are processed concurrently, so the latency is that of the slowest
+    tile, and their results are merged with ``merge_results``.
+    """
+
+    def __init__(
+        self,
+        min_aspect_ratio: float = _DEFAULT_TILE_MIN_ASPECT_RATIO,
+        overlap: float = _DEFAULT_TILE_OVERLAP,
+        max_tiles: int = _DEFAULT_MAX_TILES,
+        tile_size: int = _DEFAULT_MAX_IMAGE_SIZE,
+    ):
+        """Initialize the tiler.
+
+        Args:
+            min_aspect_ratio: Smallest height to width ratio that is tiled.
+            overlap: Fraction of a tile's height shared with the next one,
+                it should fit a few lines of text.
+            max_tiles: Most tiles per receipt. Longer receipts get taller
+                tiles, which are scaled down more.
+            tile_size: Long side of a scaled tile, the provider's
+                ``max_image_size``.
+        """
+        if not 0 <= overlap < 0.5:
+            raise ValueError("overlap must be at least 0 and less than 0.5")
+        if max_tiles < 2:
+            raise ValueError("max_tiles must be at least 2")
+        self.min_aspect_ratio = min_aspect_ratio
+        self.overlap = overlap
+        self.max_tiles = max_tiles
+        self.tile_size = tile_size
+
+    def tile_bounds(self, width: int, height: int) -> Optional[List[tuple]]:
+        """Vertical ``(top, bottom)`` bounds of the tiles of an image, or None
+        when it is not tiled."""
+        if height < self.min_aspect_ratio * width or height <= self.tile_size:
+            return None
+        # Tiles are tile_size tall, or square when the receipt is wider than
+        # that, so that they are not scaled down beyond the width
+        tile_height = max(self.tile_size, width)
+        overlap = round(self.overlap * tile_height)
+        count = math.ceil((height - overlap) / (tile_height - overlap))
+        if count < 2:
+            return None
+        if count > self.max_tiles:
+            count = self.max_tiles
+            tile_height = math.ceil(
+                height / (count * (1 - self.overlap) + self.overlap)
+            )
+        # Spread the tiles evenly, the overlaps are at least ``overlap``
+        step = (height - tile_height) / (count - 1)
+        return [
+            (round(index * step), round(index * step) + tile_height)
+            for index in range(count)
+        ]
+
+    def split(
+        self, image: Union[str, bytes, BinaryIO, Image.Image]
+    ) -> Optional[List[ReceiptTile]]:
+        """Cut a receipt into tiles, top to bottom.
+
+        Returns:
+            The tiles, or None when the receipt is not tall enough to be
+            tiled and is to be sent as is.
+        """
+        if isinstance(image, Image.Image):
+            return self._crop(image)
+        source = io.BytesIO(image) if isinstance(image, bytes) else image
+        with Image.open(source) as opened:
+            # Opening an image only reads its header, so this check is cheap
+            if self.tile_bounds(*opened.size) is None:
+                if hasattr(image, "read") and hasattr(image, "seek"):
+                    image.seek(0)
+                return None
+            # Decoded before the file is closed, the tiles are copies
+            opened.load()
+            return self._crop(opened)
+
+    def _crop(self, image: Image.Image) -> Optional[List[ReceiptTile]]:
+        bounds = self.tile_bounds(*image.size)
+        if bounds is None:
+            return None
+        width = image.size[0]
+        return [
+            ReceiptTile(image.crop((0, top, width, bottom)), index, len(bounds))
+            for index, (top, bottom) in enumerate(bounds)
+        ]
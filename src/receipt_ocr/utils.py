@@ -1,39 +1,131 @@
 import base64
 import io
-from typing import Union
+import json
+import os
+from typing import Any, BinaryIO, Tuple, Union
 from PIL import Image
 
+from receipt_ocr.instrumentation import current_report, record
 
-def encode_image_to_base64(
-    image: Union[str, bytes, Image.Image], max_size: int = 1080
-) -> str:
-    """Encode an image to base64 string.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
-    Args:
-        image: Image source (file path, bytes, or PIL Image)
-        max_size: Maximum dimension for resizing (maintains aspect ratio)
+# Image formats accepted by OpenAI-compatible vision APIs
+_MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+_OUTPUT_FORMATS = ("PNG", "JPEG", "WEBP")
+_DEFAULT_PASSTHROUGH_MAX_BYTES = 1024 * 1024
 
-    Returns:
-        Base64 encoded string of the image
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON, using ``orjson`` when it is installed.
+
+    Raises:
+        ValueError: If the data is not valid JSON (``json.JSONDecodeError``
+            with either backend).
     """
-    # Handle different image input types
-    if isinstance(image, str):
-        # File path
-        pil_image = Image.open(image)
-    elif isinstance(image, bytes):
-        # Image bytes
-        pil_image = Image.open(io.BytesIO(image))
-    elif isinstance(image, Image.Image):
-        # PIL Image object
-        pil_image = image
-    else:
-        raise ValueError(f"Unsupported image type: {type(image)}")
-
-    # Convert to RGB if necessary
-    if pil_image.mode not in ("RGB", "L"):
-        pil_image = pil_image.convert("RGB")
-
-    # Resize if too large (maintain aspect ratio)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, using ``orjson`` when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers beyond 64 bits, the standard library handles them
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _normalize_format(image_format: str) -> str:
+    """Normalize an output format name such as "jpg" or "webp"."""
+    normalized = image_format.upper()
+    if normalized == "JPG":
+        normalized = "JPEG"
+    if normalized not in _OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported image format: {image_format}. Supported: png, jpeg, webp"
+        )
+    return normalized
+
+
+def _file_size(file: BinaryIO) -> int:
+    """Size of a seekable binary file, which is left at its start."""
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _encode_image_bytes(
+    image: Union[str, bytes, BinaryIO, Image.Image],
+    max_size: int,
+    image_format: str,
+    quality: int,
+    passthrough: bool,
+    passthrough_max_bytes: int,
+) -> Tuple[Union[bytes, memoryview], str, Tuple[int, int]]:
+    """Return the bytes to upload, their MIME type and the image size."""
+    image_format = _normalize_format(image_format)
+    report = current_report()
+
+    # Handle different image input types. Files are only read into memory
+    # when they may be passed through, otherwise PIL reads them in place.
+    raw = None
+    with record("open"):
+        if isinstance(image, str):
+            # File path
+            input_bytes = os.path.getsize(image)
+            if passthrough and input_bytes <= passthrough_max_bytes:
+                with open(image, "rb") as f:
+                    raw = f.read()
+                pil_image = Image.open(io.BytesIO(raw))
+            else:
+                pil_image = Image.open(image)
+        elif isinstance(image, bytes):
+            # Image bytes
+            raw = image
+            input_bytes = len(raw)
+            pil_image = Image.open(io.BytesIO(image))
+        elif isinstance(image, Image.Image):
+            # PIL Image object
+            input_bytes = None
+            pil_image = image
+        elif hasattr(image, "read") and hasattr(image, "seek"):
+            # Binary file object, e.g. a spooled upload
+            input_bytes = _file_size(image)
+            if passthrough and input_bytes <= passthrough_max_bytes:
+                raw = image.read()
+                pil_image = Image.open(io.BytesIO(raw))
+            else:
+                pil_image = Image.open(image)
+        else:
+            raise ValueError(f"Unsupported image type: {type(image)}")
+    if report is not None and input_bytes is not None:
+        report.input_bytes = input_bytes
+
+    # Opening an image only reads its header, so this check is cheap
+    if (
+        passthrough
+        and raw is not None
+        and pil_image.format in _MIME_TYPES
+        and len(raw) <= passthrough_max_bytes
+        and max(pil_image.size) <= max_size
+        and not getattr(pil_image, "is_animated", False)
+    ):
+        return raw, _MIME_TYPES[pil_image.format], pil_image.size
+
+    # Compute the target size if too large (maintain aspect ratio)
+    target_size = None
     if max(pil_image.size) > max_size:
         w, h = pil_image.size
         if w > h:
@@ -42,11 +134,128 @@ def encode_image_to_base64(
         else:
             new_h = max_size
             new_w = int(w * max_size / h)
-        pil_image = pil_image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        target_size = (new_w, new_h)
+        if not isinstance(image, Image.Image):
+            # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 while decoding
+            # so the full-resolution image is never materialized (no-op
+            # for other formats)
+            pil_image.draft(None, target_size)
+
+    with record("decode"):
+        # Convert to RGB if necessary
+        if pil_image.mode not in ("RGB", "L"):
+            pil_image = pil_image.convert("RGB")
+        pil_image.load()
+
+    if target_size is not None:
+        with record("resize"):
+            # reducing_gap shrinks by an integer factor with reduce()
+            # first, so LANCZOS only resamples an image close to the
+            # target size
+            pil_image = pil_image.resize(
+                target_size, Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
+
+    # Convert to the output format and encode
+    with record("encode"):
+        buffered = io.BytesIO()
+        if image_format == "PNG":
+            pil_image.save(buffered, format="PNG")
+        else:
+            pil_image.save(buffered, format=image_format, quality=quality)
+    # A view of the encoded bytes, getvalue() would copy them
+    return buffered.getbuffer(), _MIME_TYPES[image_format], pil_image.size
 
-    # Convert to PNG and encode
-    buffered = io.BytesIO()
-    pil_image.save(buffered, format="PNG")
-    img_bytes = buffered.getvalue()
 
-    return base64.b64encode(img_bytes).decode("utf-8")
+def _record_payload(
+    payload_bytes: int, mime_type: str, image_size: Tuple[int, int]
+) -> None:
+    report = current_report()
+    if report is not None:
+        report.payload_bytes = payload_bytes
+        report.image_size = image_size
+        report.mime_type = mime_type
+
+
+def encode_image(
+    image: Union[str, bytes, BinaryIO, Image.Image],
+    max_size: int = 1080,
+    image_format: str = "PNG",
+    quality: int = 85,
+    passthrough: bool = False,
+    passthrough_max_bytes: int = _DEFAULT_PASSTHROUGH_MAX_BYTES,
+) -> Tuple[str, str]:
+    """Encode an image to a base64 string and return it with its MIME type.
+
+    Args:
+        image: Image source (file path, bytes, binary file object, or PIL Image)
+        max_size: Maximum dimension for resizing (maintains aspect ratio)
+        image_format: Output format, one of "png", "jpeg" or "webp"
+        quality: Output quality for lossy formats (1-100)
+        passthrough: Send the original bytes untouched when they are already
+            in a supported format, within ``max_size`` and at most
+            ``passthrough_max_bytes`` long
+        passthrough_max_bytes: Largest original file that may be passed through
+
+    Returns:
+        Tuple of the base64 encoded image and its MIME type
+    """
+    data, mime_type, image_size = _encode_image_bytes(
+        image, max_size, image_format, quality, passthrough, passthrough_max_bytes
+    )
+    with record("base64"):
+        img_str = base64.b64encode(data).decode("ascii")
+    _record_payload(len(img_str), mime_type, image_size)
+    return img_str, mime_type
+
+
+def encode_image_to_data_url(
+    image: Union[str, bytes, BinaryIO, Image.Image],
+    max_size: int = 1080,
+    image_format: str = "PNG",
+    quality: int = 85,
+    passthrough: bool = False,
+    passthrough_max_bytes: int = _DEFAULT_PASSTHROUGH_MAX_BYTES,
+) -> str:
+    """Encode an image to a base64 ``data:`` URL.
+
+    Same as ``encode_image``, but builds the URL sent to the model directly
+    and drops every intermediate buffer as soon as it has been consumed, so
+    at most two copies of the payload are alive at any time.
+    """
+    data, mime_type, image_size = _encode_image_bytes(
+        image, max_size, image_format, quality, passthrough, passthrough_max_bytes
+    )
+    with record("base64"):
+        encoded = base64.b64encode(data)
+        del data
+        payload_bytes = len(encoded)
+        url = b"data:%s;base64,%s" % (mime_type.encode("ascii"), encoded)
+        del encoded
+        url = url.decode("ascii")
+    _record_payload(payload_bytes, mime_type, image_size)
+    return url
+
+
+def encode_image_to_base64(
+    image: Union[str, bytes, BinaryIO, Image.Image],
+    max_size: int = 1080,
+    image_format: str = "PNG",
+    quality: int = 85,
+    passthrough: bool = False,
+) -> str:
+    """Encode an image to base64 string.
+
+    Args:
+        image: Image source (file path, bytes, binary file object, or PIL Image)
+        max_size: Maximum dimension for resizing (maintains aspect ratio)
+        image_format: Output format, one of "png", "jpeg" or "webp"
+        quality: Output quality for lossy formats (1-100)
+        passthrough: Send the original bytes untouched when possible, see
+            ``encode_image``
+
+    Returns:
+        Base64 encoded string of the image
+    """
+    img_str, _ = encode_image(image, max_size, image_format, quality, passthrough)
+    return img_str
@@ -0,0 +1,568 @@
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from receipt_ocr.profiles import ExtractionProfile
+
+# A compiled schema node: (value, path, errors) -> coerced value
+_Node = Callable[[Any, str, List[str]], Any]
+
+_JSON_TYPES = ("object", "array", "string", "number", "integer", "boolean", "null")
+
+# Currency symbols, ISO 4217 codes and common abbreviations around amounts
+_CURRENCY = r"(?:[$€£¥₹₩₽₺₪฿₫₱₦₴¢]|[A-Z]{3}|Rs\.?|kr\.?|zł|Fr\.?|Ft)"
+# A whole amount: an optional sign and currency, then digits with thousands
+# or decimal separators, e.g. "1,234.56", "12,50" or "1 234,50" with a
+# space, (narrow) no-break space or apostrophe grouping the thousands
+_NUMBER_RE = re.compile(
+    rf"([-−+])?\s*(?:{_CURRENCY}\s*)?([-−])?\s*"
+    r"(\d+(?:[.,]\d+|[ '\u00a0\u202f]\d{3})*)"
+    rf"\s*{_CURRENCY}?"
+)
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_NUMERIC_DATE_RE = re.compile(r"(\d{1,4})[./-](\d{1,2})[./-](\d{1,4})")
+_TIME_RE = re.compile(
+    r"(\d{1,2})[:.](\d{2})(?:[:.](\d{2}))?(?:\.\d+)?\s*([AaPp])?\.?\s*(?:[Mm]\.?)?"
+)
+# Dates with month names, tried after separators and commas are normalized
+_TEXT_DATE_FORMATS = (
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d %Y",
+    "%B %d %Y",
+    "%d %b %y",
+    "%d %B %y",
+    "%b %d %y",
+    "%B %d %y",
+)
+_TRUE = frozenset({"true", "yes", "y", "1"})
+_FALSE = frozenset({"false", "no", "n", "0"})
+
+
+@dataclass
+class ValidationResult:
+    """Coerced result and the schema violations found while coercing it."""
+
+    value: Any
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the result matched the schema after coercion."""
+        return not self.errors
+
+
+def _describe(value: Any) -> str:
+    text = repr(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def _where(path: str) -> str:
+    return path or "<root>"
+
+
+@lru_cache(maxsize=4096)
+def parse_number(text: str) -> Optional[Union[int, float]]:
+    """Parse a number as written on a receipt, e.g. "$1,234.50" or "12,50 €".
+
+    Currency symbols and codes around the number are ignored, a leading
+    minus or surrounding parentheses make it negative, and a single comma
+    followed by other than three digits is taken as the decimal separator.
+    Thousands may also be grouped by spaces or apostrophes. Text with
+    anything else, e.g. a date or "1.5k", is not a number.
+
+    Returns:
+        The number, an ``int`` when it has no decimal part, or None.
+    """
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+        return number if math.isfinite(number) else None
+    except ValueError:
+        pass
+
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1].strip()
+    match = _NUMBER_RE.fullmatch(text)
+    if match is None:
+        return None
+    sign, inner_sign, digits = match.groups()
+    if sign and inner_sign:
+        return None
+    negative = negative or (sign or inner_sign or "+") != "+"
+    for separator in (" ", "'", "\u00a0", "\u202f"):
+        digits = digits.replace(separator, "")
+    comma, dot = digits.rfind(","), digits.rfind(".")
+    if comma >= 0 and dot >= 0:
+        # The last separator is the decimal one: "1.234,50" or "1,234.50"
+        if comma > dot:
+            digits = digits.replace(".", "").replace(",", ".")
+        else:
+            digits = digits.replace(",", "")
+    elif comma >= 0:
+        # "1,234" and "1,234,567" group thousands, "12,5" is a decimal comma
+        if digits.count(",") == 1 and len(digits) - comma - 1 != 3:
+            digits = digits.replace(",", ".")
+        else:
+            digits = digits.replace(",", "")
+    elif digits.count(".") > 1:
+        digits = digits.replace(".", "")
+
+    try:
+        number = float(digits) if "." in digits else int(digits)
+    except ValueError:
+        return None
+    return -number if negative else number
+
+
+@lru_cache(maxsize=4096)
+def parse_date(text: str, dayfirst: bool = False) -> Optional[str]:
+    """Normalize a date in one of the common receipt formats to ISO 8601.
+
+    Numeric dates whose day and month can be told apart ("25/12/2024") are
+    read unambiguously, otherwise ``dayfirst`` decides. Two-digit years are
+    taken as 20xx.
+
+    Returns:
+        The date as "YYYY-MM-DD", or None if it could not be parsed.
+    """
+    text = text.strip()
+    try:
+        if _ISO_DATE_RE.match(text):
+            # Also accepts an ISO timestamp, keeping its date part
+            return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        return None
+
+    match = _NUMERIC_DATE_RE.fullmatch(text)
+    if match is not None:
+        first, second, third = match.groups()
+        if len(first) == 4:
+            year, month, day = int(first), int(second), int(third)
+        else:
+            year = int(third) + (2000 if len(third) <= 2 else 0)
+            first, second = int(first), int(second)
+            if first > 12 or (dayfirst and second <= 12):
+                day, month = first, second
+            else:
+                month, day = first, second
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return None
+
+    normalized = " ".join(text.replace(",", " ").replace("-", " ").split())
+    for date_format in _TEXT_DATE_FORMATS:
+        try:
+            return datetime.strptime(normalized, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_time(text: str) -> Optional[str]:
+    """Normalize a time such as "9:09 PM" or "21.09" to "HH:MM:SS".
+
+    Returns:
+        The 24-hour time, or None if it could not be parsed.
+    """
+    match = _TIME_RE.fullmatch(text.strip())
+    if match is None:
+        return None
+    hour, minute, second, meridiem = match.groups()
+    hour, minute, second = int(hour), int(minute), int(second or 0)
+    if meridiem is not None:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem in "Pp" else 0)
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}:{second:02d}"
+
+
+def _is_json_schema(schema: Any) -> bool:
+    """Tell a JSON Schema apart from the shorthand ``{"field": "type"}`` form.
+
+    A shorthand field can be called "type", so only an object or array type,
+    "properties" or "$schema" mark a JSON Schema.
+    """
+    return isinstance(schema, dict) and (
+        isinstance(schema.get("properties"), dict)
+        or schema.get("type") in ("object", "array")
+        or "$schema" in schema
+    )
+
+
+class SchemaValidator:
+    """Coerces extraction results to a schema and reports violations.
+
+    The schema is compiled once into a tree of small functions, so validating
+    a result is a single pass over it with no schema interpretation. Two
+    schema forms are supported:
+
+    - The shorthand used by the CLI and the API server: a dict mapping fields
+      to "string", "number", "integer", "boolean", "date" or "time", nested
+      dicts, and one-element lists for arrays. Every field is expected but
+      may be null, and string fields named like ``*_date`` or ``*_time`` are
+      normalized as dates and times when they parse.
+    - JSON Schema, with ``type`` (including type lists and "null"),
+      ``properties``, ``required``, ``additionalProperties``, ``items``,
+      ``enum``, ``minimum``, ``maximum``, ``anyOf``/``oneOf`` and the
+      "date", "time" and "date-time" formats. Other keywords are ignored.
+
+    Values are coerced where the intent is clear: "$12.50" becomes 12.5,
+    "07/05/2024" becomes "2024-07-05", 3 becomes "3" for a string field.
+    Values that cannot be coerced are kept as they are and reported. The
+    input is never mutated.
+    """
+
+    def __init__(self, json_schema: Any, dayfirst: bool = False):
+        """Compile a validator.
+
+        Args:
+            json_schema: Shorthand schema or JSON Schema of the results.
+            dayfirst: Read ambiguous numeric dates such as "05/07/2024" as
+                day/month instead of month/day.
+        """
+        self.json_schema = json_schema
+        self.dayfirst = dayfirst
+        if _is_json_schema(json_schema):
+            self._node = self._compile(json_schema)
+        else:
+            self._node = self._compile_shorthand(json_schema)
+
+    def validate(self, data: Any) -> ValidationResult:
+        """Coerce a result to the schema.
+
+        Returns:
+            ValidationResult with the coerced copy of ``data`` and the
+            violations, as "path: problem" strings.
+        """
+        errors: List[str] = []
+        value = self._node(data, "", errors)
+        return ValidationResult(value, errors)
+
+    # Shorthand schemas
+
+    def _compile_shorthand(self, schema: Any, name: str = "") -> _Node:
+        if _is_json_schema(schema):
+            return self._compile(schema)
+        if isinstance(schema, dict):
+            properties = {
+                key: self._compile_shorthand(value, key)
+                for key, value in schema.items()
+            }
+            # Every field is expected, extra ones are kept
+            return _nullable(_object(properties, tuple(schema), additional=None))
+        if isinstance(schema, list):
+            items = self._compile_shorthand(schema[0]) if schema else _any
+            return _nullable(_array(items))
+        if schema == "string":
+            # The shorthand has no formats, infer them from the field name
+            lowered = name.lower()
+            if lowered.endswith("date"):
+                return _nullable(_string(self._date, strict=False))
+            if lowered.endswith("time") and not lowered.endswith("datetime"):
+                return _nullable(_string(_time, strict=False))
+            return _nullable(_string())
+        if schema == "date":
+            return _nullable(_string(self._date))
+        if schema == "time":
+            return _nullable(_string(_time))
+        node = _SCALARS.get(schema)
+        # Anything else, e.g. a description, is not checked
+        return _nullable(node) if node is not None else _any
+
+    # JSON Schema
+
+    def _compile(self, schema: Any) -> _Node:
+        if not isinstance(schema, dict):
+            return _any
+        for keyword in ("anyOf", "oneOf"):
+            if isinstance(schema.get(keyword), list):
+                return _union([self._compile(s) for s in schema[keyword]])
+
+        types = schema.get("type")
+        if types is None:
+            if "properties" in schema:
+                types = "object"
+            elif "items" in schema:
+                types = "array"
+        if isinstance(types, str):
+            types = [types]
+        types = [t for t in types or () if t in _JSON_TYPES]
+        nullable = "null" in types or schema.get("nullable") is True
+        types = [t for t in types if t != "null"]
+
+        nodes = [self._compile_type(schema, t) for t in types]
+        if not nodes:
+            node = _any
+        elif len(nodes) == 1:
+            node = nodes[0]
+        else:
+            node = _union(nodes)
+
+        checks = []
+        if isinstance(schema.get("enum"), list):
+            checks.append(_enum(schema["enum"]))
+        if "minimum" in schema or "maximum" in schema:
+            checks.append(_bounds(schema.get("minimum"), schema.get("maximum")))
+        if checks:
+            node = _checked(node, checks)
+        if nullable or not types:
+            node = _nullable(node)
+        else:
+            node = _not_null(node)
+        return node
+
+    def _compile_type(self, schema: Dict[str, Any], json_type: str) -> _Node:
+        if json_type == "object":
+            properties = {
+                key: self._compile(value)
+                for key, value in (schema.get("properties") or {}).items()
+            }
+            additional = schema.get("additionalProperties")
+            if isinstance(additional, dict):
+                additional = self._compile(additional)
+            elif additional is not False:
+                additional = None
+            return _object(properties, tuple(schema.get("required") or ()), additional)
+        if json_type == "array":
+            return _array(self._compile(schema.get("items")))
+        if json_type == "string":
+            string_format = schema.get("format")
+            if string_format == "date":
+                return _string(self._date)
+            if string_format == "time":
+                return _string(_time)
+            if string_format == "date-time":
+                return _string(_date_time)
+            return _string()
+        return _SCALARS[json_type]
+
+    def _date(self, value: str) -> Optional[str]:
+        return parse_date(value, self.dayfirst)
+
+
+def _any(value: Any, path: str, errors: List[str]) -> Any:
+    return value
+
+
+def _nullable(node: _Node) -> _Node:
+    def nullable(value, path, errors):
+        return None if value is None else node(value, path, errors)
+
+    return nullable
+
+
+def _not_null(node: _Node) -> _Node:
+    def not_null(value, path, errors):
+        if value is None:
+            errors.append(f"{_where(path)}: must not be null")
+            return value
+        return node(value, path, errors)
+
+    return not_null
+
+
+def _object(
+    properties: Dict[str, _Node],
+    required: Sequence[str],
+    additional: Union[None, bool, _Node],
+) -> _Node:
+    def obj(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f"{_where(path)}: expected an object, got {_describe(value)}")
+            return value
+        result = {}
+        for key, item in value.items():
+            node = properties.get(key)
+            if node is not None:
+                result[key] = node(item, _join(path, key), errors)
+            elif additional is False:
+                errors.append(f"{_join(path, key)}: unexpected property")
+            elif additional is None:
+                result[key] = item
+            else:
+                result[key] = additional(item, _join(path, key), errors)
+        for key in required:
+            if key not in value:
+                errors.append(f"{_join(path, key)}: missing required property")
+        return result
+
+    return obj
+
+
+def _array(items: _Node) -> _Node:
+    def array(value, path, errors):
+        if not isinstance(value, list):
+            errors.append(f"{_where(path)}: expected an array, got {_describe(value)}")
+            return value
+        if items is _any:
+            return list(value)
+        return [items(item, f"{path}[{i}]", errors) for i, item in enumerate(value)]
+
+    return array
+
+
+def _string(
+    parse: Optional[Callable[[str], Optional[str]]] = None, strict: bool = True
+) -> _Node:
+    """String node, normalizing the value with ``parse`` when given.
+
+    A value ``parse`` rejects is reported when ``strict``, otherwise kept.
+    """
+
+    def string(value, path, errors):
+        if not isinstance(value, str):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            else:
+                errors.append(
+                    f"{_where(path)}: expected a string, got {_describe(value)}"
+                )
+                return value
+        if parse is None:
+            return value
+        parsed = parse(value)
+        if parsed is not None:
+            return parsed
+        if strict:
+            errors.append(f"{_where(path)}: invalid format {_describe(value)}")
+        return value
+
+    return string
+
+
+def _time(value: str) -> Optional[str]:
+    return parse_time(value)
+
+
+def _date_time(value: str) -> Optional[str]:
+    try:
+        datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return value.strip()
+
+
+def _number(value: Any, path: str, errors: List[str]) -> Any:
+    kind = type(value)
+    if kind is float or kind is int:
+        return value
+    if kind is str:
+        number = parse_number(value)
+        if number is not None:
+            return number
+    errors.append(f"{_where(path)}: expected a number, got {_describe(value)}")
+    return value
+
+
+def _integer(value: Any, path: str, errors: List[str]) -> Any:
+    if type(value) is int:
+        return value
+    number = _number(value, path, errors)
+    if isinstance(number, float):
+        if number.is_integer():
+            return int(number)
+        errors.append(f"{_where(path)}: expected an integer, got {_describe(value)}")
+    return number
+
+
+def _boolean(value: Any, path: str, errors: List[str]) -> Any:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    errors.append(f"{_where(path)}: expected a boolean, got {_describe(value)}")
+    return value
+
+
+_SCALARS: Dict[str, _Node] = {
+    "string": _string(),
+    "number": _number,
+    "integer": _integer,
+    "boolean": _boolean,
+}
+
+
+def _union(nodes: List[_Node]) -> _Node:
+    def union(value, path, errors):
+        for node in nodes:
+            attempt: List[str] = []
+            result = node(value, path, attempt)
+            if not attempt:
+                return result
+        errors.append(
+            f"{_where(path)}: {_describe(value)} does not match any allowed schema"
+        )
+        return value
+
+    return union
+
+
+def _enum(allowed: List[Any]) -> Callable[[Any, str, List[str]], None]:
+    def enum(value, path, errors):
+        if value not in allowed:
+            errors.append(f"{_where(path)}: {_describe(value)} is not one of {allowed}")
+
+    return enum
+
+
+def _bounds(
+    minimum: Optional[float], maximum: Optional[float]
+) -> Callable[[Any, str, List[str]], None]:
+    def bounds(value, path, errors):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return
+        if minimum is not None and value < minimum:
+            errors.append(f"{_where(path)}: {value} is less than {minimum}")
+        if maximum is not None and value > maximum:
+            errors.append(f"{_where(path)}: {value} is greater than {maximum}")
+
+    return bounds
+
+
+def _checked(node: _Node, checks: List[Callable[[Any, str, List[str]], None]]) -> _Node:
+    def checked(value, path, errors):
+        value = node(value, path, errors)
+        for check in checks:
+            check(value, path, errors)
+        return value
+
+    return checked
+
+
+@lru_cache(maxsize=128)
+def _compile_validator(schema_json: str, dayfirst: bool) -> SchemaValidator:
+    return SchemaValidator(json.loads(schema_json), dayfirst)
+
+
+def get_validator(
+    json_schema: Union[Dict[str, Any], ExtractionProfile], dayfirst: bool = False
+) -> SchemaValidator:
+    """Return the compiled validator of a schema, compiling it on first use.
+
+    Validators are cached by the schema's content like ``get_profile``, and
+    the schema of an ``ExtractionProfile`` is used as is.
+    """
+    if isinstance(json_schema, ExtractionProfile):
+        json_schema = json_schema.json_schema
+    return _compile_validator(json.dumps(json_schema), dayfirst)
@@ -1,10 +1,32 @@
-import numpy as np
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List
+
 from fastapi import FastAPI, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .pool import OCRPool, PoolFull
+
+# OCR runs in worker processes, one per core by default, so requests use
+# every core and the event loop stays free to answer /health under load
+pool = OCRPool(
+    workers=int(os.getenv("OCR_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("OCR_MAX_QUEUE")) if os.getenv("OCR_MAX_QUEUE") else None,
+)
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+
 
-from .utils import perform_ocr
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the workers up front, the first requests would wait for them
+    await pool.warm_up()
+    yield
+    pool.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
@@ -17,14 +39,80 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+async def stats():
+    return pool.stats()
+
+
 @app.post("/ocr/")
 async def ocr_receipt(file: UploadFile):
     # Check if the uploaded file is an image
     if file.content_type.startswith("image"):
         image_bytes = await file.read()
-        img_array = np.frombuffer(image_bytes, np.uint8)
-
-        ocr_text = perform_ocr(img_array)
+        try:
+            ocr_text = await pool.run(image_bytes)
+        except PoolFull as e:
+            return JSONResponse(
+                content={"error": str(e)},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
         return JSONResponse(content={"result": ocr_text}, status_code=200)
     else:
         return {"error": "Uploaded file is not an image"}
+
+
+@app.post("/ocr/batch")
+async def ocr_receipt_batch(files: List[UploadFile]):
+    """Perform OCR on many receipt images in one request.
+
+    The images are spread over the worker processes, as many at a time as
+    there are workers, so a batch does not fill the queue shared with the
+    other requests. The response is NDJSON with one line per file, written
+    as soon as that file is done (completion order, not upload order):
+    `{"index": 0, "filename": "...", "result": "..."}`, or `"error"` instead
+    of `"result"` when that file failed.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        return JSONResponse(
+            content={"error": f"Too many files. Max {MAX_BATCH_FILES} per batch."},
+            status_code=413,
+        )
+    # The uploads are read before the response starts, they are closed once
+    # this function returns
+    errors, images = [], []
+    for index, file in enumerate(files):
+        if (file.content_type or "").startswith("image"):
+            images.append((index, file.filename, await file.read()))
+        else:
+            errors.append(
+                {
+                    "index": index,
+                    "filename": file.filename,
+                    "error": "Uploaded file is not an image",
+                }
+            )
+    slots = asyncio.Semaphore(pool.workers)
+
+    async def process(index: int, filename: str, image_bytes: bytes) -> dict:
+        line = {"index": index, "filename": filename}
+        async with slots:
+            try:
+                line["result"] = await pool.run(image_bytes)
+            except Exception as e:
+                line["error"] = str(e)
+        return line
+
+    async def lines():
+        for error in errors:
+            yield json.dumps(error) + "\n"
+        tasks = [asyncio.create_task(process(*image)) for image in images]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield json.dumps(await task) + "\n"
+        finally:
+            # When the client goes away, images not sent to a worker are dropped
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
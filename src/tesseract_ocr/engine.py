@@ -0,0 +1,94 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - optional dependency
+    tesserocr = None
+
+# Assume a single uniform block of text, like "--psm 6" for pytesseract
+DEFAULT_PSM = 6
+
+_local = threading.local()
+
+
+class TesseractEngine:
+    """A Tesseract instance kept alive across images, through its C API.
+
+    The language model is loaded once and images are passed in memory,
+    where ``pytesseract`` writes every image to a temporary file and starts
+    the ``tesseract`` binary, which loads the model again. An instance is not
+    thread-safe, use ``get_engine`` for one per thread.
+    """
+
+    def __init__(
+        self, lang: str = "eng", psm: int = DEFAULT_PSM, path: Optional[str] = None
+    ):
+        """Load the language model.
+
+        Args:
+            lang: Tesseract language(s), e.g. "eng" or "eng+deu".
+            psm: Page segmentation mode.
+            path: Directory of the traineddata files, defaults to
+                ``TESSDATA_PREFIX``.
+
+        Raises:
+            RuntimeError: If ``tesserocr`` is not installed or the model
+                cannot be loaded.
+        """
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        path = path or os.getenv("TESSDATA_PREFIX")
+        options = {"lang": lang, "psm": psm}
+        if path:
+            options["path"] = path
+        self.api = tesserocr.PyTessBaseAPI(**options)
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        """Recognize the text of an RGB or grayscale image."""
+        return self.recognize(image)[0]
+
+    def recognize(self, image: np.ndarray) -> Tuple[str, float]:
+        """Recognize the text of an RGB or grayscale image.
+
+        Returns:
+            The text and the mean confidence of its words, from 0 to 100.
+        """
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        # Tesseract reads the buffer without copying it, so it is kept
+        # referenced until the text has been recognized
+        data = image.tobytes()
+        self.api.SetImageBytes(data, width, height, channels, width * channels)
+        text = self.api.GetUTF8Text()
+        return text, float(self.api.MeanTextConf())
+
+    def close(self) -> None:
+        self.api.End()
+
+
+def get_engine() -> Optional[TesseractEngine]:
+    """Return this thread's engine, created on first use.
+
+    The ``OCR_ENGINE`` environment variable picks the backend: "tesserocr",
+    "pytesseract", or "auto" (the default) for tesserocr when it is installed
+    and its model loads, else pytesseract.
+
+    Returns:
+        The engine, or None when pytesseract is to be used.
+    """
+    if not hasattr(_local, "engine"):
+        backend = os.getenv("OCR_ENGINE", "auto").lower()
+        engine = None
+        if backend != "pytesseract":
+            try:
+                engine = TesseractEngine()
+            except RuntimeError:
+                if backend == "tesserocr":
+                    raise
+        _local.engine = engine
+    return _local.engine
@@ -1,96 +1,125 @@
 import argparse
+import glob
+import json
 import os
+import sys
 
-import cv2
-import imutils
-import pytesseract
-from imutils.perspective import four_point_transform
+if __package__:
+    from .pool import iter_ocr_files, ocr_file
+else:
+    # Run as a script, e.g. python src/tesseract_ocr/main.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from tesseract_ocr.pool import iter_ocr_files, ocr_file
+
+# Same list as receipt_ocr's CLI, which this module cannot import since it
+# is deployed on its own
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+
+def _is_image(path: str) -> bool:
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _expand_inputs(paths: list) -> list:
+    """Expand files, directories and glob patterns into image paths.
+
+    Directories are searched recursively. Duplicates are dropped while
+    keeping the first occurrence, so the order is stable across runs.
+    """
+    candidates = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                candidates.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if _is_image(name)
+                )
+        elif glob.has_magic(path):
+            candidates.extend(
+                match
+                for match in sorted(glob.glob(path, recursive=True))
+                if os.path.isfile(match) and _is_image(match)
+            )
+        else:
+            candidates.append(path)
+    return list(dict.fromkeys(candidates))
+
+
+def _run_batch(image_paths: list, args) -> int:
+    """OCR many images and write one JSON line per image."""
+    out = open(args.output, "w") if args.output else sys.stdout
+    failures = 0
+    try:
+        for path, text, error in iter_ocr_files(image_paths, jobs=args.jobs):
+            record = {"image": path}
+            if error is None:
+                record["text"] = text
+            else:
+                record["error"] = error
+                failures += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+    if failures:
+        print(f"{failures} of {len(image_paths)} image(s) failed.", file=sys.stderr)
+        return 1
+    return 0
 
 
 def main():
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(description="OCR receipt images with Tesseract.")
+    parser.add_argument(
+        "images",
+        type=str,
+        nargs="*",
+        help="Receipt image paths, directories or glob patterns.",
+    )
+    parser.add_argument("-i", "--image", type=str, help="path to input image")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for batches (default: the number of cores).",
+    )
     parser.add_argument(
-        "-i", "--image", type=str, required=True, help="path to input image"
+        "-o",
+        "--output",
+        type=str,
+        help="Write JSON lines to this file instead of stdout.",
     )
     args = parser.parse_args()
 
-    # check if image with given path exists
-    if not os.path.exists(args.image):
-        raise Exception("The given image does not exist.")
-
-    # load the image, resize and compute ratio
-    img_orig = cv2.imread(args.image)
-    image = img_orig.copy()
-    image = imutils.resize(image, width=500)
-    ratio = img_orig.shape[1] / float(image.shape[1])
-
-    # convert the image to grayscale, blur it slightly, and then apply
-    # edge detection
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(
-        gray,
-        (
-            5,
-            5,
-        ),
-        0,
-    )
-    edged = cv2.Canny(blurred, 75, 200)
-    # cv2.imwrite("edged.jpg", edged)
-
-    # find contours in the edge map and sort them by size in descending
-    # order
-    cnts = cv2.findContours(edged.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    cnts = imutils.grab_contours(cnts)
-    cnts = sorted(cnts, key=cv2.contourArea, reverse=True)
-
-    # initialize a contour that corresponds to the receipt outline
-    receiptCnt = None
-    # loop over the contours
-    for c in cnts:
-        # approximate the contour
-        peri = cv2.arcLength(c, True)
-        approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-        # if our approximated contour has four points, then we can
-        # assume we have found the outline of the receipt
-        if len(approx) == 4:
-            receiptCnt = approx
-            break
-
-    # cv2.drawContours(image, [receiptCnt], -1, (0, 255, 0), 2)
-    # cv2.imwrite('image_with_outline.jpg', image)
-    # cv2.imshow("Receipt Outline", image)
-    # cv2.waitKey(0)
-
-    # if the receipt contour is empty then our script could not find the
-    # outline and we should be notified
-    if receiptCnt is None:
-        raise Exception(
-            (
-                "Could not find receipt outline. "
-                "Try debugging your edge detection and contour steps."
-            )
-        )
-
-    # apply a four-point perspective transform to the *original* image to
-    # obtain a top-down bird's-eye view of the receipt
-    receipt = four_point_transform(img_orig, receiptCnt.reshape(4, 2) * ratio)
-    # cv2.imwrite('transformed_receipt.jpg', receipt)
-
-    # apply OCR to the receipt image by assuming column data, ensuring
-    # the text is *concatenated across the row* (additionally, for your
-    # own images you may need to apply additional processing to cleanup
-    # the image, including resizing, thresholding, etc.)
-    options = "--psm 6"
-    text = pytesseract.image_to_string(
-        cv2.cvtColor(receipt, cv2.COLOR_BGR2RGB), config=options
+    paths = args.images + ([args.image] if args.image else [])
+    if not paths:
+        parser.error("at least one image path is required")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    # A single image prints its raw text
+    single = (
+        len(paths) == 1
+        and not args.output
+        and not os.path.isdir(paths[0])
+        and not glob.has_magic(paths[0])
     )
-    # show the raw output of the OCR process
-    print("[INFO] raw output:")
-    print("==================")
-    print(text)
-    print("\n")
+    if single:
+        # check if image with given path exists
+        if not os.path.exists(paths[0]):
+            parser.error("The given image does not exist.")
+        print(ocr_file(paths[0]))
+        return 0
+
+    image_paths = _expand_inputs(paths)
+    if not image_paths:
+        parser.error("no images found")
+    return _run_batch(image_paths, args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .engine import get_engine
+from .utils import perform_ocr
+
+
+class PoolFull(Exception):
+    """Raised when the pool's queue is full."""
+
+
+def _init_worker():
+    # Every process runs one OCR at a time, OpenCV's own threads would only
+    # compete with the other processes for the cores
+    cv2.setNumThreads(1)
+    # Load the Tesseract model before the first image arrives
+    get_engine()
+
+
+def _ping(_) -> int:
+    # Hold the worker a moment, so the other pings go to other workers
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def ocr_bytes(image_bytes: bytes) -> str:
+    """Run ``perform_ocr`` on an encoded image, in a worker process."""
+    try:
+        return perform_ocr(np.frombuffer(image_bytes, np.uint8))
+    except Exception as e:
+        # Exceptions that cannot be rebuilt from their args, like
+        # pytesseract's, would break the whole pool when sent back
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def ocr_file(path: str) -> str:
+    """Run ``perform_ocr`` on an image file, in a worker process.
+
+    The worker reads the file itself, so only the path and the text are
+    sent between processes.
+    """
+    with open(path, "rb") as f:
+        image_bytes = f.read()
+    return ocr_bytes(image_bytes)
+
+
+def iter_ocr_files(
+    paths: List[str], jobs: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """OCR image files in a pool of worker processes.
+
+    Args:
+        paths: Image file paths.
+        jobs: Worker processes, defaults to the number of cores. With one,
+            the images are processed in this process.
+
+    Yields:
+        ``(path, text, None)``, or ``(path, None, error)`` for an image that
+        failed, as soon as each image is done (completion order).
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1:
+        # Starting a process would only add its startup time
+        for path in paths:
+            try:
+                yield path, ocr_file(path), None
+            except Exception as e:
+                yield path, None, str(e)
+        return
+
+    executor = ProcessPoolExecutor(
+        jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    try:
+        futures = {executor.submit(ocr_file, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+    finally:
+        # When the caller stops early, e.g. on Ctrl-C, queued images are
+        # dropped instead of processed
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class OCRPool:
+    """Runs OCR in a pool of worker processes, off the event loop.
+
+    At most ``workers`` images are processed at a time, one per process, and
+    up to ``max_queue`` more wait for a process. Beyond that ``run`` raises
+    ``PoolFull`` at once, so callers can shed load instead of piling it up.
+
+    Not thread-safe, it is meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        task: Callable = ocr_bytes,
+    ):
+        """Create the pool, its processes are started by ``warm_up`` or on
+        demand.
+
+        Args:
+            workers: Worker processes, defaults to the number of cores.
+            max_queue: Images waiting for a worker, defaults to 4 per worker.
+            task: Picklable function the images are passed to.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = 4 * self.workers if max_queue is None else max_queue
+        self.task = task
+        self.pending = 0
+        self.rejected = 0
+        # Forking a process that runs an event loop and threads is unsafe
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    async def warm_up(self, rounds: int = 5) -> int:
+        """Start every worker process, so no request waits for one to spawn,
+        import OpenCV and load the Tesseract model.
+
+        Args:
+            rounds: Rounds of one ping per worker sent until every worker
+                answered, a worker that is ready first may take several.
+
+        Returns:
+            Number of worker processes that answered.
+        """
+        loop = asyncio.get_running_loop()
+        pids = set()
+        for _ in range(rounds):
+            pids.update(
+                await asyncio.gather(
+                    *(
+                        loop.run_in_executor(self.executor, _ping, index)
+                        for index in range(self.workers)
+                    )
+                )
+            )
+            if len(pids) >= self.workers:
+                break
+        return len(pids)
+
+    async def run(self, image_bytes: bytes):
+        """Process an image in a worker process.
+
+        Raises:
+            PoolFull: If ``workers + max_queue`` images are already pending.
+        """
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PoolFull("OCR queue is full, try again later.")
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(self.task, image_bytes)
+        self.pending += 1
+        # A cancelled request cannot stop its image in the worker, so the
+        # slot is only freed once the worker is done with it
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            # The loop is closed, nothing else is using the counter
+            self._decrement()
+
+    def _decrement(self) -> None:
+        self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "busy": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
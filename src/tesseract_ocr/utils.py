@@ -1,69 +1,180 @@
+import heapq
+import math
+from typing import Dict, Optional, Tuple
+
 import cv2
-import imutils
 import numpy as np
 import pytesseract
 from imutils.perspective import four_point_transform
 
+from .engine import get_engine
 
-def perform_ocr(img: np.ndarray):
-    img_orig = cv2.imdecode(img, cv2.IMREAD_COLOR)
-    image = img_orig.copy()
-    image = imutils.resize(image, width=500)
-    ratio = img_orig.shape[1] / float(image.shape[1])
+# The outline is detected on a copy downscaled to about this many pixels,
+# whatever the size and aspect ratio of the photo
+DETECTION_PIXELS = 250_000
+# Only the largest contours can be the receipt
+TOP_CONTOURS = 5
+# Smallest outline accepted, as a fraction of the frame
+MIN_OUTLINE_AREA = 0.1
+# Canny thresholds, lower ones are tried for receipts with faint edges,
+# e.g. on a background about as bright as the paper
+CANNY_THRESHOLDS = ((75, 200), (25, 75))
 
-    # convert the image to grayscale, blur it slightly, and then apply
-    # edge detection
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    blurred = cv2.GaussianBlur(
-        gray,
-        (
-            5,
-            5,
-        ),
-        0,
+
+def _frame(width: int, height: int) -> np.ndarray:
+    return np.array(
+        [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+        dtype=np.float32,
     )
-    edged = cv2.Canny(blurred, 75, 200)
 
-    # find contours in the edge map and sort them by size in descending
-    # order
-    cnts = cv2.findContours(edged.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    cnts = imutils.grab_contours(cnts)
-    cnts = sorted(cnts, key=cv2.contourArea, reverse=True)
 
-    # initialize a contour that corresponds to the receipt outline
-    receiptCnt = None
-    # loop over the contours
+def _hull_outline(contour: np.ndarray) -> Tuple[np.ndarray, str]:
+    """Four corners around a contour that is not a clean quadrilateral."""
+    hull = cv2.convexHull(contour)
+    peri = cv2.arcLength(hull, True)
+    # The hull of a receipt with a torn or occluded corner simplifies to
+    # four points with a coarser tolerance
+    for epsilon in (0.02, 0.04, 0.06):
+        approx = cv2.approxPolyDP(hull, epsilon * peri, True)
+        if len(approx) == 4:
+            return approx.reshape(4, 2).astype(np.float32), "hull"
+    return cv2.boxPoints(cv2.minAreaRect(hull)).astype(np.float32), "rect"
+
+
+def _detect_outline(
+    edged: np.ndarray, min_area: float
+) -> Optional[Tuple[np.ndarray, str]]:
+    cnts, _ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cnts = heapq.nlargest(TOP_CONTOURS, cnts, key=cv2.contourArea)
     for c in cnts:
-        # approximate the contour
+        # if the approximated contour has four points, then we can assume
+        # we have found the outline of the receipt
         peri = cv2.arcLength(c, True)
         approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-        # if our approximated contour has four points, then we can
-        # assume we have found the outline of the receipt
-        if len(approx) == 4:
-            receiptCnt = approx
-            break
-
-    # if the receipt contour is empty then our script could not find the
-    # outline and we should be notified
-    if receiptCnt is None:
-        raise Exception(
-            (
-                "Could not find receipt outline. "
-                "Try debugging your edge detection and contour steps."
-            )
-        )
+        if len(approx) == 4 and cv2.contourArea(approx) >= min_area:
+            return approx.reshape(4, 2).astype(np.float32), "contour"
+
+    if cnts:
+        # Edges that do not close into a quadrilateral, e.g. a corner that
+        # is folded, torn or covered
+        largest = max(cnts, key=lambda c: cv2.contourArea(cv2.convexHull(c)))
+        corners, method = _hull_outline(largest)
+        if cv2.contourArea(corners) >= min_area:
+            return corners, method
+    return None
+
+
+def find_receipt_outline(image: np.ndarray) -> Tuple[np.ndarray, str]:
+    """Find the four corners of the receipt in a BGR image.
+
+    Tries, in order: the largest contours that simplify to four points
+    ("contour"), the convex hull or minimum area rectangle of the largest
+    contour ("hull" or "rect"), both with lower edge thresholds if needed,
+    and the whole image ("frame"), e.g. for a scan cropped to the receipt.
+
+    Returns:
+        The corners in the coordinates of ``image`` and how they were found.
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, math.sqrt(DETECTION_PIXELS / (width * height)))
+    small = image
+    if scale < 1.0:
+        # Linear interpolation is an order of magnitude faster than area
+        # averaging on large photos, the blur below smooths out its aliasing
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        small = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+    min_area = MIN_OUTLINE_AREA * small.shape[0] * small.shape[1]
+
+    # convert the image to grayscale, blur it slightly, and then apply
+    # edge detection
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    for low, high in CANNY_THRESHOLDS:
+        edged = cv2.Canny(blurred, low, high)
+        # Close small gaps, so that the outline is one contour
+        edged = cv2.dilate(edged, np.ones((3, 3), np.uint8))
+        outline = _detect_outline(edged, min_area)
+        if outline is not None:
+            corners, method = outline
+            return corners / scale, method
+
+    return _frame(width, height), "frame"
+
+
+def _straighten(img_orig: np.ndarray) -> np.ndarray:
+    """Cut the receipt out of a BGR image, straightened, in RGB."""
+    corners, method = find_receipt_outline(img_orig)
 
     # apply a four-point perspective transform to the *original* image to
     # obtain a top-down bird's-eye view of the receipt
-    receipt = four_point_transform(img_orig, receiptCnt.reshape(4, 2) * ratio)
+    receipt = img_orig
+    if method != "frame":
+        receipt = four_point_transform(img_orig, corners)
+    return cv2.cvtColor(receipt, cv2.COLOR_BGR2RGB)
 
+
+def _text_and_confidence(data: Dict[str, list]) -> Tuple[str, float]:
+    """Rebuild the text of ``pytesseract.image_to_data`` output, one line per
+    line of words, with the mean confidence of the words."""
+    lines, confidences = {}, []
+    for index, word in enumerate(data["text"]):
+        confidence = float(data["conf"][index])
+        if confidence < 0 or not word.strip():
+            continue
+        line = (
+            data["block_num"][index],
+            data["par_num"][index],
+            data["line_num"][index],
+        )
+        lines.setdefault(line, []).append(word)
+        confidences.append(confidence)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return text, sum(confidences) / len(confidences) if confidences else 0.0
+
+
+def ocr_image(img_orig: np.ndarray) -> str:
+    """Cut the receipt out of a BGR image, straighten it and read its text.
+
+    This is the pipeline shared by the CLI and the API.
+    """
     # apply OCR to the receipt image by assuming column data, ensuring
     # the text is *concatenated across the row* (additionally, for your
     # own images you may need to apply additional processing to cleanup
     # the image, including resizing, thresholding, etc.)
+    receipt = _straighten(img_orig)
+    engine = get_engine()
+    if engine is not None:
+        # A Tesseract instance kept loaded, the image is passed in memory
+        return engine.image_to_string(receipt)
     options = "--psm 6"
-    text = pytesseract.image_to_string(
-        cv2.cvtColor(receipt, cv2.COLOR_BGR2RGB), config=options
-    )
+    text = pytesseract.image_to_string(receipt, config=options)
     return text
+
+
+def ocr_image_with_confidence(img_orig: np.ndarray) -> Tuple[str, float]:
+    """Same as ``ocr_image``, with the mean confidence of the words read.
+
+    Returns:
+        The text and the mean word confidence, from 0 to 100 (0 when no
+        word was read).
+    """
+    receipt = _straighten(img_orig)
+    engine = get_engine()
+    if engine is not None:
+        return engine.recognize(receipt)
+    data = pytesseract.image_to_data(
+        receipt, config="--psm 6", output_type=pytesseract.Output.DICT
+    )
+    return _text_and_confidence(data)
+
+
+def perform_ocr(img: np.ndarray):
+    """Run ``ocr_image`` on an encoded image (JPEG, PNG, ...) in a buffer.
+
+    Raises:
+        ValueError: If the image cannot be decoded.
+    """
+    img_orig = cv2.imdecode(img, cv2.IMREAD_COLOR)
+    if img_orig is None:
+        raise ValueError("Could not decode the image.")
+    return ocr_image(img_orig)
@@ -1,4 +1,7 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
 import pytest
 from PIL import Image
 
@@ -30,3 +33,28 @@ def dummy_image_path(tmp_path):
     image_path = tmp_path / "dummy_receipt.png"
     dummy_image.save(image_path)
     return str(image_path)
+
+
+@pytest.fixture
+def status_error():
+    """Factory of OpenAI API errors with a status code and headers."""
+
+    def make(status_code, headers=None):
+        request = httpx.Request("POST", "https://api.test/v1/chat/completions")
+        response = httpx.Response(status_code, headers=headers, request=request)
+        if status_code == 429:
+            cls = openai.RateLimitError
+        else:
+            cls = openai.InternalServerError
+        return cls("error", response=response, body=None)
+
+    return make
+
+
+@pytest.fixture
+def clock():
+    """Patch the monotonic clock, e.g. of rate limiters and endpoint pools,
+    with a controllable one."""
+    now = [1000.0]
+    with patch("time.monotonic", side_effect=lambda: now[0]):
+        yield now
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from receipt_ocr import (
+    AsyncOpenAIProvider,
+    AsyncPooledProvider,
+    EndpointPool,
+    OpenAIProvider,
+    PooledProvider,
+)
+
+
+def _provider(name, side_effect=None):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.base_url = name
+    provider.get_response.side_effect = side_effect
+    provider.get_response.return_value = name
+    return provider
+
+
+def test_least_outstanding_spreads_requests():
+    pool = EndpointPool([_provider("a"), _provider("b"), _provider("c")])
+
+    acquired = [pool.acquire() for _ in range(6)]
+
+    assert sorted(e.name for e in acquired) == ["a", "a", "b", "b", "c", "c"]
+    pool.release(acquired[0], 0.1, None)
+    assert pool.acquire() is acquired[0]
+
+
+def test_latency_strategy_prefers_fast_endpoint():
+    pool = EndpointPool([_provider("fast"), _provider("slow")], strategy="latency")
+    fast, slow = pool.endpoints
+    for endpoint, latency in ((fast, 0.1), (slow, 1.0)):
+        pool.acquire(exclude=[e for e in pool.endpoints if e is not endpoint])
+        pool.release(endpoint, latency, None)
+
+    names = [pool.acquire().name for _ in range(11)]
+
+    # The slow endpoint is only picked once the fast one has 10 in flight
+    assert names[:9] == ["fast"] * 9
+    assert "slow" in names[9:]
+
+
+def test_failures_eject_until_cooldown(clock, status_error):
+    pool = EndpointPool([_provider("a"), _provider("b")], max_failures=2, cooldown=30)
+    a, b = pool.endpoints
+
+    for _ in range(2):
+        pool.acquire(exclude=[b])
+        pool.release(a, 0.1, status_error(500))
+
+    assert [pool.acquire().name for _ in range(3)] == ["b"] * 3
+    assert pool.stats()[0]["healthy"] is False
+
+    clock[0] += 31
+    assert pool.acquire().name == "a"
+    # Back on probation, a single failure ejects it again
+    pool.release(a, 0.1, status_error(503))
+    assert pool.stats()[0]["healthy"] is False
+    assert pool.stats()[0]["ejections"] == 2
+
+
+def test_client_errors_do_not_eject():
+    pool = EndpointPool([_provider("a")], max_failures=1)
+    endpoint = pool.acquire()
+
+    pool.release(endpoint, 0.1, ValueError("bad request"))
+
+    assert pool.stats()[0] == {
+        "name": "a",
+        "healthy": True,
+        "outstanding": 0,
+        "requests": 1,
+        "errors": 0,
+        "ejections": 0,
+        "latency": None,
+    }
+
+
+def test_retry_after_and_latency_threshold_eject(clock, status_error):
+    pool = EndpointPool(
+        [_provider("a"), _provider("b")], latency_threshold=2.0, cooldown=30
+    )
+    a, b = pool.endpoints
+
+    pool.acquire(exclude=[b])
+    pool.release(a, 0.1, status_error(429, {"retry-after": "5"}))
+    assert a.ejected_until == pytest.approx(1005.0)
+
+    pool.acquire(exclude=[a])
+    pool.release(b, 3.0, None)
+    assert b.ejected_until == pytest.approx(1030.0)
+
+    # Everything is ejected, the endpoint due back first is still used
+    assert pool.acquire().name == "a"
+
+
+def test_pooled_provider_fails_over(status_error):
+    down = _provider("down", side_effect=status_error(502))
+    up = _provider("up")
+    provider = PooledProvider([down, up])
+
+    # Ties go to the first endpoint
+    with patch("receipt_ocr.balancer.random.choice", side_effect=lambda seq: seq[0]):
+        for _ in range(4):
+            assert provider.get_response("image.png", {"total": "number"}) == "up"
+
+    # Ejected after three consecutive failures, the rest go straight to "up"
+    assert down.get_response.call_count == 3
+    assert [s["outstanding"] for s in provider.pool.stats()] == [0, 0]
+
+
+def test_pooled_provider_raises_client_errors_and_exhaustion(status_error):
+    error = ValueError("bad request")
+    provider = PooledProvider([_provider("a", error), _provider("b", error)])
+    with pytest.raises(ValueError):
+        provider.get_response("image.png", {})
+    assert sum(s["requests"] for s in provider.pool.stats()) == 1
+
+    provider = PooledProvider(
+        [_provider("a", status_error(500)), _provider("b", status_error(500))]
+    )
+    with pytest.raises(openai.InternalServerError):
+        provider.get_response("image.png", {})
+    assert [s["requests"] for s in provider.pool.stats()] == [1, 1]
+
+
+def test_async_pooled_provider():
+    async def run():
+        down = MagicMock(spec=AsyncOpenAIProvider)
+        down.get_response = AsyncMock(
+            side_effect=openai.APIConnectionError(
+                request=httpx.Request("POST", "https://down.test")
+            )
+        )
+        up = MagicMock(spec=AsyncOpenAIProvider)
+        up.get_response = AsyncMock(return_value="up")
+        provider = AsyncPooledProvider([down, up])
+        results = await asyncio.gather(
+            *(provider.get_response("image.png", {}) for _ in range(4))
+        )
+        return results, provider.pool.stats()
+
+    results, stats = asyncio.run(run())
+
+    assert results == ["up"] * 4
+    assert stats[1]["requests"] == 4
+    assert [s["outstanding"] for s in stats] == [0, 0]
+
+
+def test_pooled_provider_warms_up_endpoints_concurrently():
+    # Each warm-up only returns once every endpoint is warming up
+    barrier = threading.Barrier(3, timeout=5)
+
+    def warm_up(connections, timeout):
+        barrier.wait()
+        return connections
+
+    providers = [_provider(name) for name in "abc"]
+    for provider in providers:
+        provider.warm_up.side_effect = warm_up
+
+    assert PooledProvider(providers).warm_up(2, timeout=1.0) == 6
+    providers[0].warm_up.assert_called_once_with(2, 1.0)
+
+
+def test_async_pooled_provider_warms_up_endpoints_concurrently():
+    async def run():
+        started = []
+        all_started = asyncio.Event()
+
+        async def warm_up(connections, timeout):
+            started.append(connections)
+            if len(started) == 3:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), 5)
+            return connections
+
+        providers = [MagicMock(spec=AsyncOpenAIProvider) for _ in range(3)]
+        for provider in providers:
+            provider.warm_up = AsyncMock(side_effect=warm_up)
+        return await AsyncPooledProvider(providers).warm_up(2, timeout=1.0)
+
+    assert asyncio.run(run()) == 6
+
+
+def test_invalid_pool_arguments():
+    with pytest.raises(ValueError):
+        EndpointPool([])
+    with pytest.raises(ValueError):
+        EndpointPool([_provider("a")], strategy="round_robin")
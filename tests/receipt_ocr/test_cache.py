@@ -0,0 +1,226 @@
+import asyncio
+import itertools
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from receipt_ocr import (
+    ExtractionCache,
+    OpenAIProvider,
+    ReceiptParser,
+    ReceiptProcessor,
+    Tiler,
+)
+
+
+@pytest.fixture
+def schema():
+    return {"merchant_name": "string", "total_amount": "number"}
+
+
+def test_make_key_depends_on_content(dummy_image_path, schema):
+    with open(dummy_image_path, "rb") as f:
+        image_bytes = f.read()
+
+    key = ExtractionCache.make_key(dummy_image_path, schema, "gpt-4o")
+
+    # Same content from a different source hashes to the same key
+    assert ExtractionCache.make_key(image_bytes, schema, "gpt-4o") == key
+    # Schema key order does not matter
+    reordered = dict(reversed(list(schema.items())))
+    assert ExtractionCache.make_key(image_bytes, reordered, "gpt-4o") == key
+    # Model, response format and content all change the key
+    assert ExtractionCache.make_key(image_bytes, schema, "gpt-4.1") != key
+    assert ExtractionCache.make_key(image_bytes, schema, "gpt-4o", "text") != key
+    assert ExtractionCache.make_key(image_bytes + b"\0", schema, "gpt-4o") != key
+
+
+def test_make_key_depends_on_mode(dummy_image_path, schema):
+    key = ExtractionCache.make_key(dummy_image_path, schema, "gpt-4o")
+    tiled = {"tiler": {"overlap": 0.15}}
+
+    assert ExtractionCache.make_key(dummy_image_path, schema, "gpt-4o", mode={}) != key
+    assert ExtractionCache.make_key(
+        dummy_image_path, schema, "gpt-4o", mode=tiled
+    ) != ExtractionCache.make_key(
+        dummy_image_path, schema, "gpt-4o", mode={"tiler": {"overlap": 0.2}}
+    )
+
+
+def test_make_key_file_object(dummy_image_path, schema):
+    with open(dummy_image_path, "rb") as f:
+        key = ExtractionCache.make_key(f, schema, "gpt-4o")
+        # The file is rewound so it can still be encoded afterwards
+        assert f.tell() == 0
+
+    assert ExtractionCache.make_key(dummy_image_path, schema, "gpt-4o") == key
+
+
+def test_make_key_pil_image(schema):
+    red = Image.new("RGB", (10, 10), color="red")
+    blue = Image.new("RGB", (10, 10), color="blue")
+
+    assert ExtractionCache.make_key(red, schema, "m") == ExtractionCache.make_key(
+        red.copy(), schema, "m"
+    )
+    assert ExtractionCache.make_key(red, schema, "m") != ExtractionCache.make_key(
+        blue, schema, "m"
+    )
+
+
+def test_memory_lru_eviction():
+    cache = ExtractionCache(max_memory_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+
+    # "b" was the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_returned_results_are_copies():
+    cache = ExtractionCache()
+    cache.set("a", {"line_items": []})
+    cache.get("a")["line_items"].append("mutated")
+
+    assert cache.get("a") == {"line_items": []}
+
+
+def test_disk_tier_persists(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ExtractionCache(path)
+    cache.set("a", {"v": 1})
+    cache.close()
+
+    reopened = ExtractionCache(path)
+    assert reopened.get("a") == {"v": 1}
+    assert reopened.get("a") == {"v": 1}
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["memory_hits"] == 1
+
+
+def test_disk_size_eviction(tmp_path):
+    cache = ExtractionCache(
+        str(tmp_path / "cache.sqlite"), max_memory_entries=1, max_disk_bytes=25
+    )
+    cache.set("a", {"v": "x" * 10})
+    cache.set("b", {"v": "y" * 10})
+
+    assert cache.get("a") is None
+    assert cache.get("b") == {"v": "y" * 10}
+
+
+def test_disk_eviction_keeps_memory_hits(tmp_path, monkeypatch):
+    ticks = itertools.count()
+    monkeypatch.setattr("receipt_ocr.cache.time.time", lambda: next(ticks))
+    path = str(tmp_path / "cache.sqlite")
+    cache = ExtractionCache(path, max_disk_bytes=40)
+    cache.set("a", {"v": "x" * 10})
+    cache.set("b", {"v": "y" * 10})
+    # Served from memory, which must still count as a use on disk
+    assert cache.get("a") == {"v": "x" * 10}
+    cache.set("c", {"v": "z" * 10})
+    cache.close()
+
+    reopened = ExtractionCache(path)
+    assert reopened.get("a") == {"v": "x" * 10}
+    assert reopened.get("b") is None
+    assert reopened.get("c") == {"v": "z" * 10}
+
+
+def test_disk_size_counts_replaced_entries_once(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ExtractionCache(path, max_disk_bytes=40)
+    cache.set("a", {"v": "x" * 10})
+    cache.set("a", {"v": "x" * 10})
+    cache.close()
+
+    reopened = ExtractionCache(path, max_disk_bytes=40)
+    reopened.set("b", {"v": "y" * 10})
+    assert reopened.get("a") == {"v": "x" * 10}
+    assert reopened.stats()["evictions"] == 0
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    cache.set("a", {"v": 1})
+    assert cache.get("a") == {"v": 1}
+
+    cache.ttl = -1
+    assert cache.get("a") is None
+    cache.ttl = 60
+    assert cache.get("a") is None
+
+
+def test_processor_uses_cache(dummy_image_path, schema, mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    cache = ExtractionCache()
+    processor = ReceiptProcessor(provider, ReceiptParser(), cache=cache)
+
+    first = processor.process_receipt(dummy_image_path, schema, "gpt-4o")
+    second = processor.process_receipt(dummy_image_path, schema, "gpt-4o")
+
+    assert first == second == {"merchant_name": "Test Merchant", "total": 10.00}
+    assert provider.get_response.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_processor_does_not_cache_parse_errors(
+    dummy_image_path, schema, mock_chat_completion_error
+):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion_error
+    processor = ReceiptProcessor(provider, ReceiptParser(), cache=ExtractionCache())
+
+    processor.process_receipt(dummy_image_path, schema, "gpt-4o")
+    result = processor.process_receipt(dummy_image_path, schema, "gpt-4o")
+
+    assert "error" in result
+    assert provider.get_response.call_count == 2
+
+
+def test_aprocess_receipt_uses_cache(dummy_image_path, schema, mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    processor = ReceiptProcessor(provider, ReceiptParser(), cache=ExtractionCache())
+
+    async def run():
+        await processor.aprocess_receipt(dummy_image_path, schema, "gpt-4o")
+        return await processor.aprocess_receipt(dummy_image_path, schema, "gpt-4o")
+
+    assert asyncio.run(run()) == {"merchant_name": "Test Merchant", "total": 10.00}
+    assert provider.get_response.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "before, after",
+    [
+        ({}, {"tiler": Tiler()}),
+        ({"tiler": Tiler()}, {"tiler": Tiler(overlap=0.2)}),
+        ({}, {"image_options": {"max_size": 2048, "detail": "high"}}),
+    ],
+    ids=["tiling", "tile-overlap", "image-options"],
+)
+def test_processor_cache_tracks_the_extraction_mode(
+    dummy_image_path, schema, mock_chat_completion, before, after
+):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    cache = ExtractionCache()
+
+    for options in (before, after):
+        provider.image_options = options.get("image_options", {"max_size": 1080})
+        processor = ReceiptProcessor(provider, cache=cache, tiler=options.get("tiler"))
+        processor.process_receipt(dummy_image_path, schema)
+
+    assert provider.get_response.call_count == 2
+    assert cache.stats()["hits"] == 0
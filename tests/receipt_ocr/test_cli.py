@@ -1,5 +1,7 @@
 import json
+import os
 from unittest.mock import patch, MagicMock
+from receipt_ocr import BatchResult
 from receipt_ocr.cli import main
 
 
@@ -121,3 +123,197 @@ def test_main_with_api_key_and_base_url(
     mock_provider_class.assert_called_once_with(
         api_key="test_key", base_url="http://test.com"
     )
+
+
+def _make_images(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_bytes(b"dummy")
+        paths.append(str(path))
+    return paths
+
+
+def _fake_iter_batch(errors=(), parse_errors=()):
+    def iter_batch(images, json_schema, model, max_concurrency):
+        for index, image in enumerate(images):
+            if os.path.basename(image) in errors:
+                yield BatchResult(index, image, error="RuntimeError: API Error")
+            elif os.path.basename(image) in parse_errors:
+                yield BatchResult(index, image, result={"error": "Not valid JSON."})
+            else:
+                yield BatchResult(index, image, result={"image": image})
+
+    return iter_batch
+
+
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_directory_writes_jsonl(
+    mock_provider_class, mock_processor_class, tmp_path
+):
+    image_dir = tmp_path / "receipts"
+    paths = _make_images(image_dir, ["b.jpg", "a.png", "notes.txt"])
+    _make_images(image_dir / "nested", ["c.jpeg"])
+    mock_processor_instance = MagicMock()
+    mock_processor_instance.iter_batch.side_effect = _fake_iter_batch()
+    mock_processor_class.return_value = mock_processor_instance
+    output_path = tmp_path / "out.jsonl"
+
+    with patch(
+        "sys.argv",
+        ["cli.py", str(image_dir), "--workers", "4", "--output", str(output_path)],
+    ):
+        assert main() == 0
+
+    call_args = mock_processor_instance.iter_batch.call_args
+    assert call_args[0][0] == [
+        paths[1],
+        paths[0],
+        str(image_dir / "nested" / "c.jpeg"),
+    ]
+    assert call_args[1]["max_concurrency"] == 4
+    lines = output_path.read_text().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0]) == {"image": paths[1], "result": {"image": paths[1]}}
+    assert " " not in lines[0]
+
+
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_glob_resumes_from_checkpoint(
+    mock_provider_class, mock_processor_class, tmp_path
+):
+    paths = _make_images(tmp_path, ["1.jpg", "2.jpg", "3.jpg"])
+    mock_processor_instance = MagicMock()
+    mock_processor_instance.iter_batch.side_effect = _fake_iter_batch(errors=("3.jpg",))
+    mock_processor_class.return_value = mock_processor_instance
+    checkpoint_path = tmp_path / "done.txt"
+    checkpoint_path.write_text(paths[0] + "\n")
+
+    with patch(
+        "sys.argv",
+        ["cli.py", str(tmp_path / "*.jpg"), "--checkpoint", str(checkpoint_path)],
+    ):
+        assert main() == 1
+
+    # Already processed images are skipped
+    assert mock_processor_instance.iter_batch.call_args[0][0] == paths[1:]
+    # Only successful images are checkpointed
+    assert checkpoint_path.read_text().splitlines() == paths[:2]
+
+
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_parse_failure_is_not_checkpointed(
+    mock_provider_class, mock_processor_class, tmp_path
+):
+    paths = _make_images(tmp_path, ["1.jpg", "2.jpg"])
+    mock_processor_instance = MagicMock()
+    mock_processor_instance.iter_batch.side_effect = _fake_iter_batch(
+        parse_errors=("2.jpg",)
+    )
+    mock_processor_class.return_value = mock_processor_instance
+    output_path = tmp_path / "out.jsonl"
+    checkpoint_path = tmp_path / "done.txt"
+
+    with patch(
+        "sys.argv",
+        [
+            "cli.py",
+            *paths,
+            "--output",
+            str(output_path),
+            "--checkpoint",
+            str(checkpoint_path),
+        ],
+    ):
+        assert main() == 1
+
+    lines = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert lines[1] == {"image": paths[1], "error": "Not valid JSON."}
+    assert checkpoint_path.read_text().splitlines() == paths[:1]
+
+
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_file_list(mock_provider_class, mock_processor_class, tmp_path, capsys):
+    paths = _make_images(tmp_path, ["x.jpg", "y.jpg"])
+    file_list = tmp_path / "list.txt"
+    file_list.write_text("\n".join(paths + [paths[0], ""]))
+    mock_processor_instance = MagicMock()
+    mock_processor_instance.iter_batch.side_effect = _fake_iter_batch()
+    mock_processor_class.return_value = mock_processor_instance
+
+    with patch("sys.argv", ["cli.py", "--file_list", str(file_list)]):
+        assert main() == 0
+
+    assert mock_processor_instance.iter_batch.call_args[0][0] == paths
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["image"] for line in lines] == paths
+
+
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_validate_reports_violations(
+    mock_provider_class, mock_processor_class, tmp_path, capsys
+):
+    report = MagicMock(violations=["total_amount: expected a number, got 'N/A'"])
+    mock_processor_instance = MagicMock()
+    mock_processor_instance.process_receipt.return_value = (
+        {"total_amount": "N/A"},
+        report,
+    )
+    mock_processor_class.return_value = mock_processor_instance
+    image_path = tmp_path / "test.png"
+    image_path.write_bytes(b"dummy")
+
+    with patch("sys.argv", ["cli.py", str(image_path), "--validate"]):
+        main()
+
+    mock_processor_class.assert_called_once_with(
+        mock_provider_class.return_value, validate=True
+    )
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == {"total_amount": "N/A"}
+    assert "Schema violation: total_amount" in captured.err
+
+
+@patch("receipt_ocr.cli.LocalOCR")
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_local_ocr(
+    mock_provider_class, mock_processor_class, mock_local_ocr_class, tmp_path
+):
+    mock_processor_class.return_value.process_receipt.return_value = {}
+    image_path = tmp_path / "test.png"
+    image_path.write_bytes(b"dummy")
+
+    argv = ["cli.py", str(image_path), "--local_ocr", "--min_ocr_confidence", "80"]
+    with patch("sys.argv", argv + ["--ocr_thumbnail"]):
+        main()
+
+    mock_local_ocr_class.assert_called_once_with(min_confidence=80.0, thumbnail=True)
+    mock_processor_class.assert_called_once_with(
+        mock_provider_class.return_value,
+        local_ocr=mock_local_ocr_class.return_value,
+    )
+
+
+@patch("receipt_ocr.cli.Tiler")
+@patch("receipt_ocr.cli.ReceiptProcessor")
+@patch("receipt_ocr.cli.OpenAIProvider")
+def test_main_tile(
+    mock_provider_class, mock_processor_class, mock_tiler_class, tmp_path
+):
+    mock_processor_class.return_value.process_receipt.return_value = {}
+    image_path = tmp_path / "test.png"
+    image_path.write_bytes(b"dummy")
+
+    with patch("sys.argv", ["cli.py", str(image_path), "--tile"]):
+        main()
+
+    mock_processor_class.assert_called_once_with(
+        mock_provider_class.return_value, tiler=mock_tiler_class.return_value
+    )
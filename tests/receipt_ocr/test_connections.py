@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+
+from receipt_ocr.connections import create_async_http_client, create_http_client
+
+
+def test_create_http_client_options():
+    client = create_http_client(
+        max_connections=8,
+        max_keepalive_connections=16,
+        keepalive_expiry=30,
+        connect_timeout=2,
+        read_timeout=120,
+    )
+
+    assert isinstance(client, httpx.Client)
+    assert client.timeout == httpx.Timeout(120, connect=2)
+    pool = client._transport._pool
+    assert pool._max_connections == 8
+    # Never more idle connections than connections
+    assert pool._max_keepalive_connections == 8
+    assert pool._keepalive_expiry == 30
+    client.close()
+
+
+def test_create_async_http_client():
+    client = create_async_http_client(max_connections=2)
+
+    assert isinstance(client, httpx.AsyncClient)
+    assert client._transport._pool._max_connections == 2
+    asyncio.run(client.aclose())
+
+
+def test_create_http_client_rejects_empty_pool():
+    with pytest.raises(ValueError):
+        create_http_client(max_connections=0)
@@ -0,0 +1,269 @@
+import asyncio
+import io
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from receipt_ocr import (
+    AsyncHedgedProvider,
+    AsyncOpenAIProvider,
+    HedgedProvider,
+    HedgingPolicy,
+    OpenAIProvider,
+)
+
+
+def _policy(**kwargs):
+    """A policy that hedges after 10ms and has budget for every request."""
+    options = {"initial_delay": 0.01, "max_hedge_rate": 1.0}
+    options.update(kwargs)
+    return HedgingPolicy(**options)
+
+
+def test_policy_needs_samples_or_initial_delay():
+    policy = HedgingPolicy(min_samples=3)
+    assert policy.start() is None
+
+    for latency in (0.1, 0.2, 0.3):
+        policy.observe(latency)
+    assert policy.start() == 0.3
+
+
+def test_policy_delay_is_percentile_of_window():
+    policy = HedgingPolicy(percentile=90, window=100, min_samples=1, min_delay=0.05)
+    for latency in range(1, 201):
+        policy.observe(latency / 100)
+
+    # Only the last 100 latencies, 1.01 to 2.0, are kept
+    assert policy.start() == pytest.approx(1.9)
+
+    policy = HedgingPolicy(min_samples=1, min_delay=0.05)
+    policy.observe(0.01)
+    assert policy.start() == 0.05
+
+
+def test_policy_budget_caps_hedge_rate():
+    policy = HedgingPolicy(max_hedge_rate=0.25, burst=2)
+
+    allowed = []
+    for _ in range(16):
+        policy.start()
+        allowed.append(policy.try_hedge())
+
+    assert allowed.count(True) == 4
+    assert policy.stats()["hedge_rate"] == 0.25
+    assert policy.stats()["denied"] == 12
+
+
+def test_policy_rejects_invalid_options():
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=100)
+    with pytest.raises(ValueError):
+        HedgingPolicy(max_hedge_rate=1.5)
+
+
+def test_fast_request_is_not_hedged():
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = "primary"
+    hedged = HedgedProvider(provider, _policy(initial_delay=5))
+
+    assert hedged.get_response("image", {}, "model") == "primary"
+
+    provider.get_response.assert_called_once_with("image", {}, "model", None)
+    assert hedged.policy.stats()["hedges"] == 0
+    assert hedged.policy.start() == 5
+
+
+def test_slow_request_is_hedged_and_hedge_wins():
+    release = threading.Event()
+    primary = MagicMock(spec=OpenAIProvider)
+    primary.get_response.side_effect = lambda *args: release.wait(5) and "primary"
+    backup = MagicMock(spec=OpenAIProvider)
+    backup.get_response.return_value = "hedge"
+    hedged = HedgedProvider(primary, _policy(), backup, hedge_model="fast-model")
+
+    try:
+        assert hedged.get_response("image", {}, "model") == "hedge"
+    finally:
+        release.set()
+
+    backup.get_response.assert_called_once_with("image", {}, "fast-model", None)
+    stats = hedged.policy.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    # The primary's time until it lost is kept as a latency sample
+    assert len(hedged.policy._latencies) == 1
+
+
+def test_hedge_waits_for_other_request_when_one_fails():
+    provider = MagicMock(spec=OpenAIProvider)
+    calls = []
+
+    def get_response(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            threading.Event().wait(0.1)
+            return "primary"
+        raise RuntimeError("hedge failed")
+
+    provider.get_response.side_effect = get_response
+    hedged = HedgedProvider(provider, _policy())
+
+    assert hedged.get_response("image", {}, "model") == "primary"
+    assert len(calls) == 2
+    assert hedged.policy.stats()["hedge_wins"] == 0
+
+
+def test_error_is_raised_when_every_request_fails():
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.side_effect = RuntimeError("down")
+    hedged = HedgedProvider(provider, _policy(initial_delay=5))
+
+    with pytest.raises(RuntimeError, match="down"):
+        hedged.get_response("image", {}, "model")
+    # Failed requests say nothing about latency
+    assert len(hedged.policy._latencies) == 0
+
+
+def test_file_object_is_read_once_for_both_requests():
+    release = threading.Event()
+    provider = MagicMock(spec=OpenAIProvider)
+    images = []
+
+    def get_response(image, *args):
+        images.append(image)
+        if len(images) == 1:
+            release.wait(5)
+        return image
+
+    provider.get_response.side_effect = get_response
+    hedged = HedgedProvider(provider, _policy())
+
+    try:
+        assert hedged.get_response(io.BytesIO(b"data"), {}, "model") == b"data"
+    finally:
+        release.set()
+    assert images == [b"data", b"data"]
+
+
+def test_stream_is_not_hedged():
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = "stream"
+    hedged = HedgedProvider(provider, _policy())
+
+    assert hedged.get_response("image", {}, "model", stream=True) == "stream"
+    provider.get_response.assert_called_once_with(
+        "image", {}, "model", None, stream=True
+    )
+    assert hedged.policy.stats()["requests"] == 0
+
+
+def test_async_hedge_wins_and_primary_is_cancelled():
+    cancelled = []
+
+    async def slow(*args):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    primary = MagicMock(spec=AsyncOpenAIProvider)
+    primary.get_response = AsyncMock(side_effect=slow)
+    backup = MagicMock(spec=AsyncOpenAIProvider)
+    backup.get_response = AsyncMock(return_value="hedge")
+    hedged = AsyncHedgedProvider(primary, _policy(), backup)
+
+    assert asyncio.run(hedged.get_response("image", {}, "model")) == "hedge"
+
+    assert cancelled == [True]
+    backup.get_response.assert_awaited_once_with("image", {}, "model", None)
+    assert hedged.policy.stats()["hedge_wins"] == 1
+
+
+def test_async_hedge_is_cancelled_when_primary_wins():
+    cancelled = []
+    calls = []
+
+    async def get_response(*args):
+        calls.append(args)
+        try:
+            await asyncio.sleep(0.05 if len(calls) == 1 else 5)
+        except asyncio.CancelledError:
+            cancelled.append(len(calls))
+            raise
+        return "primary"
+
+    provider = MagicMock(spec=AsyncOpenAIProvider)
+    provider.get_response = AsyncMock(side_effect=get_response)
+    hedged = AsyncHedgedProvider(provider, _policy())
+
+    assert asyncio.run(hedged.get_response("image", {}, "model")) == "primary"
+    assert len(calls) == 2
+    assert cancelled == [2]
+    assert hedged.policy.stats() == {
+        "requests": 1,
+        "hedges": 1,
+        "hedge_wins": 0,
+        "denied": 0,
+        "hedge_rate": 1.0,
+        "win_rate": 0.0,
+    }
+
+
+def test_async_without_budget_waits_for_primary():
+    provider = MagicMock(spec=AsyncOpenAIProvider)
+
+    async def get_response(*args):
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    provider.get_response = AsyncMock(side_effect=get_response)
+    hedged = AsyncHedgedProvider(provider, _policy(max_hedge_rate=0.0))
+
+    assert asyncio.run(hedged.get_response("image", {}, "model")) == "primary"
+    provider.get_response.assert_awaited_once()
+    assert hedged.policy.stats()["denied"] == 1
+
+
+def test_warm_up_primary_and_hedge_concurrently():
+    # Each warm-up only returns once both endpoints are warming up
+    barrier = threading.Barrier(2, timeout=5)
+
+    def warm_up(connections, timeout):
+        barrier.wait()
+        return connections
+
+    primary = MagicMock(spec=OpenAIProvider)
+    backup = MagicMock(spec=OpenAIProvider)
+    primary.warm_up.side_effect = backup.warm_up.side_effect = warm_up
+
+    assert HedgedProvider(primary, _policy(), backup).warm_up(2, timeout=1.0) == 4
+
+    # Without a separate hedge endpoint the primary is warmed up once
+    single = MagicMock(spec=OpenAIProvider)
+    single.warm_up.return_value = 2
+    assert HedgedProvider(single, _policy()).warm_up(2) == 2
+    single.warm_up.assert_called_once()
+
+
+def test_async_warm_up_primary_and_hedge_concurrently():
+    async def run():
+        started = []
+        both_started = asyncio.Event()
+
+        async def warm_up(connections, timeout):
+            started.append(connections)
+            if len(started) == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), 5)
+            return connections
+
+        primary = MagicMock(spec=AsyncOpenAIProvider)
+        backup = MagicMock(spec=AsyncOpenAIProvider)
+        primary.warm_up = AsyncMock(side_effect=warm_up)
+        backup.warm_up = AsyncMock(side_effect=warm_up)
+        return await AsyncHedgedProvider(primary, _policy(), backup).warm_up(2)
+
+    assert asyncio.run(run()) == 4
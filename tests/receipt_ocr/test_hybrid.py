@@ -0,0 +1,206 @@
+import asyncio
+import io
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from receipt_ocr import (
+    AsyncOpenAIProvider,
+    ExtractionCache,
+    LocalOCR,
+    OCRText,
+    OpenAIProvider,
+    ProcessingReport,
+    ReceiptProcessor,
+)
+from receipt_ocr.hedging import _shareable
+from receipt_ocr.instrumentation import collect
+from receipt_ocr.prompts import OCR_USER_PROMPT
+
+TEXT = "CORNER STORE\nMilk 2.50\nBread 3.00\nTOTAL 5.50"
+
+
+def _recognizer(text=TEXT, confidence=90.0):
+    return MagicMock(return_value=(text, confidence))
+
+
+def test_prepare_sends_confident_text():
+    local_ocr = LocalOCR(_recognizer())
+
+    with collect(ProcessingReport()) as report:
+        prepared = local_ocr.prepare("receipt.jpg")
+
+    assert prepared == OCRText(TEXT, 90.0)
+    assert report.ocr_confidence == 90.0
+    assert report.ocr_fallback is False
+
+
+def test_prepare_thumbnail():
+    local_ocr = LocalOCR(_recognizer(), thumbnail=True, thumbnail_size=256)
+
+    prepared = local_ocr.prepare("receipt.jpg")
+
+    assert prepared.thumbnail == "receipt.jpg"
+    assert prepared.thumbnail_size == 256
+
+
+@pytest.mark.parametrize(
+    "recognizer",
+    [
+        _recognizer(confidence=40.0),
+        _recognizer(text="  TOTAL  \n"),
+        MagicMock(side_effect=OSError("cannot read image")),
+    ],
+    ids=["low-confidence", "little-text", "ocr-error"],
+)
+def test_prepare_falls_back_to_the_image(recognizer):
+    local_ocr = LocalOCR(recognizer, min_confidence=60.0)
+
+    with collect(ProcessingReport()) as report:
+        assert local_ocr.prepare("receipt.jpg") == "receipt.jpg"
+
+    assert report.ocr_fallback is True
+
+
+def test_prepare_rewinds_file_objects():
+    def recognize(image):
+        image.read()
+        return TEXT, 90.0
+
+    image = io.BytesIO(b"image")
+    LocalOCR(recognize, thumbnail=True).prepare(image)
+
+    assert image.tell() == 0
+
+
+def test_default_recognizer_requires_tesseract_ocr(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tesseract_ocr.utils", None)
+
+    with pytest.raises(RuntimeError, match="requires the tesseract_ocr module"):
+        LocalOCR()
+
+
+def test_default_recognizer_runs_the_tesseract_pipeline(dummy_image_path):
+    utils = pytest.importorskip("tesseract_ocr.utils")
+    recognized = []
+
+    def ocr_image_with_confidence(image):
+        recognized.append(image)
+        return TEXT, 95.0
+
+    with patch.object(utils, "ocr_image_with_confidence", ocr_image_with_confidence):
+        assert LocalOCR().prepare(dummy_image_path) == OCRText(TEXT, 95.0)
+
+    # The red dummy image, in BGR for OpenCV
+    assert recognized[0].shape == (10, 10, 3)
+    assert recognized[0][0, 0].tolist() == [0, 0, 255]
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_provider_sends_ocr_text(mock_openai_client_class, mock_chat_completion):
+    create = mock_openai_client_class.return_value.chat.completions.create
+    create.return_value = mock_chat_completion
+    provider = OpenAIProvider(api_key="test_api_key")
+
+    with collect(ProcessingReport()) as report:
+        provider.get_response(OCRText(TEXT, 90.0), {"type": "object"})
+
+    messages = create.call_args.kwargs["messages"]
+    assert messages[1]["content"] == [
+        {"type": "text", "text": OCR_USER_PROMPT},
+        {"type": "text", "text": TEXT},
+    ]
+    assert report.payload_bytes is None
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_provider_sends_low_detail_thumbnail(
+    mock_openai_client_class, mock_chat_completion, tmp_path
+):
+    create = mock_openai_client_class.return_value.chat.completions.create
+    create.return_value = mock_chat_completion
+    image_path = tmp_path / "receipt.png"
+    Image.new("RGB", (400, 2000), "white").save(image_path)
+    provider = OpenAIProvider(api_key="test_api_key")
+
+    with collect(ProcessingReport()) as report:
+        provider.get_response(
+            OCRText(TEXT, 90.0, thumbnail=str(image_path), thumbnail_size=500),
+            {"type": "object"},
+        )
+
+    part = create.call_args.kwargs["messages"][1]["content"][-1]
+    assert part["image_url"]["detail"] == "low"
+    assert part["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert report.image_size == (100, 500)
+
+
+def test_processor_sends_ocr_text(mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    processor = ReceiptProcessor(provider, local_ocr=LocalOCR(_recognizer()))
+
+    result, report = processor.process_receipt(
+        "receipt.jpg", {"type": "object"}, "gpt-4o", return_report=True
+    )
+
+    assert result == {"merchant_name": "Test Merchant", "total": 10.00}
+    provider.get_response.assert_called_once_with(
+        OCRText(TEXT, 90.0), {"type": "object"}, "gpt-4o", None
+    )
+    assert "ocr" in report.stages
+    assert report.ocr_fallback is False
+
+
+def test_processor_stream_sends_image_on_fallback():
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = iter(())
+    local_ocr = LocalOCR(_recognizer(confidence=10.0))
+    processor = ReceiptProcessor(provider, local_ocr=local_ocr)
+
+    list(processor.stream_receipt("receipt.jpg", {"type": "object"}))
+
+    assert provider.get_response.call_args.args[0] == "receipt.jpg"
+
+
+def test_async_processor_sends_ocr_text(mock_chat_completion):
+    provider = MagicMock(spec=AsyncOpenAIProvider)
+
+    async def get_response(*args, **kwargs):
+        return mock_chat_completion
+
+    provider.get_response.side_effect = get_response
+    processor = ReceiptProcessor(provider, local_ocr=LocalOCR(_recognizer()))
+
+    _, report = asyncio.run(
+        processor.aprocess_receipt(
+            "receipt.jpg", {"type": "object"}, return_report=True
+        )
+    )
+
+    assert provider.get_response.call_args.args[0] == OCRText(TEXT, 90.0)
+    assert report.ocr_confidence == 90.0
+
+
+def test_hedges_share_file_thumbnails():
+    prepared = OCRText(TEXT, 90.0, thumbnail=io.BytesIO(b"image"))
+
+    assert _shareable(prepared) == OCRText(TEXT, 90.0, thumbnail=b"image")
+
+
+def test_processor_cache_separates_local_ocr_runs(mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    cache = ExtractionCache()
+    image = b"receipt"
+
+    for local_ocr in (None, LocalOCR(_recognizer()), LocalOCR(_recognizer())):
+        processor = ReceiptProcessor(provider, cache=cache, local_ocr=local_ocr)
+        processor.process_receipt(image, {"type": "object"})
+
+    # The image, then the OCR text, then the cached OCR result
+    assert provider.get_response.call_count == 2
+    assert provider.get_response.call_args.args[0] == OCRText(TEXT, 90.0)
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,149 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from receipt_ocr import (
+    AsyncOpenAIProvider,
+    OpenAIProvider,
+    ProcessingReport,
+    ReceiptProcessor,
+)
+from receipt_ocr.instrumentation import collect, estimate_image_tokens, record
+
+
+@pytest.fixture
+def chat_completion_with_usage(mock_chat_completion):
+    mock_chat_completion.usage = SimpleNamespace(
+        prompt_tokens=1200,
+        completion_tokens=80,
+        total_tokens=1280,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1024),
+    )
+    return mock_chat_completion
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        ((512, 512), 85 + 170),
+        ((1024, 1024), 85 + 170 * 4),
+        # Scaled to 768x1536 first
+        ((1000, 2000), 85 + 170 * 6),
+    ],
+)
+def test_estimate_image_tokens(size, expected):
+    assert estimate_image_tokens(*size) == expected
+
+
+def test_report_stage_accumulates():
+    report = ProcessingReport()
+
+    with report.stage("decode"):
+        pass
+    first = report.stages["decode"]
+    with report.stage("decode"):
+        pass
+
+    assert report.stages["decode"] >= first
+    assert report.hot_stage == "decode"
+    assert report.total_time == report.stages["decode"]
+
+
+def test_record_without_report_is_noop():
+    with record("decode"):
+        pass
+
+
+def test_collect_scopes_report():
+    report = ProcessingReport()
+
+    with collect(report):
+        with record("parse"):
+            pass
+    with record("http"):
+        pass
+
+    assert list(report.stages) == ["parse"]
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_process_receipt_returns_report(
+    mock_openai_client_class, dummy_image_path, chat_completion_with_usage
+):
+    mock_openai_instance = MagicMock()
+    mock_openai_instance.chat.completions.create.return_value = (
+        chat_completion_with_usage
+    )
+    mock_openai_client_class.return_value = mock_openai_instance
+    observer = MagicMock()
+    processor = ReceiptProcessor(
+        OpenAIProvider(api_key="test_api_key", image_passthrough=False),
+        observer=observer,
+    )
+
+    result, report = processor.process_receipt(
+        dummy_image_path, {"type": "object"}, "gpt-4o", return_report=True
+    )
+
+    assert result == {"merchant_name": "Test Merchant", "total": 10.00}
+    for name in ("open", "decode", "encode", "base64", "build", "http", "parse"):
+        assert name in report.stages
+    assert "resize" not in report.stages
+    assert report.model == "gpt-4o"
+    assert report.image_size == (10, 10)
+    assert report.mime_type == "image/jpeg"
+    assert report.payload_bytes > 0
+    assert report.prompt_tokens == 1200
+    assert report.completion_tokens == 80
+    assert report.total_tokens == 1280
+    assert report.cached_tokens == 1024
+    assert report.image_tokens == 85 + 170
+    assert report.to_dict()["image_tokens"] == 85 + 170
+    observer.assert_called_once_with(report)
+
+
+@patch("receipt_ocr.providers.AsyncOpenAI")
+def test_aprocess_receipt_returns_report(
+    mock_async_openai_client_class, dummy_image_path, chat_completion_with_usage
+):
+    mock_async_openai_instance = MagicMock()
+    mock_async_openai_instance.chat.completions.create = AsyncMock(
+        return_value=chat_completion_with_usage
+    )
+    mock_async_openai_client_class.return_value = mock_async_openai_instance
+    processor = ReceiptProcessor(AsyncOpenAIProvider(api_key="test_api_key"))
+
+    result, report = asyncio.run(
+        processor.aprocess_receipt(
+            dummy_image_path, {"type": "object"}, return_report=True
+        )
+    )
+
+    assert result == {"merchant_name": "Test Merchant", "total": 10.00}
+    # Stages recorded in the worker thread end up in the same report
+    assert "open" in report.stages
+    assert "http" in report.stages
+    assert report.prompt_tokens == 1200
+
+
+def test_process_receipt_result_only_by_default(mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    processor = ReceiptProcessor(provider)
+
+    result = processor.process_receipt("dummy_path.png", {"type": "object"})
+
+    assert result == {"merchant_name": "Test Merchant", "total": 10.00}
+
+
+def test_batch_results_carry_reports(mock_chat_completion):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    processor = ReceiptProcessor(provider)
+
+    results = processor.process_batch(["a.png", "b.png"], {"type": "object"})
+
+    assert all(isinstance(r.report, ProcessingReport) for r in results)
+    assert all("parse" in r.report.stages for r in results)
@@ -1,5 +1,7 @@
+from unittest.mock import patch
+
 import pytest
-from receipt_ocr import ReceiptParser
+from receipt_ocr import IncrementalReceiptParser, ReceiptParser
 
 
 @pytest.fixture
@@ -62,3 +64,77 @@ def test_parse_partial_json(parser):
 """
     parsed = parser.parse(response)
     assert "error" in parsed
+
+
+STREAMED_RESPONSE = """```json
+{
+  "merchant_name": "Shop, \\"The\\" {Best}",
+  "total_amount": 12.5,
+  "line_items": [
+    {"item_name": "A", "item_price": 2.5},
+    {"item_name": "B [x]", "item_price": 10}
+  ],
+  "note": null
+}
+```"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, len(STREAMED_RESPONSE)])
+def test_incremental_parser_emits_completed_parts(chunk_size):
+    parser = IncrementalReceiptParser()
+    events = []
+    for i in range(0, len(STREAMED_RESPONSE), chunk_size):
+        events += parser.feed(STREAMED_RESPONSE[i : i + chunk_size])
+
+    fields = [(e.field, e.value) for e in events if e.type == "field"]
+    items = [(e.field, e.index, e.value) for e in events if e.type == "item"]
+    assert fields[0] == ("merchant_name", 'Shop, "The" {Best}')
+    assert fields[1] == ("total_amount", 12.5)
+    assert fields[-1] == ("note", None)
+    assert items == [
+        ("line_items", 0, {"item_name": "A", "item_price": 2.5}),
+        ("line_items", 1, {"item_name": "B [x]", "item_price": 10}),
+    ]
+    assert parser.close()["total_amount"] == 12.5
+
+
+def test_incremental_parser_emits_fields_before_the_end():
+    parser = IncrementalReceiptParser()
+    events = parser.feed('{"merchant_name": "Shop", "line_items": [{"a": 1}, {"a"')
+    assert [(e.type, e.field) for e in events] == [
+        ("field", "merchant_name"),
+        ("item", "line_items"),
+    ]
+
+
+def test_incremental_parser_invalid_response():
+    parser = IncrementalReceiptParser()
+    assert parser.feed("not a valid json string") == []
+    assert "error" in parser.close()
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        '```json{"merchant_name": "Test Merchant", "total_amount": 10.0}```',
+        '```json\n{"merchant_name": "Test Merchant", "total_amount": 10.0}',
+        '```json\n{"merchant_name": "Test Merchant", "total_amount": 10.0}\n```\n'
+        "Let me know if you need anything else.",
+        'Here is the data: {"merchant_name": "Test Merchant", "total_amount": 10.0}',
+        'Using {braces} in prose: {"merchant_name": "Test Merchant", '
+        '"total_amount": 10.0} and {more}',
+    ],
+)
+def test_parse_wrapped_json(parser, response):
+    parsed = parser.parse(response)
+    assert parsed == {"merchant_name": "Test Merchant", "total_amount": 10.0}
+
+
+def test_parse_extracts_outermost_object(parser):
+    parsed = parser.parse('Result: {"a": {"b": [1, {"c": "}"}]}} done')
+    assert parsed == {"a": {"b": [1, {"c": "}"}]}}
+
+
+def test_parse_without_orjson(parser):
+    with patch("receipt_ocr.utils.orjson", None):
+        assert parser.parse('```json\n{"total": 1}\n```') == {"total": 1}
@@ -1,6 +1,13 @@
+import asyncio
+
 import pytest
-from unittest.mock import MagicMock
-from receipt_ocr import ReceiptProcessor, OpenAIProvider, ReceiptParser
+from unittest.mock import AsyncMock, MagicMock
+from receipt_ocr import (
+    AsyncOpenAIProvider,
+    ReceiptProcessor,
+    OpenAIProvider,
+    ReceiptParser,
+)
 
 
 @pytest.fixture
@@ -78,3 +85,205 @@ def test_process_receipt_with_minimal_schema(
 
     # Assert
     assert result == {"key": "value"}
+
+
+def test_process_receipt_rejects_async_provider(mock_parser):
+    processor = ReceiptProcessor(
+        provider=MagicMock(spec=AsyncOpenAIProvider), parser=mock_parser
+    )
+
+    with pytest.raises(TypeError, match="aprocess_receipt"):
+        processor.process_receipt("dummy_path.png", {"type": "object"})
+
+
+def test_aprocess_receipt_with_async_provider(mock_parser, mock_chat_completion):
+    mock_async_provider = MagicMock(spec=AsyncOpenAIProvider)
+    mock_async_provider.get_response = AsyncMock(return_value=mock_chat_completion)
+    mock_parser.parse.return_value = {"merchant_name": "Test Merchant"}
+    processor = ReceiptProcessor(provider=mock_async_provider, parser=mock_parser)
+
+    json_schema = {"type": "object"}
+    result = asyncio.run(
+        processor.aprocess_receipt("dummy_path.png", json_schema, "gpt-4o")
+    )
+
+    mock_async_provider.get_response.assert_awaited_once_with(
+        "dummy_path.png", json_schema, "gpt-4o", None
+    )
+    assert result == {"merchant_name": "Test Merchant"}
+
+
+def test_aprocess_receipt_with_sync_provider(
+    processor, mock_provider, mock_parser, mock_chat_completion
+):
+    mock_provider.get_response.return_value = mock_chat_completion
+    mock_parser.parse.return_value = {"merchant_name": "Test Merchant"}
+
+    json_schema = {"type": "object"}
+    result = asyncio.run(
+        processor.aprocess_receipt("dummy_path.png", json_schema, "gpt-4o")
+    )
+
+    mock_provider.get_response.assert_called_once_with(
+        "dummy_path.png", json_schema, "gpt-4o", None
+    )
+    assert result == {"merchant_name": "Test Merchant"}
+
+
+def test_process_batch_preserves_order_and_records_errors(
+    processor, mock_provider, mock_parser, mock_chat_completion
+):
+    def get_response(image, *args):
+        if image == "bad.png":
+            raise RuntimeError("API Error")
+        return mock_chat_completion
+
+    mock_provider.get_response.side_effect = get_response
+    mock_parser.parse.return_value = {"merchant_name": "Test Merchant"}
+
+    images = ["a.png", "bad.png", "c.png", "d.png"]
+    results = processor.process_batch(images, {"type": "object"}, max_concurrency=2)
+
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.image for r in results] == images
+    assert [r.ok for r in results] == [True, False, True, True]
+    assert results[0].result == {"merchant_name": "Test Merchant"}
+    assert results[1].error == "RuntimeError: API Error"
+    assert mock_provider.get_response.call_count == 4
+
+
+def test_iter_batch_yields_every_result(
+    processor, mock_provider, mock_parser, mock_chat_completion
+):
+    mock_provider.get_response.return_value = mock_chat_completion
+    mock_parser.parse.return_value = {"key": "value"}
+
+    images = (f"{i}.png" for i in range(10))
+    results = list(processor.iter_batch(images, {"type": "object"}, max_concurrency=3))
+
+    assert sorted(r.index for r in results) == list(range(10))
+    assert all(r.ok for r in results)
+
+
+def test_iter_batch_invalid_concurrency(processor):
+    with pytest.raises(ValueError, match="max_concurrency"):
+        list(processor.iter_batch(["a.png"], {"type": "object"}, max_concurrency=0))
+
+
+def test_aprocess_batch_with_async_provider(mock_parser, mock_chat_completion):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def get_response(image, *args):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if image == "bad.png":
+            raise RuntimeError("API Error")
+        return mock_chat_completion
+
+    mock_async_provider = MagicMock(spec=AsyncOpenAIProvider)
+    mock_async_provider.get_response = AsyncMock(side_effect=get_response)
+    mock_parser.parse.return_value = {"key": "value"}
+    processor = ReceiptProcessor(provider=mock_async_provider, parser=mock_parser)
+
+    images = ["a.png", "bad.png"] + [f"{i}.png" for i in range(6)]
+    results = asyncio.run(
+        processor.aprocess_batch(images, {"type": "object"}, max_concurrency=3)
+    )
+
+    assert [r.index for r in results] == list(range(8))
+    assert not results[1].ok
+    assert all(r.ok for i, r in enumerate(results) if i != 1)
+    assert max_in_flight <= 3
+
+
+def _chunk(content=None, usage=None):
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()] if content is not None else []
+    if content is not None:
+        chunk.choices[0].delta.content = content
+    chunk.usage = usage
+    return chunk
+
+
+STREAM_CHUNKS = ['{"merchant_name": "Sh', 'op", "line_items": [{"a": 1}', "]}"]
+
+
+def test_stream_receipt_yields_fields_then_result(mock_provider):
+    usage = MagicMock(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    mock_provider.get_response.return_value = iter(
+        [_chunk(c) for c in STREAM_CHUNKS] + [_chunk(usage=usage)]
+    )
+    reports = []
+    processor = ReceiptProcessor(provider=mock_provider, observer=reports.append)
+
+    events = list(processor.stream_receipt("image.jpg", {"merchant_name": "string"}))
+
+    assert [(e.type, e.field) for e in events] == [
+        ("field", "merchant_name"),
+        ("item", "line_items"),
+        ("field", "line_items"),
+        ("result", None),
+    ]
+    assert events[-1].value == {"merchant_name": "Shop", "line_items": [{"a": 1}]}
+    assert mock_provider.get_response.call_args[1] == {"stream": True}
+    assert reports[0].total_tokens == 15
+
+
+def test_astream_receipt_with_async_provider():
+    async def stream():
+        for content in STREAM_CHUNKS:
+            yield _chunk(content)
+
+    provider = MagicMock(spec=AsyncOpenAIProvider)
+    provider.get_response = AsyncMock(return_value=stream())
+    processor = ReceiptProcessor(provider=provider)
+
+    async def collect_events():
+        return [e async for e in processor.astream_receipt("image.jpg", {})]
+
+    events = asyncio.run(collect_events())
+    assert events[0].field == "merchant_name"
+    assert events[-1].type == "result"
+
+
+def test_astream_receipt_with_sync_provider(mock_provider):
+    mock_provider.get_response.return_value = iter(_chunk(c) for c in STREAM_CHUNKS)
+    processor = ReceiptProcessor(provider=mock_provider)
+
+    async def collect_events():
+        return [e async for e in processor.astream_receipt("image.jpg", {})]
+
+    events = asyncio.run(collect_events())
+    assert events[-1].value["merchant_name"] == "Shop"
+
+
+def test_process_receipt_validates_result(mock_provider, mock_parser):
+    mock_provider.get_response.return_value = MagicMock()
+    mock_parser.parse.return_value = {"merchant_name": "Shop", "total": "$12.50"}
+    processor = ReceiptProcessor(mock_provider, mock_parser, validate=True)
+    json_schema = {"merchant_name": "string", "total": "number", "date": "date"}
+
+    result, report = processor.process_receipt(
+        "dummy_path.png", json_schema, return_report=True
+    )
+
+    assert result == {"merchant_name": "Shop", "total": 12.5}
+    assert report.violations == ["date: missing required property"]
+    assert "validate" in report.stages
+
+
+def test_process_receipt_does_not_validate_parse_errors(mock_provider, mock_parser):
+    mock_provider.get_response.return_value = MagicMock()
+    mock_parser.parse.return_value = {"error": "Invalid JSON"}
+    processor = ReceiptProcessor(mock_provider, mock_parser, validate=True)
+
+    result, report = processor.process_receipt(
+        "dummy_path.png", {"total": "number"}, return_report=True
+    )
+
+    assert result == {"error": "Invalid JSON"}
+    assert report.violations is None
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from receipt_ocr import ExtractionProfile, get_profile
+from receipt_ocr.prompts import OCR_USER_PROMPT, SYSTEM_PROMPT, USER_PROMPT
+
+
+@pytest.fixture
+def json_schema():
+    return {
+        "type": "object",
+        "properties": {"merchant_name": {"type": "string"}},
+    }
+
+
+def test_profile_compiles_system_prompt(json_schema):
+    profile = ExtractionProfile(json_schema)
+
+    assert profile.system_prompt == SYSTEM_PROMPT.format(
+        json_schema_content=json.dumps(json_schema, indent=2)
+    )
+    assert profile.system_message == {
+        "role": "system",
+        "content": profile.system_prompt,
+    }
+    assert profile.response_format == {"type": "json_object"}
+    assert profile.response_format_type == "json_object"
+
+
+@pytest.mark.parametrize(
+    "response_format_type, expected",
+    [
+        ("text", {"type": "text"}),
+        (
+            "json_schema",
+            {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "receipt_data",
+                    "schema": {"type": "object"},
+                    "strict": True,
+                },
+            },
+        ),
+    ],
+)
+def test_profile_response_format(response_format_type, expected):
+    profile = ExtractionProfile({"type": "object"}, response_format_type)
+
+    assert profile.response_format == expected
+
+
+def test_profile_invalid_response_format():
+    with pytest.raises(ValueError, match="Invalid response_format_type"):
+        ExtractionProfile({"type": "object"}, "yaml")
+
+
+def test_build_messages_static_prefix(json_schema):
+    profile = ExtractionProfile(json_schema)
+
+    first = profile.build_messages("data:image/png;base64,AAAA")
+    second = profile.build_messages("data:image/jpeg;base64,BBBB")
+
+    # Everything before the image is shared and serializes identically
+    assert first[0] is second[0]
+    assert first[1]["content"][0] is second[1]["content"][0]
+    assert first[1]["content"][0] == {"type": "text", "text": USER_PROMPT}
+    assert first[1]["content"][-1] == {
+        "type": "image_url",
+        "image_url": {"url": "data:image/png;base64,AAAA"},
+    }
+    prefix = json.dumps(first)[: json.dumps(first).index("data:")]
+    assert json.dumps(second).startswith(prefix)
+
+
+def test_get_profile_is_cached(json_schema):
+    profile = get_profile(json_schema)
+
+    assert get_profile(dict(json_schema)) is profile
+    assert get_profile(json_schema, "text") is not profile
+    assert get_profile(profile) is profile
+
+
+def test_get_profile_applies_response_format_to_profiles(json_schema):
+    profile = get_profile(json_schema)
+
+    overridden = get_profile(profile, "json_schema")
+
+    assert overridden.response_format["type"] == "json_schema"
+    assert overridden.system_message is profile.system_message
+    assert profile.response_format == {"type": "json_object"}
+    assert get_profile(profile, "json_object") is profile
+    with pytest.raises(ValueError, match="Invalid response_format_type"):
+        get_profile(profile, "xml")
+
+
+def test_get_profile_is_isolated_from_mutation(json_schema):
+    profile = get_profile(json_schema)
+    json_schema["properties"]["total"] = {"type": "number"}
+
+    assert "total" not in profile.json_schema
+    assert get_profile(json_schema) is not profile
+
+
+def test_prompt_version_tracks_prompts(json_schema):
+    default = ExtractionProfile(json_schema)
+    custom = ExtractionProfile(json_schema, user_prompt="Extract this receipt.")
+
+    assert default.prompt_version == ExtractionProfile({}).prompt_version
+    assert custom.prompt_version != default.prompt_version
+    for prompt in ("ocr_prompt", "tile_prompt"):
+        edited = ExtractionProfile(json_schema, **{prompt: "Edited."})
+        assert edited.prompt_version != default.prompt_version
+
+
+def test_build_ocr_messages(json_schema):
+    profile = ExtractionProfile(json_schema)
+
+    messages = profile.build_ocr_messages("TOTAL 5.50", "data:image/png;base64,AAAA")
+
+    assert messages[0] is profile.system_message
+    assert messages[1]["content"] == [
+        {"type": "text", "text": OCR_USER_PROMPT},
+        {"type": "text", "text": "TOTAL 5.50"},
+        {
+            "type": "image_url",
+            "image_url": {"url": "data:image/png;base64,AAAA", "detail": "low"},
+        },
+    ]
@@ -1,8 +1,12 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+from openai import APIConnectionError, APIError
 
-from receipt_ocr import OpenAIProvider
+from receipt_ocr import AsyncOpenAIProvider, ExtractionProfile, OpenAIProvider
+from receipt_ocr.connections import create_http_client
 
 
 @patch("receipt_ocr.providers.OpenAI")
@@ -27,6 +31,28 @@ def test_get_response(mock_openai_client_class, dummy_image_path, mock_chat_comp
     )
 
     assert response.choices[0].message.content == '{"merchant_name": "Test Merchant"}'
+    # The dummy PNG is small enough to be sent untouched
+    messages = mock_openai_instance.chat.completions.create.call_args[1]["messages"]
+    image_url = messages[1]["content"][1]["image_url"]["url"]
+    assert image_url.startswith("data:image/png;base64,")
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_get_response_image_options(
+    mock_openai_client_class, dummy_image_path, mock_chat_completion
+):
+    mock_openai_instance = MagicMock()
+    mock_openai_client_class.return_value = mock_openai_instance
+    mock_openai_instance.chat.completions.create.return_value = mock_chat_completion
+
+    provider = OpenAIProvider(
+        api_key="test_api_key", image_format="webp", image_passthrough=False
+    )
+    provider.get_response(dummy_image_path, json_schema={"type": "object"})
+
+    messages = mock_openai_instance.chat.completions.create.call_args[1]["messages"]
+    image_url = messages[1]["content"][1]["image_url"]["url"]
+    assert image_url.startswith("data:image/webp;base64,")
 
 
 @patch("receipt_ocr.providers.OpenAI")
@@ -108,3 +134,147 @@ def test_get_response_text_format(
     # Verify the response_format was set to text
     call_args = mock_openai_instance.chat.completions.create.call_args
     assert call_args[1]["response_format"] == {"type": "text"}
+
+
+@patch("receipt_ocr.providers.AsyncOpenAI")
+def test_async_get_response(
+    mock_async_openai_client_class, dummy_image_path, mock_chat_completion
+):
+    mock_async_openai_instance = MagicMock()
+    mock_async_openai_instance.chat.completions.create = AsyncMock(
+        return_value=mock_chat_completion
+    )
+    mock_async_openai_client_class.return_value = mock_async_openai_instance
+
+    provider = AsyncOpenAIProvider(api_key="test_api_key", base_url="http://test.com")
+
+    dummy_json_schema = {
+        "type": "object",
+        "properties": {"merchant_name": {"type": "string"}},
+    }
+    response = asyncio.run(
+        provider.get_response(
+            dummy_image_path, json_schema=dummy_json_schema, model="gpt-4o"
+        )
+    )
+
+    assert response is mock_chat_completion
+    call_args = mock_async_openai_instance.chat.completions.create.call_args
+    assert call_args[1]["model"] == "gpt-4o"
+    assert call_args[1]["response_format"] == {"type": "json_object"}
+    mock_async_openai_client_class.assert_called_once_with(
+        api_key="test_api_key", base_url="http://test.com"
+    )
+
+
+@patch("receipt_ocr.providers.AsyncOpenAI")
+def test_async_get_response_invalid_format(
+    mock_async_openai_client_class, dummy_image_path
+):
+    provider = AsyncOpenAIProvider(api_key="test_api_key")
+
+    with pytest.raises(ValueError, match="Invalid response_format_type"):
+        asyncio.run(
+            provider.get_response(
+                dummy_image_path,
+                json_schema={"type": "object"},
+                response_format_type="yaml",
+            )
+        )
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_get_response_with_profile(
+    mock_openai_client_class, dummy_image_path, mock_chat_completion
+):
+    mock_openai_instance = MagicMock()
+    mock_openai_client_class.return_value = mock_openai_instance
+    mock_openai_instance.chat.completions.create.return_value = mock_chat_completion
+
+    profile = ExtractionProfile({"type": "object"}, "text")
+    provider = OpenAIProvider(api_key="test_api_key")
+    provider.get_response(dummy_image_path, json_schema=profile)
+
+    call_args = mock_openai_instance.chat.completions.create.call_args
+    assert call_args[1]["response_format"] is profile.response_format
+    assert call_args[1]["messages"][0] is profile.system_message
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_get_response_profile_with_response_format_type(
+    mock_openai_client_class, dummy_image_path, mock_chat_completion
+):
+    create = mock_openai_client_class.return_value.chat.completions.create
+    create.return_value = mock_chat_completion
+
+    profile = ExtractionProfile({"type": "object"})
+    provider = OpenAIProvider(api_key="test_api_key")
+    provider.get_response(dummy_image_path, profile, response_format_type="json_schema")
+
+    assert create.call_args.kwargs["response_format"]["type"] == "json_schema"
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_get_response_stream(mock_openai_client_class, dummy_image_path):
+    mock_openai_instance = MagicMock()
+    mock_openai_client_class.return_value = mock_openai_instance
+
+    provider = OpenAIProvider(api_key="test_api_key")
+    provider.get_response(dummy_image_path, {"type": "object"}, stream=True)
+
+    call_args = mock_openai_instance.chat.completions.create.call_args
+    assert call_args[1]["stream"] is True
+    assert call_args[1]["stream_options"] == {"include_usage": True}
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_http_client_is_passed_to_sdk(mock_openai_client_class):
+    http_client = create_http_client(max_connections=4)
+
+    OpenAIProvider(api_key="test_api_key", http_client=http_client)
+
+    mock_openai_client_class.assert_called_once_with(
+        api_key="test_api_key", base_url=None, http_client=http_client
+    )
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_warm_up_counts_reached_connections(mock_openai_client_class):
+    request = httpx.Request("GET", "http://test.com/v1/models")
+    client = mock_openai_client_class.return_value.with_options.return_value
+    client.models.list.side_effect = [
+        None,
+        # An error response still opened the connection
+        APIError("Unauthorized", request, body=None),
+        APIConnectionError(request=request),
+    ]
+
+    provider = OpenAIProvider(api_key="test_api_key")
+
+    assert provider.warm_up(3) == 2
+    mock_openai_client_class.return_value.with_options.assert_called_once_with(
+        max_retries=0, timeout=5.0
+    )
+
+
+@patch("receipt_ocr.providers.AsyncOpenAI")
+def test_async_warm_up(mock_async_openai_client_class):
+    client = mock_async_openai_client_class.return_value.with_options.return_value
+    client.models.list = AsyncMock(return_value=None)
+
+    provider = AsyncOpenAIProvider(api_key="test_api_key")
+
+    assert asyncio.run(provider.warm_up(4, timeout=2.0)) == 4
+    assert client.models.list.await_count == 4
+    mock_async_openai_client_class.return_value.with_options.assert_called_once_with(
+        max_retries=0, timeout=2.0
+    )
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_max_retries_is_passed_to_sdk(mock_openai_client_class):
+    OpenAIProvider(api_key="test_api_key", max_retries=0)
+
+    mock_openai_client_class.assert_called_once_with(
+        api_key="test_api_key", base_url=None, max_retries=0
+    )
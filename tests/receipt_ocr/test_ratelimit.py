@@ -0,0 +1,148 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import openai
+import pytest
+
+from receipt_ocr import OpenAIProvider, RateLimiter
+from receipt_ocr.ratelimit import _retry_after, estimate_request_tokens
+
+
+def test_requests_per_minute_spaces_requests(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+    # The bucket starts full, the 61st request waits one interval
+    delays = [limiter.reserve() for _ in range(62)]
+    assert delays[:60] == [0.0] * 60
+    assert delays[60] == pytest.approx(1.0)
+    assert delays[61] == pytest.approx(2.0)
+
+    # The budget refills over time
+    clock[0] += 10
+    assert limiter.reserve() == pytest.approx(0.0)
+
+
+def test_tokens_per_minute_budget(clock):
+    limiter = RateLimiter(tokens_per_minute=6000)
+    assert limiter.reserve(6000) == 0.0
+    assert limiter.reserve(1000) == pytest.approx(10.0)
+
+
+def test_usage_settles_the_estimate(clock):
+    limiter = RateLimiter(tokens_per_minute=6000)
+    response = MagicMock()
+    response.usage.total_tokens = 1000
+
+    # The estimate was too high, the unused part is returned to the budget
+    limiter.call(lambda: response, tokens=6000)
+    assert limiter.reserve(5000) == pytest.approx(0.0)
+
+
+def test_estimate_request_tokens():
+    request = {
+        "messages": [
+            {"role": "system", "content": "x" * 400},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "y" * 40},
+                    {"type": "image_url", "image_url": {"url": "data:..."}},
+                ],
+            },
+        ]
+    }
+    assert estimate_request_tokens(request, completion_tokens=0) == 110
+    # 512x512 is a single tile
+    assert estimate_request_tokens(request, (512, 512), 0) == 110 + 255
+
+
+def test_retry_after_headers(status_error):
+    assert _retry_after(status_error(429, {"retry-after": "3"})) == 3.0
+    assert _retry_after(status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert _retry_after(status_error(429)) is None
+    assert _retry_after(ValueError()) is None
+
+
+@patch("receipt_ocr.ratelimit.time.sleep")
+def test_call_honors_retry_after(mock_sleep, status_error):
+    limiter = RateLimiter(requests_per_minute=600, jitter=0.1)
+    response = MagicMock()
+    func = MagicMock(side_effect=[status_error(429, {"retry-after": "2"}), response])
+
+    assert limiter.call(func) is response
+    assert func.call_count == 2
+    # Never earlier than asked, jitter only adds to the delay
+    delay = mock_sleep.call_args_list[0][0][0]
+    assert 2.0 <= delay <= 2.2
+    assert limiter.stats() == {"retries": 1, "rate_limited": 1}
+
+
+@patch("receipt_ocr.ratelimit.time.sleep")
+def test_rate_limit_pauses_other_requests(mock_sleep, status_error):
+    limiter = RateLimiter(requests_per_minute=600, jitter=0)
+    func = MagicMock(side_effect=[status_error(429, {"retry-after": "5"}), "ok"])
+    limiter.call(func)
+    # The sleep is mocked, so the pause is still in effect for the next caller
+    assert limiter.reserve() == pytest.approx(5.0, abs=0.1)
+
+
+@patch("receipt_ocr.ratelimit.time.sleep")
+def test_call_gives_up_after_max_retries(mock_sleep, status_error):
+    limiter = RateLimiter(max_retries=2)
+    func = MagicMock(side_effect=status_error(500))
+
+    with pytest.raises(openai.InternalServerError):
+        limiter.call(func)
+    assert func.call_count == 3
+    # Exponential backoff with jitter without a Retry-After header
+    delays = [call[0][0] for call in mock_sleep.call_args_list]
+    assert 0.25 <= delays[0] <= 0.6
+    assert 0.5 <= delays[1] <= 1.2
+
+
+def test_call_does_not_retry_client_errors():
+    limiter = RateLimiter()
+    func = MagicMock(side_effect=ValueError("bad"))
+    with pytest.raises(ValueError):
+        limiter.call(func)
+    assert func.call_count == 1
+
+
+def test_acall_retries(status_error):
+    limiter = RateLimiter(requests_per_minute=600)
+    attempts = []
+
+    async def func():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise status_error(429, {"retry-after-ms": "10"})
+        return "ok"
+
+    assert asyncio.run(limiter.acall(func)) == "ok"
+    assert len(attempts) == 2
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        RateLimiter(requests_per_minute=0)
+    with pytest.raises(ValueError):
+        RateLimiter(tokens_per_minute=-1)
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_provider_uses_rate_limiter(
+    mock_openai_client_class, dummy_image_path, mock_chat_completion
+):
+    mock_openai_instance = MagicMock()
+    mock_openai_client_class.return_value = mock_openai_instance
+    mock_openai_instance.chat.completions.create.return_value = mock_chat_completion
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100_000)
+
+    provider = OpenAIProvider(api_key="test_api_key", rate_limiter=limiter)
+    with patch.object(limiter, "call", wraps=limiter.call) as mock_call:
+        response = provider.get_response(dummy_image_path, {"type": "object"})
+
+    assert response is mock_chat_completion
+    # The limiter owns retries, the SDK's own retries are disabled
+    assert mock_openai_client_class.call_args[1]["max_retries"] == 0
+    tokens = mock_call.call_args[0][1]
+    assert tokens > limiter.completion_tokens
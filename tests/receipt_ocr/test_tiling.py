@@ -0,0 +1,266 @@
+import asyncio
+import io
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from receipt_ocr import (
+    AsyncOpenAIProvider,
+    OpenAIProvider,
+    ProcessingReport,
+    ReceiptProcessor,
+    ReceiptTile,
+    Tiler,
+)
+from receipt_ocr.tiling import _merge_lists, combine_reports, merge_results
+
+
+def _item(name, quantity=1, price=1.0):
+    return {"item_name": name, "item_quantity": quantity, "item_price": price}
+
+
+def _response(content, prompt_tokens=100):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = 10
+    response.usage.total_tokens = prompt_tokens + 10
+    response.usage.prompt_tokens_details.cached_tokens = 0
+    return response
+
+
+TILE_CONTENTS = [
+    '{"merchant_name": "Big Mart", "total_amount": null, "line_items": ['
+    '{"item_name": "Milk", "item_quantity": 1, "item_price": 2.5}, '
+    '{"item_name": "Bread", "item_quantity": 1, "item_price": 3.0}]}',
+    '{"merchant_name": null, "total_amount": null, "line_items": ['
+    '{"item_name": "Bread", "item_quantity": 1, "item_price": 3.0}, '
+    '{"item_name": "Eggs", "item_quantity": 12, "item_price": 4.2}]}',
+    '{"merchant_name": "Big Mart", "total_amount": 11.0, "line_items": ['
+    '{"item_name": "Eggs", "item_quantity": 12, "item_price": 4.2}, '
+    '{"item_name": "Tea", "item_quantity": 1, "item_price": 1.3}]}',
+]
+MERGED = {
+    "merchant_name": "Big Mart",
+    "total_amount": 11.0,
+    "line_items": [
+        _item("Milk", 1, 2.5),
+        _item("Bread", 1, 3.0),
+        _item("Eggs", 12, 4.2),
+        _item("Tea", 1, 1.3),
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "size", [(1000, 1500), (3000, 4000), (500, 900)], ids=["short", "wide", "small"]
+)
+def test_tile_bounds_leaves_other_images_whole(size):
+    assert Tiler().tile_bounds(*size) is None
+
+
+def test_tile_bounds_overlap_and_cover_the_receipt():
+    tiler = Tiler(overlap=0.15, tile_size=1000)
+
+    bounds = tiler.tile_bounds(600, 3500)
+
+    assert len(bounds) == 4
+    assert bounds[0][0] == 0 and bounds[-1][1] == 3500
+    for (top, bottom), (next_top, _) in zip(bounds, bounds[1:]):
+        assert bottom - top == 1000
+        assert bottom - next_top >= 150
+
+
+def test_tile_bounds_caps_the_tiles():
+    bounds = Tiler(max_tiles=3, tile_size=1000).tile_bounds(600, 10000)
+
+    assert len(bounds) == 3
+    assert bounds[-1][1] == 10000
+    assert bounds[0][1] > bounds[1][0]
+
+
+def test_tiler_rejects_invalid_options():
+    with pytest.raises(ValueError, match="overlap"):
+        Tiler(overlap=0.5)
+    with pytest.raises(ValueError, match="max_tiles"):
+        Tiler(max_tiles=1)
+
+
+def test_split_crops_tiles(tmp_path):
+    image_path = tmp_path / "long.png"
+    Image.new("RGB", (400, 2500), "white").save(image_path)
+
+    tiles = Tiler(tile_size=1000).split(str(image_path))
+
+    assert [tile.index for tile in tiles] == [0, 1, 2]
+    assert all(tile.count == 3 for tile in tiles)
+    assert all(tile.image.size == (400, 1000) for tile in tiles)
+
+
+@pytest.mark.parametrize("height", [2500, 500], ids=["tiled", "not-tiled"])
+def test_split_closes_the_image_file(tmp_path, height):
+    image_path = tmp_path / "receipt.png"
+    Image.new("RGB", (400, height), "white").save(image_path)
+    opened = []
+    original_open = Image.open
+
+    def spy_open(*args, **kwargs):
+        opened.append(original_open(*args, **kwargs))
+        return opened[-1]
+
+    with patch("receipt_ocr.tiling.Image.open", spy_open):
+        tiles = Tiler(tile_size=1000).split(str(image_path))
+
+    assert opened[0].fp is None
+    # The tiles are still readable
+    for tile in tiles or []:
+        assert tile.image.getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_split_rewinds_images_that_are_not_tiled():
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 500), "white").save(buffer, format="PNG")
+    buffer.seek(0)
+
+    assert Tiler().split(buffer) is None
+    assert buffer.tell() == 0
+
+
+def test_merge_lists_drops_the_overlap():
+    head = [_item("Milk"), _item("Bread"), _item("Eggs")]
+    tail = [_item("Bread"), _item("Eggs"), _item("Tea")]
+
+    assert _merge_lists(head, tail) == head + [_item("Tea")]
+
+
+def test_merge_lists_drops_items_cut_by_the_edge():
+    head = [_item("Milk"), _item("Bread"), _item("Eggs", None, None)]
+    tail = [_item("Bread"), _item("Eggs", 12, 4.2), _item("Tea")]
+
+    assert _merge_lists(head, tail) == [
+        _item("Milk"),
+        _item("Bread"),
+        _item("Eggs", 12, 4.2),
+        _item("Tea"),
+    ]
+
+
+def test_merge_lists_keeps_distinct_items():
+    head = [_item("Milk", 1, 2.5), _item("Bread")]
+    tail = [_item("Milk", 1, 2.9), _item("Tea")]
+
+    assert _merge_lists(head, tail) == head + tail
+
+
+def test_merge_results_takes_the_first_value():
+    results = [
+        {"merchant_name": "Big Mart", "total_amount": None},
+        {"merchant_name": "BIG MART INC", "total_amount": 11.0},
+    ]
+
+    assert merge_results(results) == {"merchant_name": "Big Mart", "total_amount": 11.0}
+
+
+def test_combine_reports_sums_tokens_and_keeps_slowest_stages():
+    tile_reports = [
+        ProcessingReport(prompt_tokens=100, stages={"http": 1.0}),
+        ProcessingReport(prompt_tokens=120, stages={"http": 2.0}),
+    ]
+    report = ProcessingReport()
+
+    combine_reports(report, tile_reports)
+
+    assert report.tiles == 2
+    assert report.prompt_tokens == 220
+    assert report.completion_tokens is None
+    assert report.stages == {"http": 2.0}
+
+
+@patch("receipt_ocr.providers.OpenAI")
+def test_provider_sends_tile_prompt(mock_openai_client_class, mock_chat_completion):
+    create = mock_openai_client_class.return_value.chat.completions.create
+    create.return_value = mock_chat_completion
+    provider = OpenAIProvider(api_key="test_api_key")
+    tile = ReceiptTile(Image.new("RGB", (400, 1000), "white"), index=1, count=3)
+
+    provider.get_response(tile, {"type": "object"})
+
+    content = create.call_args.kwargs["messages"][1]["content"]
+    assert "part 2 of 3" in content[0]["text"]
+    assert content[1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+
+
+def _long_receipt(tmp_path):
+    image_path = tmp_path / "long.png"
+    Image.new("RGB", (400, 2500), "white").save(image_path)
+    return str(image_path)
+
+
+def test_processor_extracts_tiles_concurrently(tmp_path):
+    started = threading.Barrier(3, timeout=5)
+
+    def get_response(tile, *args):
+        # Fails unless the three tiles are requested at the same time
+        started.wait()
+        return _response(TILE_CONTENTS[tile.index])
+
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.side_effect = get_response
+    processor = ReceiptProcessor(provider, tiler=Tiler(tile_size=1000))
+
+    result, report = processor.process_receipt(
+        _long_receipt(tmp_path), {"type": "object"}, return_report=True
+    )
+
+    assert result == MERGED
+    assert report.tiles == 3
+    assert report.prompt_tokens == 300
+    assert "tile" in report.stages and "merge" in report.stages
+
+
+def test_processor_returns_tile_parse_failures(tmp_path):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = _response("invalid json")
+    processor = ReceiptProcessor(provider, tiler=Tiler(tile_size=1000))
+
+    result = processor.process_receipt(_long_receipt(tmp_path), {"type": "object"})
+
+    assert set(result) == {"error"}
+
+
+def test_processor_sends_short_receipts_whole(mock_chat_completion, dummy_image_path):
+    provider = MagicMock(spec=OpenAIProvider)
+    provider.get_response.return_value = mock_chat_completion
+    processor = ReceiptProcessor(provider, tiler=Tiler())
+
+    _, report = processor.process_receipt(
+        dummy_image_path, {"type": "object"}, return_report=True
+    )
+
+    assert provider.get_response.call_args.args[0] == dummy_image_path
+    assert report.tiles is None
+
+
+def test_async_processor_extracts_tiles_concurrently(tmp_path):
+    provider = MagicMock(spec=AsyncOpenAIProvider)
+
+    async def get_response(tile, *args):
+        await asyncio.sleep(0.2)
+        return _response(TILE_CONTENTS[tile.index])
+
+    provider.get_response.side_effect = get_response
+    processor = ReceiptProcessor(provider, tiler=Tiler(tile_size=1000))
+
+    start = time.perf_counter()
+    result, report = asyncio.run(
+        processor.aprocess_receipt(
+            _long_receipt(tmp_path), {"type": "object"}, return_report=True
+        )
+    )
+
+    assert time.perf_counter() - start < 0.5
+    assert result == MERGED
+    assert report.total_tokens == 330
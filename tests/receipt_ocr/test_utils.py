@@ -1,10 +1,19 @@
 import base64
 import io
+from contextlib import nullcontext
+from tempfile import SpooledTemporaryFile
+from unittest.mock import patch
 
 import pytest
 from PIL import Image
 
-from receipt_ocr.utils import encode_image_to_base64
+from receipt_ocr.utils import (
+    encode_image,
+    encode_image_to_base64,
+    encode_image_to_data_url,
+    json_dumps,
+    json_loads,
+)
 
 
 def test_encode_image_from_path(tmp_path):
@@ -75,3 +84,134 @@ def test_encode_image_mode_conversion():
     reconstructed = Image.open(io.BytesIO(decoded))
     # Should be converted to RGB
     assert reconstructed.mode == "RGB"
+
+
+@pytest.mark.parametrize(
+    "image_format, expected_format, expected_mime",
+    [
+        ("jpeg", "JPEG", "image/jpeg"),
+        ("JPG", "JPEG", "image/jpeg"),
+        ("webp", "WEBP", "image/webp"),
+        ("png", "PNG", "image/png"),
+    ],
+)
+def test_encode_image_output_format(image_format, expected_format, expected_mime):
+    rgba_image = Image.new("RGBA", (40, 20), color=(255, 0, 0, 128))
+
+    img_str, mime_type = encode_image(rgba_image, image_format=image_format)
+
+    assert mime_type == expected_mime
+    reconstructed = Image.open(io.BytesIO(base64.b64decode(img_str)))
+    assert reconstructed.format == expected_format
+    assert reconstructed.size == (40, 20)
+
+
+def test_encode_image_unsupported_format():
+    with pytest.raises(ValueError, match="Unsupported image format"):
+        encode_image(Image.new("RGB", (10, 10)), image_format="bmp")
+
+
+def test_encode_image_jpeg_quality():
+    noisy = Image.effect_noise((200, 200), 64).convert("RGB")
+
+    low, _ = encode_image(noisy, image_format="jpeg", quality=20)
+    high, _ = encode_image(noisy, image_format="jpeg", quality=95)
+
+    assert len(low) < len(high)
+
+
+def test_encode_image_passthrough(tmp_path):
+    image_path = tmp_path / "receipt.jpg"
+    Image.new("RGB", (100, 50), color="white").save(image_path, format="JPEG")
+    original = image_path.read_bytes()
+
+    img_str, mime_type = encode_image(
+        str(image_path), image_format="webp", passthrough=True
+    )
+
+    assert base64.b64decode(img_str) == original
+    assert mime_type == "image/jpeg"
+
+
+@pytest.mark.parametrize(
+    "size, passthrough_max_bytes",
+    [
+        # Too large in dimensions
+        ((2000, 100), 1024 * 1024),
+        # Too large in bytes
+        ((100, 50), 10),
+    ],
+)
+def test_encode_image_passthrough_reencodes(size, passthrough_max_bytes):
+    buffered = io.BytesIO()
+    Image.new("RGB", size, color="white").save(buffered, format="PNG")
+
+    img_str, mime_type = encode_image(
+        buffered.getvalue(),
+        image_format="jpeg",
+        passthrough=True,
+        passthrough_max_bytes=passthrough_max_bytes,
+    )
+
+    assert mime_type == "image/jpeg"
+    reconstructed = Image.open(io.BytesIO(base64.b64decode(img_str)))
+    assert reconstructed.format == "JPEG"
+    assert max(reconstructed.size) <= 1080
+
+
+@pytest.mark.parametrize("source_format", ["JPEG", "PNG"])
+def test_encode_image_large_image_reduced_decode(tmp_path, source_format):
+    image_path = tmp_path / f"large.{source_format.lower()}"
+    Image.new("RGB", (4000, 3000), color="white").save(image_path, format=source_format)
+
+    img_str, _ = encode_image(str(image_path), max_size=1000, image_format="jpeg")
+
+    reconstructed = Image.open(io.BytesIO(base64.b64decode(img_str)))
+    assert reconstructed.size == (1000, 750)
+
+
+@pytest.mark.parametrize("passthrough", [True, False])
+def test_encode_image_from_spooled_file(passthrough):
+    buffered = io.BytesIO()
+    Image.new("RGB", (100, 50), color="white").save(buffered, format="JPEG")
+    original = buffered.getvalue()
+    # Rolled over to disk like a large upload
+    upload = SpooledTemporaryFile(max_size=10)
+    upload.write(original)
+    upload.seek(0)
+
+    img_str, mime_type = encode_image(
+        upload, image_format="png", passthrough=passthrough
+    )
+
+    if passthrough:
+        assert base64.b64decode(img_str) == original
+        assert mime_type == "image/jpeg"
+    else:
+        assert mime_type == "image/png"
+        assert Image.open(io.BytesIO(base64.b64decode(img_str))).size == (100, 50)
+
+
+def test_encode_image_to_data_url():
+    image = Image.new("RGB", (30, 30), color="green")
+
+    url = encode_image_to_data_url(image, image_format="jpeg")
+
+    img_str, mime_type = encode_image(image, image_format="jpeg")
+    assert url == f"data:{mime_type};base64,{img_str}"
+
+
+@pytest.mark.parametrize("backend", ["orjson", None])
+def test_json_roundtrip(backend):
+    data = {"merchant_name": "Café", "total": 12.5, "items": [1, None, True]}
+    with patch("receipt_ocr.utils.orjson", None) if backend is None else nullcontext():
+        encoded = json_dumps(data)
+        assert isinstance(encoded, bytes)
+        assert json_loads(encoded) == data
+        assert json_loads(encoded.decode()) == data
+        with pytest.raises(ValueError):
+            json_loads("not json")
+
+
+def test_json_dumps_large_integers():
+    assert json_loads(json_dumps({"n": 2**70})) == {"n": 2**70}
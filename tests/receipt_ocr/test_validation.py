@@ -0,0 +1,233 @@
+import pytest
+
+from receipt_ocr import SchemaValidator, get_validator, get_profile
+from receipt_ocr.validation import parse_date, parse_number, parse_time
+
+SHORTHAND_SCHEMA = {
+    "merchant_name": "string",
+    "transaction_date": "string",
+    "transaction_time": "string",
+    "total_amount": "number",
+    "line_items": [
+        {"item_name": "string", "item_quantity": "number", "item_price": "number"}
+    ],
+}
+
+JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "merchant_name": {"type": "string"},
+        "transaction_date": {"type": "string", "format": "date"},
+        "total_amount": {"type": "number", "minimum": 0},
+        "currency": {"type": ["string", "null"], "enum": ["USD", "EUR", None]},
+        "line_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "item_name": {"type": "string"},
+                    "item_quantity": {"type": "integer"},
+                },
+                "required": ["item_name"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["merchant_name", "total_amount"],
+}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("12.50", 12.5),
+        ("3", 3),
+        ("$12.50", 12.5),
+        ("12.50 USD", 12.5),
+        ("Rs. 1,200", 1200),
+        ("$1,234.56", 1234.56),
+        ("1.234,56 €", 1234.56),
+        ("12,50", 12.5),
+        ("1 234,50", 1234.5),
+        ("-$3.00", -3.0),
+        ("(4.25)", -4.25),
+        ("($4.25)", -4.25),
+        ("$-3.00", -3.0),
+        ("$ 1 234,50", 1234.5),
+        ("1'234.50 CHF", 1234.5),
+        ("N/A", None),
+        ("nan", None),
+        ("2024-01-05", None),
+        ("1.5k", None),
+        ("12 50", None),
+        ("3 x 2.50", None),
+    ],
+)
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, dayfirst, expected",
+    [
+        ("2024-05-07", False, "2024-05-07"),
+        ("2024-05-07T09:09:00", False, "2024-05-07"),
+        ("2024/5/7", False, "2024-05-07"),
+        ("05/07/2024", False, "2024-05-07"),
+        ("05/07/2024", True, "2024-07-05"),
+        ("25/12/24", False, "2024-12-25"),
+        ("07.05.2024", True, "2024-05-07"),
+        ("May 7, 2024", False, "2024-05-07"),
+        ("07-May-2024", False, "2024-05-07"),
+        ("2024-13-01", False, None),
+        ("yesterday", False, None),
+    ],
+)
+def test_parse_date(text, dayfirst, expected):
+    assert parse_date(text, dayfirst) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("09:09:00", "09:09:00"),
+        ("9:09", "09:09:00"),
+        ("9:09 PM", "21:09:00"),
+        ("12:30 a.m.", "00:30:00"),
+        ("25:00", None),
+    ],
+)
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+def test_shorthand_schema_coerces_and_reports():
+    data = {
+        "merchant_name": 7,
+        "transaction_date": "May 7, 2024",
+        "transaction_time": "9:09 PM",
+        "total_amount": "$25.00",
+        "line_items": [
+            {"item_name": "Tea", "item_quantity": "2", "item_price": "12,50"},
+            {"item_name": "Bag", "item_quantity": 1, "item_price": "free"},
+        ],
+        "notes": "kept",
+    }
+
+    result = SchemaValidator(SHORTHAND_SCHEMA).validate(data)
+
+    assert result.value == {
+        "merchant_name": "7",
+        "transaction_date": "2024-05-07",
+        "transaction_time": "21:09:00",
+        "total_amount": 25.0,
+        "line_items": [
+            {"item_name": "Tea", "item_quantity": 2, "item_price": 12.5},
+            {"item_name": "Bag", "item_quantity": 1, "item_price": "free"},
+        ],
+        "notes": "kept",
+    }
+    assert result.errors == ["line_items[1].item_price: expected a number, got 'free'"]
+    assert not result.ok
+    # The input is not mutated
+    assert data["total_amount"] == "$25.00"
+
+
+@pytest.mark.parametrize("text", ["2024-01-05", "1.5k"])
+def test_partial_numbers_are_reported(text):
+    result = SchemaValidator({"total": "number"}).validate({"total": text})
+
+    assert result.value == {"total": text}
+    assert result.errors == [f"total: expected a number, got {text!r}"]
+
+
+def test_shorthand_schema_allows_null_and_reports_missing():
+    result = SchemaValidator({"merchant_name": "string", "total": "number"}).validate(
+        {"merchant_name": None}
+    )
+
+    assert result.value == {"merchant_name": None}
+    assert result.errors == ["total: missing required property"]
+
+
+def test_shorthand_inferred_dates_are_lenient():
+    result = SchemaValidator({"transaction_date": "string"}).validate(
+        {"transaction_date": "unreadable"}
+    )
+
+    assert result.ok
+    assert result.value == {"transaction_date": "unreadable"}
+
+
+def test_json_schema_coerces_and_reports():
+    data = {
+        "merchant_name": "Shop",
+        "transaction_date": "7 May 2024",
+        "total_amount": "-1.00",
+        "currency": "GBP",
+        "line_items": [
+            {"item_name": "Tea", "item_quantity": "2.0"},
+            {"item_quantity": 1.5, "extra": True},
+        ],
+    }
+
+    result = SchemaValidator(JSON_SCHEMA).validate(data)
+
+    assert result.value == {
+        "merchant_name": "Shop",
+        "transaction_date": "2024-05-07",
+        "total_amount": -1.0,
+        "currency": "GBP",
+        "line_items": [
+            {"item_name": "Tea", "item_quantity": 2},
+            {"item_quantity": 1.5},
+        ],
+    }
+    assert result.errors == [
+        "total_amount: -1.0 is less than 0",
+        "currency: 'GBP' is not one of ['USD', 'EUR', None]",
+        "line_items[1].item_quantity: expected an integer, got 1.5",
+        "line_items[1].extra: unexpected property",
+        "line_items[1].item_name: missing required property",
+    ]
+
+
+def test_json_schema_null_handling():
+    validator = SchemaValidator(JSON_SCHEMA)
+
+    result = validator.validate(
+        {"merchant_name": None, "total_amount": 1, "currency": None}
+    )
+
+    assert result.errors == ["merchant_name: must not be null"]
+
+
+def test_json_schema_any_of():
+    validator = SchemaValidator(
+        {
+            "type": "object",
+            "properties": {
+                "total": {"anyOf": [{"type": "number"}, {"type": "boolean"}]}
+            },
+        }
+    )
+
+    assert validator.validate({"total": "$3"}).value == {"total": 3}
+    assert validator.validate({"total": "yes"}).value == {"total": True}
+    assert validator.validate({"total": [1]}).errors == [
+        "total: [1] does not match any allowed schema"
+    ]
+
+
+def test_non_object_result():
+    result = SchemaValidator(SHORTHAND_SCHEMA).validate(["not", "an", "object"])
+
+    assert result.errors == ["<root>: expected an object, got ['not', 'an', 'object']"]
+
+
+def test_get_validator_is_cached():
+    validator = get_validator(SHORTHAND_SCHEMA)
+
+    assert get_validator(dict(SHORTHAND_SCHEMA)) is validator
+    assert get_validator(get_profile(SHORTHAND_SCHEMA)) is validator
+    assert get_validator(SHORTHAND_SCHEMA, dayfirst=True) is not validator
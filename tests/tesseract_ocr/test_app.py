@@ -1,6 +1,10 @@
+import json
 import os
+from unittest.mock import patch
+
 from fastapi.testclient import TestClient
 from src.tesseract_ocr.app import app
+from src.tesseract_ocr.pool import PoolFull
 
 client = TestClient(app)
 
@@ -41,3 +45,55 @@ def test_ocr_receipt_invalid_file_type():
         response.status_code == 200
     )  # The app returns 200 with an error message for invalid file type
     assert response.json() == {"error": "Uploaded file is not an image"}
+
+
+def test_ocr_receipt_pool_full():
+    with patch("src.tesseract_ocr.app.pool.run", side_effect=PoolFull("full")):
+        response = client.post(
+            "/ocr/", files={"file": ("receipt.jpg", b"image", "image/jpeg")}
+        )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"error": "full"}
+
+
+def test_ocr_receipt_batch():
+    async def run(image_bytes):
+        if image_bytes == b"broken":
+            raise RuntimeError("ValueError: Could not decode the image.")
+        return image_bytes.decode().upper()
+
+    with patch("src.tesseract_ocr.app.pool.run", side_effect=run):
+        response = client.post(
+            "/ocr/batch",
+            files=[
+                ("files", ("a.jpg", b"total 9.99", "image/jpeg")),
+                ("files", ("b.txt", b"text", "text/plain")),
+                ("files", ("c.jpg", b"broken", "image/jpeg")),
+            ],
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = sorted(
+        (json.loads(line) for line in response.text.splitlines()),
+        key=lambda line: line["index"],
+    )
+    assert lines == [
+        {"index": 0, "filename": "a.jpg", "result": "TOTAL 9.99"},
+        {"index": 1, "filename": "b.txt", "error": "Uploaded file is not an image"},
+        {
+            "index": 2,
+            "filename": "c.jpg",
+            "error": "ValueError: Could not decode the image.",
+        },
+    ]
+
+
+def test_ocr_receipt_batch_too_many_files():
+    with patch("src.tesseract_ocr.app.MAX_BATCH_FILES", 1):
+        response = client.post(
+            "/ocr/batch",
+            files=[("files", (f"{i}.jpg", b"image", "image/jpeg")) for i in range(2)],
+        )
+    assert response.status_code == 413
+    assert response.json() == {"error": "Too many files. Max 1 per batch."}
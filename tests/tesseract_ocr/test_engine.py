@@ -0,0 +1,88 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from src.tesseract_ocr.engine import TesseractEngine, get_engine
+
+
+@pytest.fixture
+def tesserocr():
+    """Patch tesserocr and the per-thread engines."""
+    module = MagicMock()
+    with (
+        patch("src.tesseract_ocr.engine.tesserocr", module),
+        patch("src.tesseract_ocr.engine._local", threading.local()),
+    ):
+        yield module
+
+
+def test_engine_passes_image_in_memory(tesserocr):
+    api = tesserocr.PyTessBaseAPI.return_value
+    api.GetUTF8Text.return_value = "TOTAL 185.00"
+    engine = TesseractEngine(path="/tessdata")
+
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    assert engine.image_to_string(image) == "TOTAL 185.00"
+
+    tesserocr.PyTessBaseAPI.assert_called_once_with(lang="eng", psm=6, path="/tessdata")
+    api.SetImageBytes.assert_called_once_with(image.tobytes(), 30, 20, 3, 90)
+
+
+def test_engine_recognize_returns_confidence(tesserocr):
+    api = tesserocr.PyTessBaseAPI.return_value
+    api.GetUTF8Text.return_value = "TOTAL 185.00"
+    api.MeanTextConf.return_value = 91
+    engine = TesseractEngine()
+
+    image = np.zeros((20, 30, 3), dtype=np.uint8)
+    assert engine.recognize(image) == ("TOTAL 185.00", 91.0)
+
+
+def test_engine_accepts_grayscale_views(tesserocr):
+    api = tesserocr.PyTessBaseAPI.return_value
+    engine = TesseractEngine()
+
+    image = np.arange(600, dtype=np.uint8).reshape(20, 30)[:, ::2]
+    engine.image_to_string(image)
+
+    data, width, height, channels, stride = api.SetImageBytes.call_args.args
+    assert (width, height, channels, stride) == (15, 20, 1, 15)
+    assert data == np.ascontiguousarray(image).tobytes()
+
+
+def test_get_engine_is_kept_per_thread(tesserocr, monkeypatch):
+    monkeypatch.delenv("OCR_ENGINE", raising=False)
+    engine = get_engine()
+
+    assert engine is get_engine()
+    assert tesserocr.PyTessBaseAPI.call_count == 1
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_engine()))
+    thread.start()
+    thread.join()
+    assert other[0] is not engine
+
+
+def test_get_engine_falls_back_to_pytesseract(tesserocr, monkeypatch):
+    monkeypatch.delenv("OCR_ENGINE", raising=False)
+    tesserocr.PyTessBaseAPI.side_effect = RuntimeError("Failed to init API")
+
+    assert get_engine() is None
+
+
+def test_get_engine_pytesseract_backend(tesserocr, monkeypatch):
+    monkeypatch.setenv("OCR_ENGINE", "pytesseract")
+
+    assert get_engine() is None
+    tesserocr.PyTessBaseAPI.assert_not_called()
+
+
+def test_get_engine_tesserocr_backend_raises(tesserocr, monkeypatch):
+    monkeypatch.setenv("OCR_ENGINE", "tesserocr")
+    tesserocr.PyTessBaseAPI.side_effect = RuntimeError("Failed to init API")
+
+    with pytest.raises(RuntimeError):
+        get_engine()
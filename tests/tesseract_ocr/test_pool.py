@@ -0,0 +1,98 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.tesseract_ocr.pool import OCRPool, PoolFull, iter_ocr_files
+
+
+def test_run_in_worker_process():
+    pool = OCRPool(workers=2, task=len)
+
+    async def main():
+        assert await pool.warm_up() == 2
+        return await asyncio.gather(pool.run(b"abc"), pool.run(b"abcdef"))
+
+    try:
+        assert asyncio.run(main()) == [3, 6]
+    finally:
+        pool.shutdown()
+    assert pool.pending == 0
+
+
+def test_full_queue_rejects_at_once():
+    pool = OCRPool(workers=1, max_queue=1, task=time.sleep)
+
+    async def main():
+        slow = [asyncio.ensure_future(pool.run(0.5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.stats()["queued"] == 1
+        start = time.perf_counter()
+        with pytest.raises(PoolFull):
+            await pool.run(0.5)
+        assert time.perf_counter() - start < 0.1
+        await asyncio.gather(*slow)
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert pool.stats() == {
+        "workers": 1,
+        "busy": 0,
+        "queued": 0,
+        "max_queue": 1,
+        "rejected": 1,
+    }
+
+
+def test_worker_errors_are_raised():
+    pool = OCRPool(workers=1, task=int)
+
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run(b"not a number"))
+    finally:
+        pool.shutdown()
+
+
+def test_ocr_errors_do_not_break_the_pool():
+    pool = OCRPool(workers=1)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await pool.run(b"not an image")
+
+    try:
+        asyncio.run(main())
+    finally:
+        pool.shutdown()
+
+
+def test_iter_ocr_files_in_worker_processes(tmp_path):
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    missing = str(tmp_path / "missing.jpg")
+
+    results = {
+        path: (text, error)
+        for path, text, error in iter_ocr_files([str(broken), missing], jobs=2)
+    }
+
+    assert results[str(broken)] == (None, "ValueError: Could not decode the image.")
+    text, error = results[missing]
+    assert text is None
+    assert "No such file or directory" in error
+
+
+@patch("src.tesseract_ocr.pool.perform_ocr", return_value="TOTAL 9.99")
+def test_iter_ocr_files_single_job_runs_in_process(mock_perform_ocr, tmp_path):
+    image = tmp_path / "receipt.jpg"
+    image.write_bytes(b"image")
+
+    assert list(iter_ocr_files([str(image)], jobs=1)) == [
+        (str(image), "TOTAL 9.99", None)
+    ]
+    assert mock_perform_ocr.call_args.args[0].tobytes() == b"image"
@@ -1,63 +1,156 @@
 import pytest
 from unittest.mock import patch
+import cv2
 import numpy as np
-from src.tesseract_ocr.utils import perform_ocr
+from src.tesseract_ocr.utils import (
+    find_receipt_outline,
+    ocr_image_with_confidence,
+    perform_ocr,
+)
 
 
-# Mocking cv2 and pytesseract
-@patch("src.tesseract_ocr.utils.cv2")
-@patch("src.tesseract_ocr.utils.pytesseract")
-@patch("src.tesseract_ocr.utils.imutils")
-def test_perform_ocr_success(mock_imutils, mock_pytesseract, mock_cv2):
-    # Setup mocks
-    mock_cv2.imdecode.return_value = np.zeros((100, 100, 3), dtype=np.uint8)
-    mock_imutils.resize.return_value = np.zeros((50, 50, 3), dtype=np.uint8)
-    mock_cv2.cvtColor.return_value = np.zeros((50, 50), dtype=np.uint8)
-    mock_cv2.GaussianBlur.return_value = np.zeros((50, 50), dtype=np.uint8)
-    mock_cv2.Canny.return_value = np.zeros((50, 50), dtype=np.uint8)
-
-    # Mock contours to simulate a found receipt
-    mock_contour = np.array(
-        [[[0, 0]], [[0, 49]], [[49, 49]], [[49, 0]]], dtype=np.int32
-    )
-    mock_imutils.grab_contours.return_value = [mock_contour]
-    mock_cv2.contourArea.return_value = 1000
-    mock_cv2.arcLength.return_value = 200
-    mock_cv2.approxPolyDP.return_value = mock_contour
+def _receipt_photo(width=600, height=800, corners=None):
+    """A white receipt on a dark background, and its corners."""
+    image = np.full((height, width, 3), 60, dtype=np.uint8)
+    if corners is None:
+        corners = np.array(
+            [
+                [0.3 * width, 0.1 * height],
+                [0.75 * width, 0.15 * height],
+                [0.7 * width, 0.9 * height],
+                [0.25 * width, 0.85 * height],
+            ]
+        )
+    cv2.fillPoly(image, [corners.astype(np.int32)], (245, 245, 245))
+    return image, corners
+
+
+def _encode(image):
+    return np.frombuffer(cv2.imencode(".png", image)[1], np.uint8)
+
+
+def _assert_corners(found, expected, tolerance):
+    # Corners may come in any order and start
+    distances = np.linalg.norm(found[:, None] - expected[None], axis=2)
+    assert distances.min(axis=0).max() < tolerance
+
+
+def test_find_receipt_outline_contour():
+    image, corners = _receipt_photo()
+
+    found, method = find_receipt_outline(image)
+
+    assert method == "contour"
+    _assert_corners(found, corners, tolerance=8)
+
+
+def test_find_receipt_outline_maps_large_photo_back():
+    image, corners = _receipt_photo(width=3000, height=4000)
+
+    found, method = find_receipt_outline(image)
+
+    assert method == "contour"
+    # Detected at about 430x580, so a few pixels there are ~30 here
+    _assert_corners(found, corners, tolerance=40)
+
+
+def test_find_receipt_outline_occluded_corner():
+    image, corners = _receipt_photo()
+    cv2.circle(image, tuple(int(v) for v in corners[0]), 50, (60, 60, 60), -1)
+
+    found, method = find_receipt_outline(image)
+
+    assert method in ("hull", "rect")
+    assert cv2.contourArea(found) > 0.5 * cv2.contourArea(corners.astype(np.float32))
+
+
+def test_find_receipt_outline_ignores_small_quadrilaterals():
+    image = np.full((800, 600, 3), 60, dtype=np.uint8)
+    cv2.rectangle(image, (10, 10), (60, 40), (245, 245, 245), -1)
+
+    found, method = find_receipt_outline(image)
 
+    assert method == "frame"
+    assert found.tolist() == [[0, 0], [599, 0], [599, 799], [0, 799]]
+
+
+@patch("src.tesseract_ocr.utils.get_engine", return_value=None)
+@patch("src.tesseract_ocr.utils.pytesseract")
+def test_perform_ocr_success(mock_pytesseract, mock_get_engine):
+    image, _ = _receipt_photo()
     mock_pytesseract.image_to_string.return_value = "Extracted Text"
 
-    # Call the function
-    dummy_img_array = np.zeros(10, dtype=np.uint8)
-    result = perform_ocr(dummy_img_array)
+    result = perform_ocr(_encode(image))
 
-    # Assertions
     assert result == "Extracted Text"
-    mock_cv2.imdecode.assert_called_once_with(dummy_img_array, mock_cv2.IMREAD_COLOR)
     mock_pytesseract.image_to_string.assert_called_once()
+    receipt = mock_pytesseract.image_to_string.call_args.args[0]
+    # The receipt was cut out of the photo and straightened
+    assert receipt.shape[0] == pytest.approx(0.75 * 800, rel=0.05)
+    assert receipt.shape[1] == pytest.approx(0.45 * 600, rel=0.05)
+    assert mock_pytesseract.image_to_string.call_args.kwargs == {"config": "--psm 6"}
+
+
+@patch("src.tesseract_ocr.utils.get_engine", return_value=None)
+@patch("src.tesseract_ocr.utils.pytesseract")
+def test_perform_ocr_no_receipt_outline(mock_pytesseract, mock_get_engine):
+    # A scan cropped to the receipt has no outline, the whole image is read
+    image = np.full((400, 300, 3), 245, dtype=np.uint8)
+    cv2.putText(image, "TOTAL 9.99", (20, 200), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    mock_pytesseract.image_to_string.return_value = "TOTAL 9.99"
+
+    assert perform_ocr(_encode(image)) == "TOTAL 9.99"
+    receipt = mock_pytesseract.image_to_string.call_args.args[0]
+    assert receipt.shape == (400, 300, 3)
 
 
-@patch("src.tesseract_ocr.utils.cv2")
+@patch("src.tesseract_ocr.utils.get_engine")
 @patch("src.tesseract_ocr.utils.pytesseract")
-@patch("src.tesseract_ocr.utils.imutils")
-def test_perform_ocr_no_receipt_outline(mock_imutils, mock_pytesseract, mock_cv2):
-    # Setup mocks to simulate no receipt outline found
-    mock_cv2.imdecode.return_value = np.zeros((100, 100, 3), dtype=np.uint8)
-    mock_imutils.resize.return_value = np.zeros((50, 50, 3), dtype=np.uint8)
-    mock_cv2.cvtColor.return_value = np.zeros((50, 50), dtype=np.uint8)
-    mock_cv2.GaussianBlur.return_value = np.zeros((50, 50), dtype=np.uint8)
-    mock_cv2.Canny.return_value = np.zeros((50, 50), dtype=np.uint8)
-
-    # No contours found that approximate to 4 points
-    mock_imutils.grab_contours.return_value = [
-        np.array([[[0, 0], [1, 1], [2, 2]]], dtype=np.int32)
-    ]  # A contour not of 4 points
-    mock_cv2.contourArea.return_value = 1000
-    mock_cv2.arcLength.return_value = 200
-    mock_cv2.approxPolyDP.return_value = np.array(
-        [[[0, 0], [1, 1], [2, 2]]], dtype=np.int32
-    )  # Not 4 points
-
-    dummy_img_array = np.zeros(10, dtype=np.uint8)
-    with pytest.raises(Exception, match="Could not find receipt outline."):
-        perform_ocr(dummy_img_array)
+def test_perform_ocr_uses_engine(mock_pytesseract, mock_get_engine):
+    image, _ = _receipt_photo()
+    mock_get_engine.return_value.image_to_string.return_value = "Engine Text"
+
+    assert perform_ocr(_encode(image)) == "Engine Text"
+    mock_get_engine.return_value.image_to_string.assert_called_once()
+    mock_pytesseract.image_to_string.assert_not_called()
+
+
+def test_perform_ocr_undecodable_image():
+    with pytest.raises(ValueError, match="Could not decode the image."):
+        perform_ocr(np.frombuffer(b"not an image", np.uint8))
+
+
+@patch("src.tesseract_ocr.utils.get_engine", return_value=None)
+@patch("src.tesseract_ocr.utils.pytesseract")
+def test_ocr_image_with_confidence_from_pytesseract_data(
+    mock_pytesseract, mock_get_engine
+):
+    image, _ = _receipt_photo()
+    mock_pytesseract.image_to_data.return_value = {
+        "block_num": [1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 2, 2],
+        "text": ["", "Milk", "2.50", "TOTAL", " "],
+        "conf": [-1, 90, 80, 70.5, 10],
+    }
+
+    text, confidence = ocr_image_with_confidence(image)
+
+    assert text == "Milk 2.50\nTOTAL"
+    assert confidence == pytest.approx((90 + 80 + 70.5) / 3)
+    assert mock_pytesseract.image_to_data.call_args.kwargs["config"] == "--psm 6"
+
+
+@patch("src.tesseract_ocr.utils.get_engine", return_value=None)
+@patch("src.tesseract_ocr.utils.pytesseract")
+def test_ocr_image_with_confidence_no_words(mock_pytesseract, mock_get_engine):
+    image = np.full((400, 300, 3), 245, dtype=np.uint8)
+    mock_pytesseract.image_to_data.return_value = {
+        "block_num": [1],
+        "par_num": [0],
+        "line_num": [0],
+        "text": [""],
+        "conf": [-1],
+    }
+
+    assert ocr_image_with_confidence(image) == ("", 0.0)